@@ -16,7 +16,7 @@ from flask import (
     current_app,
 )  # Added jsonify, Response, and send_file
 from werkzeug.utils import secure_filename
-from extensions import db, migrate, Setting, get_spacy_model, SPACY_MODEL_MAP  # Import shared models and utilities from extensions
+from extensions import db, migrate, Setting, get_spacy_model, SPACY_MODEL_MAP, model_registry  # Import shared models and utilities from extensions
 from sqlalchemy.exc import IntegrityError  # Import IntegrityError
 from sqlalchemy import func
 from datetime import (
@@ -42,6 +42,7 @@ import json  # Added import for json
 import re  # Added import for re
 import random  # Added import for random
 import logging
+import click
 from threading import Thread
 import subprocess
 import sys
@@ -53,7 +54,24 @@ from fsrs import (
     ReviewLog,
 )  # Import FSRS components (renamed FSRS to Scheduler)
 from dotenv import load_dotenv
-from vocab_utils import get_cefr_progress, process_text_for_vocab, process_text, compute_readability, get_words_for_readability
+from vocab_utils import get_cefr_progress, process_text_for_vocab, process_text, compute_readability, extract_library_vocabulary, LOOKUP_CHUNK_SIZE
+from text_analysis import get_text_analysis, discard_text_analysis
+from text_processor import get_lemmas, stream_vocabulary, iter_text_file
+import word_tokenizer
+from nlp_jobs import nlp_jobs, READABILITY_PENDING
+from sentence_index import load_sentence_index, find_context_sentence, sentence_ids_for, sentence_text
+from readability_index import snapshot_lemmas, apply_lemma_changes, remove_document, remove_language
+from readability_matrix import rescore_language
+from recommender import recommend
+from vocab_snapshot import vocab_snapshots, lookup_vocab_status, changes_since
+from reader_payload import payload_etag, payload_key, reader_payload
+from review_log import review_logs, reviews_by_day
+from srs_forecast import forecasts, MAX_FORECAST_DAYS
+from fsrs_optimizer import optimize_language, scheduler_for, DEFAULT_ITERATIONS as FSRS_OPTIMIZER_ITERATIONS, MIN_REVIEWS as FSRS_MIN_REVIEWS
+from review_queue import build_queue, dequeue, queue_counts, queue_day, queued_terms
+from vocab_bulk import BulkUpdateError, bulk_update_terms, parse_operations as parse_bulk_operations
+import word_status_report
+from readability_backfill import DEFAULT_BATCH_SIZE as BACKFILL_BATCH_SIZE, backfill_languages, background_backfill
 from functools import lru_cache # Add this import
 
 # Load environment variables
@@ -134,6 +152,26 @@ ALLOWED_EXTENSIONS = {
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 1 * 1024 * 1024 * 1024  # 1 GB limit for uploads
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev")  # CHANGE THIS
+# spaCy model cache limits (0 = no limit). Models are evicted least recently used first.
+app.config["SPACY_MODEL_MEMORY_MB"] = float(os.getenv("SPACY_MODEL_MEMORY_MB", 0))
+app.config["SPACY_MAX_MODELS"] = int(os.getenv("SPACY_MAX_MODELS", 32))
+# Models loaded in the gunicorn master before forking (see gunicorn.conf.py):
+# 'available' = languages with an installed model, 'all' = PRE_DOWNLOAD_MODELS, 'none'
+app.config["SPACY_WARMUP"] = os.getenv("SPACY_WARMUP", "available")
+app.config["SPACY_WARMUP_PROFILES"] = os.getenv("SPACY_WARMUP_PROFILES", "analysis,lemma")
+# Longest lesson/story excerpt (in characters) sent for a grammar summary;
+# the text is cut at the last sentence boundary that fits
+app.config["GRAMMAR_SUMMARY_MAX_CHARS"] = int(os.getenv("GRAMMAR_SUMMARY_MAX_CHARS", 12000))
+# Background readability analysis (see nlp_jobs.py). 0 workers = analyze inline in the
+# request (development only); gunicorn.conf.py derives this from NLP_TOTAL_WORKERS.
+app.config["NLP_WORKERS"] = int(os.getenv("NLP_WORKERS", 2))
+app.config["NLP_MAX_PENDING_JOBS"] = int(os.getenv("NLP_MAX_PENDING_JOBS", 64))
+app.config["NLP_WORKER_START_METHOD"] = os.getenv("NLP_WORKER_START_METHOD", "spawn")
+# Review history is written in batches (see review_log.py)
+app.config["REVIEW_LOG_BATCH_SIZE"] = int(os.getenv("REVIEW_LOG_BATCH_SIZE", 50))
+app.config["REVIEW_LOG_MAX_DELAY"] = float(os.getenv("REVIEW_LOG_MAX_DELAY", 5))
+# Review forecasts are rebuilt after reviews in this process or after this many seconds
+app.config["SRS_FORECAST_TTL"] = float(os.getenv("SRS_FORECAST_TTL", 600))
 
 # Import extensions
 from extensions import db, migrate, Setting  # Import Setting from extensions
@@ -141,6 +179,11 @@ from extensions import db, migrate, Setting  # Import Setting from extensions
 # Initialize extensions
 db.init_app(app)
 migrate.init_app(app, db)
+model_registry.init_app(app)
+nlp_jobs.init_app(app)
+vocab_snapshots.init_app(app)
+review_logs.init_app(app)
+forecasts.init_app(app)
 
 
 # --- Database Models (Define structure) ---
@@ -162,6 +205,8 @@ class Language(db.Model):
     spacy_model_status = db.Column(
         db.String(50), default="not_available"
     )  # e.g., 'not_available', 'downloading', 'available', 'failed'
+    # Bumped on every change to this language's terms (see vocab_snapshot.py)
+    vocab_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     # Add more fields later: default_dict_urls, etc.
 
     def __repr__(self):
@@ -203,6 +248,12 @@ class SRSSettings(db.Model):
         db.Float, default=1.2, nullable=False
     )  # Multiplier for "Hard" rating
 
+    # FSRS parameters fitted to this language's review log (JSON list of 21
+    # weights, see fsrs_optimizer.py); NULL = the scheduler's defaults
+    fsrs_parameters = db.Column(db.Text, nullable=True)
+    fsrs_optimized_at = db.Column(db.DateTime, nullable=True)
+    fsrs_review_count = db.Column(db.Integer, nullable=True)  # Reviews they were fitted on
+
     # Relationship back to language (for easy access settings.language)
     language = db.relationship(
         "Language",
@@ -246,6 +297,10 @@ class Lesson(db.Model):
         db.Float, default=0.0, index=True  # Added index for sorting
     )  # Store timestamp offset in seconds
     readability_score = db.Column(db.Float, default=0.0, index=True)  # Added index for sorting
+    readability_status = db.Column(db.String(10), default="ready", server_default="ready")  # 'pending' while analyzed in the background
+    sentence_index = db.Column(db.Text, nullable=True)  # JSON: sentence offsets + term/lemma -> sentence ids
+    readability_weight_sum = db.Column(db.Float, nullable=True)  # Σ status weights of counted words (see readability_index.py)
+    readability_token_count = db.Column(db.Integer, nullable=True)  # Number of counted words
     
     # Add composite index for common query patterns
     __table_args__ = (
@@ -311,6 +366,8 @@ class VocabTerm(db.Model):
         # db.UniqueConstraint("language_id", "lemma", name="uq_language_lemma"),
         db.Index('ix_vocab_term_language_status', 'language_id', 'status'),
         db.Index('ix_vocab_term_next_review', 'next_review_date'),
+        # Covers the daily review queue selection (see review_queue.py)
+        db.Index('ix_vocab_term_review_due', 'language_id', 'status', 'next_review_date', 'last_review_date'),
     )
 
     language = db.relationship(
@@ -340,6 +397,10 @@ class Story(db.Model):
     grammar_summary = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Added index for sorting
     readability_score = db.Column(db.Float, default=0.0, index=True)  # Added index for sorting
+    readability_status = db.Column(db.String(10), default="ready", server_default="ready")  # 'pending' while analyzed in the background
+    sentence_index = db.Column(db.Text, nullable=True)  # JSON: sentence offsets + term/lemma -> sentence ids
+    readability_weight_sum = db.Column(db.Float, nullable=True)  # Σ status weights of counted words (see readability_index.py)
+    readability_token_count = db.Column(db.Integer, nullable=True)  # Number of counted words
     
     # Add composite index for common query patterns
     __table_args__ = (
@@ -357,6 +418,131 @@ class Story(db.Model):
 # --- End Story Model ---
 
 
+# --- AnalyzedText Model ---
+# Cached spaCy analysis of a lesson/story text, keyed by content hash and model
+# version (see text_analysis.py)
+class AnalyzedText(db.Model):
+    __tablename__ = "analyzed_text"
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the text
+    model_key = db.Column(db.String(120), nullable=False)  # e.g. en_core_web_sm@3.8.0/v1
+    token_count = db.Column(db.Integer, default=0)
+    data = db.Column(db.Text, nullable=False)  # Compact token/sentence table as JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("content_hash", "model_key", name="uq_analyzed_text_hash_model"),
+    )
+
+    def __repr__(self):
+        return f"<AnalyzedText {self.content_hash[:12]} ({self.model_key}, {self.token_count} tokens)>"
+
+
+# --- End AnalyzedText Model ---
+
+
+# --- DocumentLemma Model ---
+# Inverted index lemma -> (lesson/story, occurrences) used to keep readability
+# scores current when term statuses change (see readability_index.py)
+class DocumentLemma(db.Model):
+    __tablename__ = "document_lemma"
+    id = db.Column(db.Integer, primary_key=True)
+    doc_type = db.Column(db.String(10), nullable=False)  # 'lesson' or 'story'
+    doc_id = db.Column(db.Integer, nullable=False)
+    language_id = db.Column(db.Integer, db.ForeignKey("language.id"), nullable=False)
+    lemma = db.Column(db.String(200), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        db.Index("ix_document_lemma_language_lemma", "language_id", "lemma"),
+        db.Index("ix_document_lemma_doc", "doc_type", "doc_id"),
+    )
+
+    def __repr__(self):
+        return f"<DocumentLemma {self.lemma} x{self.count} ({self.doc_type} {self.doc_id})>"
+
+
+# --- End DocumentLemma Model ---
+
+
+# --- VocabChange Model ---
+# Latest change of every term, stamped with the language's vocab_version, so
+# clients can fetch only what changed since the version they have (see
+# vocab_snapshot.py and /api/vocab/<lang_id>/changes)
+class VocabChange(db.Model):
+    __tablename__ = "vocab_change"
+    id = db.Column(db.Integer, primary_key=True)
+    language_id = db.Column(db.Integer, db.ForeignKey("language.id"), nullable=False)
+    # Language.vocab_version the change was committed at
+    version = db.Column(db.Integer, nullable=False)
+    term = db.Column(db.String(200), nullable=False)
+    status = db.Column(db.Integer, nullable=True)
+    translation = db.Column(db.Text, nullable=True)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("language_id", "term", name="uq_vocab_change_language_term"),
+        db.Index("ix_vocab_change_language_version", "language_id", "version"),
+    )
+
+    def __repr__(self):
+        return f"<VocabChange {self.term} v{self.version}{' (deleted)' if self.deleted else ''}>"
+
+
+# --- End VocabChange Model ---
+
+
+# --- ReviewQueueEntry Model ---
+# Cards of a language's review session for one (UTC) day, selected once with
+# the SRSSettings limits and dequeued as they are answered (see review_queue.py)
+class ReviewQueueEntry(db.Model):
+    __tablename__ = "review_queue"
+    id = db.Column(db.Integer, primary_key=True)
+    language_id = db.Column(db.Integer, db.ForeignKey("language.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    term_id = db.Column(db.Integer, db.ForeignKey("vocab_term.id"), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    is_new = db.Column(db.Boolean, nullable=False, default=False)  # Never reviewed when queued
+    requeued = db.Column(db.Boolean, nullable=False, default=False)  # Due again later the same day
+    answered_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("language_id", "day", "term_id", name="uq_review_queue_language_day_term"),
+        db.Index("ix_review_queue_language_day_position", "language_id", "day", "position"),
+    )
+
+    def __repr__(self):
+        return f"<ReviewQueueEntry term {self.term_id} #{self.position} ({self.day})>"
+
+
+# --- End ReviewQueueEntry Model ---
+
+
+# --- ReviewLogEntry Model ---
+# Append-only history of answered reviews, written in batches by
+# review_log.review_logs. term_id is not a foreign key: the history of a
+# deleted term is kept for statistics and FSRS optimization.
+class ReviewLogEntry(db.Model):
+    __tablename__ = "review_log"
+    id = db.Column(db.Integer, primary_key=True)
+    term_id = db.Column(db.Integer, nullable=False, index=True)
+    language_id = db.Column(db.Integer, db.ForeignKey("language.id"), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False)  # UTC
+    rating = db.Column(db.SmallInteger, nullable=False)  # 1 again, 2 hard, 3 good, 4 easy
+    elapsed_days = db.Column(db.Float, nullable=True)  # Since the previous review
+    scheduled_days = db.Column(db.Integer, nullable=True)  # Interval set by this review
+    state_before = db.Column(db.SmallInteger, nullable=True)  # 0 new, else fsrs.State
+    state_after = db.Column(db.SmallInteger, nullable=True)
+
+    __table_args__ = (db.Index("ix_review_log_language_ts", "language_id", "ts"),)
+
+    def __repr__(self):
+        return f"<ReviewLogEntry term {self.term_id} rating {self.rating} at {self.ts}>"
+
+
+# --- End ReviewLogEntry Model ---
+
+
 # --- Helper function to get/set settings ---
 def get_setting(key, default=None):
     setting = db.session.get(Setting, key)
@@ -385,6 +571,148 @@ def init_db_command():
     print("Initialized the database.")
 
 
+@app.cli.command("extract-vocabulary")
+@click.argument("language_name")
+@click.option("--file", "file_path", default=None, help="Extract from this text file instead of the lesson library.")
+@click.option("--no-stories", is_flag=True, help="Skip stories when extracting from the library.")
+@click.option("--top", default=50, show_default=True, help="Number of lemmas to print.")
+@click.option("--n-process", default=1, show_default=True, help="spaCy worker processes.")
+@click.option("--output", default=None, help="Write the full frequency table to this JSON file.")
+def extract_vocabulary_command(language_name, file_path, no_stories, top, n_process, output):
+    """Stream lessons/stories (or a text file) into a lemma frequency table."""
+    language = Language.query.filter(func.lower(Language.name) == language_name.lower()).first()
+    if not language:
+        raise click.ClickException(f"Language '{language_name}' not found.")
+
+    started = datetime.now()
+    if file_path:
+        table = stream_vocabulary(iter_text_file(file_path), language.name, n_process=n_process)
+    else:
+        table = extract_library_vocabulary(language.id, include_stories=not no_stories, n_process=n_process)
+    if table is None:
+        raise click.ClickException(f"No spaCy model available for {language.name}.")
+
+    elapsed = (datetime.now() - started).total_seconds()
+    print(
+        f"{table.document_count} documents, {table.token_count} counted tokens, "
+        f"{len(table)} lemmas in {elapsed:.1f}s"
+    )
+    for lemma, frequency in table.most_common(top):
+        print(f"{frequency:>8}  {lemma}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(table.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"Wrote {output}")
+
+
+@app.cli.command("backfill-readability")
+@click.argument("language_names", nargs=-1)
+@click.option("--batch-size", default=BACKFILL_BATCH_SIZE, show_default=True, help="Documents analyzed and committed together.")
+@click.option("--all", "force", is_flag=True, help="Re-analyze every document, not only unindexed/unfinished ones.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint left by an interrupted run.")
+@click.option("--jobs", default=1, show_default=True, help="Languages processed in parallel, one worker process each.")
+def backfill_readability_command(language_names, batch_size, force, restart, jobs):
+    """Analyze and score lessons/stories in resumable batches (all languages by default)."""
+    languages = Language.query.order_by(Language.name).all()
+    if language_names:
+        wanted = {name.lower() for name in language_names}
+        languages = [language for language in languages if language.name.lower() in wanted]
+        missing = wanted - {language.name.lower() for language in languages}
+        if missing:
+            raise click.ClickException(f"Language(s) not found: {', '.join(sorted(missing))}")
+
+    results = backfill_languages(
+        [language.id for language in languages],
+        jobs=jobs,
+        report=print,
+        batch_size=batch_size,
+        force=force,
+        restart=restart,
+    )
+    for result in results:
+        resumed = f", resumed after {result['resumed_from']}" if result["resumed_from"] else ""
+        print(
+            f"{result['language']}: {result['done']} documents ({result['failed']} failed) "
+            f"in {result['seconds']}s, {result['documents_per_second']} docs/s{resumed}"
+        )
+
+
+@app.cli.command("optimize-fsrs")
+@click.argument("language_names", nargs=-1)
+@click.option("--iterations", default=FSRS_OPTIMIZER_ITERATIONS, show_default=True, help="Optimizer iterations.")
+@click.option("--min-reviews", default=FSRS_MIN_REVIEWS, show_default=True, help="Skip languages with fewer predictable reviews.")
+@click.option("--dry-run", is_flag=True, help="Fit and report without saving the parameters.")
+def optimize_fsrs_command(language_names, iterations, min_reviews, dry_run):
+    """Fit FSRS parameters to each language's review log (all languages by default)."""
+    languages = Language.query.order_by(Language.name).all()
+    if language_names:
+        wanted = {name.lower() for name in language_names}
+        languages = [language for language in languages if language.name.lower() in wanted]
+        missing = wanted - {language.name.lower() for language in languages}
+        if missing:
+            raise click.ClickException(f"Language(s) not found: {', '.join(sorted(missing))}")
+
+    for language in languages:
+        result = optimize_language(language.id, iterations=iterations, min_reviews=min_reviews, save=not dry_run)
+        if "parameters" not in result:
+            print(f"{language.name}: skipped, {result['message'].lower()}")
+            continue
+        if result["saved"]:
+            outcome = "saved"
+        elif dry_run:
+            outcome = "not saved (dry run)"
+        else:
+            outcome = "kept defaults (no improvement)"
+        print(
+            f"{language.name}: {result['reviews']} reviews of {result['cards']} cards in {result['seconds']}s, "
+            f"log loss {result['default_loss']} -> {result['loss']}, {outcome}"
+        )
+        print(f"  parameters: {result['parameters']}")
+
+
+@app.cli.command("word-status-report")
+@click.argument("language_names", nargs=-1)
+@click.option("--mode", type=click.Choice(word_status_report.MODES), default="lemma", show_default=True,
+              help="Match words by surface form or by lemma.")
+@click.option("--no-stories", is_flag=True, help="Only report lessons.")
+@click.option("--format", "output_format", type=click.Choice(["text", "csv", "json"]), default="text", show_default=True)
+@click.option("--output", default=None, help="Write the report to this file instead of stdout.")
+def word_status_report_command(language_names, mode, no_stories, output_format, output):
+    """Word-status histograms for every lesson/story (all languages by default)."""
+    languages = Language.query.order_by(Language.name).all()
+    if language_names:
+        wanted = {name.lower() for name in language_names}
+        languages = [language for language in languages if language.name.lower() in wanted]
+        if not languages:
+            raise click.ClickException(f"Language(s) not found: {', '.join(language_names)}")
+
+    started = datetime.now()
+    stream = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        rows = (
+            row
+            for language in languages
+            for row in word_status_report.language_report(language, mode, include_stories=not no_stories)
+        )
+        if output_format == "csv":
+            word_status_report.write_csv(rows, stream)
+        elif output_format == "json":
+            json.dump(list(rows), stream, ensure_ascii=False, indent=2)
+        else:
+            print(f"Word Status Counts ({mode} mode):", file=stream)
+            current_language = None
+            for row in rows:
+                if row["language"] != current_language:
+                    current_language = row["language"]
+                    print(f"\nLanguage: {current_language}", file=stream)
+                print(word_status_report.format_row(row), file=stream)
+    finally:
+        if output:
+            stream.close()
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"Report finished in {elapsed:.1f}s", file=sys.stderr)
+
+
 # -----------------------------------
 
 
@@ -689,29 +1017,20 @@ def get_stats_reviews_api(language_id):
         timespan = request.args.get('timespan', '30d')
         start_date, end_date = get_date_range(timespan)
 
-        daily_ratings = db.session.query(
-            db.func.strftime('%Y-%m-%d', VocabTerm.last_review_date).label('review_date'),
-            VocabTerm.last_rating_type,
-            db.func.count(VocabTerm.id).label('count')
-        ).filter(
-            VocabTerm.language_id == language_id,
-            VocabTerm.last_review_date.isnot(None),
-            VocabTerm.last_review_date >= start_date,
-            VocabTerm.last_review_date <= end_date
-        ).group_by(
-            'review_date',
-            VocabTerm.last_rating_type
-        ).order_by('review_date').all()
+        # Every review in the range, from the review log (ratings 1 again .. 4 easy)
+        daily_ratings = reviews_by_day(language_id, start_date, end_date)
 
         daily_data = {date.strftime('%Y-%m-%d'): {'total': 0, 'successful': 0, 'failed': 0}
                       for date in (start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1))}
 
-        for review_date, rating_type, count in daily_ratings:
-            if review_date in daily_data:
+        for review_date, ratings in daily_ratings.items():
+            if review_date not in daily_data:
+                continue
+            for rating, count in ratings.items():
                 daily_data[review_date]['total'] += count
-                if rating_type in ['good', 'easy']:
+                if rating >= 3:
                     daily_data[review_date]['successful'] += count
-                elif rating_type in ['again', 'hard']:
+                else:
                     daily_data[review_date]['failed'] += count
 
         labels = sorted(daily_data.keys())
@@ -942,21 +1261,18 @@ def delete_language(lang_id):
             return jsonify({"success": False, "message": "Language not found."}), 404
             
         # Delete related records in the correct order to avoid foreign key constraint violations
-        # 1. Delete any SRS reviews for terms in this language
-        # Note: ReviewLog is imported from fsrs module, not a SQLAlchemy model
-        # We'll handle this by first getting all term IDs and then deleting in chunks
-        term_ids = [term[0] for term in db.session.query(VocabTerm.id).filter_by(language_id=lang_id).all()]
-        if term_ids:
-            # Delete review logs in chunks to avoid very large queries
-            chunk_size = 100
-            for i in range(0, len(term_ids), chunk_size):
-                chunk = term_ids[i:i + chunk_size]
-                db.session.query(ReviewLog).filter(ReviewLog.vocab_term_id.in_(chunk)).delete(synchronize_session=False)
+        # 1. Delete the review history of this language (buffered rows too)
+        review_logs.discard_language(lang_id)
+        ReviewLogEntry.query.filter_by(language_id=lang_id).delete(synchronize_session=False)
         
         # 2. Delete all vocabulary terms for this language
         VocabTerm.query.filter_by(language_id=lang_id).delete(synchronize_session=False)
+        VocabChange.query.filter_by(language_id=lang_id).delete(synchronize_session=False)
+        ReviewQueueEntry.query.filter_by(language_id=lang_id).delete(synchronize_session=False)
+        vocab_snapshots.discard(lang_id)
         
-        # 3. Delete all lessons for this language
+        # 3. Delete all lessons for this language (and the lemma index of its documents)
+        remove_language(lang_id)
         Lesson.query.filter_by(language_id=lang_id).delete(synchronize_session=False)
         
         # 4. Delete any SRS settings for this language
@@ -1119,8 +1435,8 @@ def update_language_settings(lang_id):
 
 # --- Helper to count words (basic) ---
 def count_words(text):
-    # Basic split, can be improved for punctuation/edge cases
-    return len(text.split())
+    # Count words the same way the reader splits them (see word_tokenizer)
+    return word_tokenizer.count_words(text)
 
 
 # -----------------------------------
@@ -1321,20 +1637,15 @@ def add_lesson_post(lang_id):
         audio_filename=saved_audio_filename,  # Keep audio_filename for now
         timestamps=timestamps_json,
         timestamp_offset=0.0,
-        readability_score=0.0, # Will be calculated below
+        readability_score=0.0, # Filled in by the background readability job
+        readability_status=READABILITY_PENDING,
         word_count=count_words(text_content_to_save),  # Calculate word count
     )
 
-    # Calculate word count and readability score
-    new_lesson.word_count = count_words(new_lesson.text_content)
-    words_for_readability = get_words_for_readability(new_lesson.text_content, lang_id)
-    new_lesson.readability_score = compute_readability(words_for_readability)
-    
     # Print debug information
     print(f"\n=== DEBUG: Adding new lesson ===")
     print(f"Title: {new_lesson.title}")
     print(f"Word count: {new_lesson.word_count}")
-    print(f"Readability score: {new_lesson.readability_score}")
     print(f"Language ID: {lang_id}")
     
     db.session.add(new_lesson)
@@ -1345,6 +1656,10 @@ def add_lesson_post(lang_id):
         db.session.rollback()
         print(f"Error committing to database: {e}")
         raise
+
+    # Analyze the text outside the request (readability shows as pending until done)
+    job_id = nlp_jobs.submit_readability("lesson", new_lesson.id)
+    app.logger.debug(f"Readability job {job_id} submitted for lesson {new_lesson.id}")
     flash(f'Lesson "{new_lesson.title}" added.', "success")
     return redirect(url_for("language_lessons", lang_name=language.name.lower()))
 
@@ -1370,6 +1685,8 @@ def delete_lesson(lesson_id):
     if lesson:
         # Store language name before deleting for redirect
         lang_name = lesson.language.name.lower()
+        discard_text_analysis(lesson.text_content, "lesson", lesson.id)
+        remove_document("lesson", lesson.id)
         db.session.delete(lesson)
         db.session.commit()
         flash(f'Lesson "{lesson.title}" deleted.', "success")
@@ -1412,12 +1729,15 @@ def update_lesson(lesson_id):
     video_file = request.files.get("video_file")  # Retrieve video file from request
 
     # Update text content and word count if text changed
-    if new_text != lesson.text_content:
+    text_changed = new_text != lesson.text_content
+    if text_changed:
+        # Drop the cached analysis of the old text unless another lesson/story uses it
+        discard_text_analysis(lesson.text_content, "lesson", lesson.id)
         lesson.text_content = new_text
         lesson.word_count = count_words(new_text)
-        # Recalculate readability score if text changed
-        words_for_readability = get_words_for_readability(lesson.text_content, lesson.language_id)
-        lesson.readability_score = compute_readability(words_for_readability)
+        # Readability and the sentence index are rebuilt in the background once the lesson is saved
+        lesson.readability_status = READABILITY_PENDING
+        lesson.sentence_index = None
         # Future: Invalidate/reset word statuses for this lesson?!
 
     # Handle optional media upload (video takes precedence over audio)
@@ -1537,6 +1857,8 @@ def update_lesson(lesson_id):
             f"DEBUG: Saving lesson {lesson_id}. YouTube URL being set to: {lesson.youtube_url}"
         )
         db.session.commit()
+        if text_changed:
+            nlp_jobs.submit_readability("lesson", lesson.id)
         flash(f'Lesson "{lesson.title}" updated.', "success")
         return redirect(
             url_for("language_lessons", lang_name=lesson.language.name.lower())
@@ -1562,31 +1884,30 @@ def get_vocab_status(lang_id):
     if not language:
         return jsonify(error="Language not found"), 404
 
-    vocab_data = (
-        db.session.query(
-            VocabTerm.term, VocabTerm.status, VocabTerm.translation
-        )
-        .filter(
-            VocabTerm.language_id == lang_id,
-            VocabTerm.term.in_([t.lower() for t in terms_list]),
-        )
-        .all()
-    )
+    # Snapshot or chunked lookups: no bound-parameter limit on the term list
+    result_dict = lookup_vocab_status(lang_id, [str(t) for t in terms_list])
 
-    vocab_dict = {
-        row.term: {"status": row.status, "translation": row.translation}
-        for row in vocab_data
-    }
+    return jsonify(vocab=result_dict)
 
-    result_dict = {}
-    for term in terms_list:
-        lower_term = term.lower()
-        if lower_term in vocab_dict:
-            result_dict[term] = vocab_dict[lower_term]
-        else:
-            result_dict[term] = {"status": 0, "translation": None}
 
-    return jsonify(vocab=result_dict)
+# --- API Endpoint to get vocabulary changes since a version (delta sync) ---
+@app.route("/api/vocab/<int:lang_id>/changes", methods=["GET"])
+def get_vocab_changes(lang_id):
+    """
+    Terms changed after ?since=<vocab version> as [term, status, translation]
+    (status null: the term was removed). since=0 returns every term with
+    full=true; the response's version is what to pass next time.
+    """
+    language = db.session.get(Language, lang_id)
+    if not language:
+        return jsonify(error="Language not found"), 404
+    try:
+        since = int(request.args.get("since", 0))
+    except ValueError:
+        return jsonify(error="since must be an integer"), 400
+
+    version, full, changes = changes_since(lang_id, since)
+    return jsonify(language_id=lang_id, version=version, full=full, changes=changes)
 
 
 # --- API Endpoint to UPDATE vocabulary status/translation ---
@@ -1642,6 +1963,7 @@ def update_vocab_term():
         if vocab_entry:
             # Update existing entry
             current_status = vocab_entry.status
+            readability_before = snapshot_lemmas(lang_id, [vocab_entry.lemma or vocab_entry.term])
             updated = False
             if new_status is not None and new_status != current_status:
                 vocab_entry.status = new_status
@@ -1659,15 +1981,13 @@ def update_vocab_term():
                 if lesson and lesson.text_content:
                     language = Language.query.get(lang_id)
                     if language and language.spacy_model_status == "available":
-                        nlp = get_spacy_model(language.name)
-                        if nlp:
-                            doc = nlp(lesson.text_content)
-                            found_sentence = None
-                            for sent in doc.sents:
-                                # Check if the lowercased original term (or lemma) is in the sentence
-                                if original_term.lower() in sent.text.lower():
-                                    found_sentence = sent.text.strip()
-                                    break
+                        # Precomputed per lesson (built once from the cached analysis)
+                        sentence_idx = load_sentence_index(lesson, "lesson")
+                        if sentence_idx:
+                            # Look the lowercased original term up in the term -> sentence map
+                            found_sentence = find_context_sentence(
+                                sentence_idx, lesson.text_content, original_term
+                            )
                             if found_sentence:
                                 vocab_entry.context_sentence = found_sentence
                                 updated = True
@@ -1703,6 +2023,9 @@ def update_vocab_term():
                 updated = True
 
             if updated:
+                if vocab_entry.status != current_status:
+                    # Keep the readability of lessons/stories using this lemma current
+                    apply_lemma_changes(lang_id, readability_before)
                 db.session.commit()
                 return jsonify(
                     success=True,
@@ -1711,6 +2034,7 @@ def update_vocab_term():
                     translation=vocab_entry.translation,
                 )
             else:
+                db.session.commit()  # Persist a newly cached lesson analysis, if any
                 return jsonify(
                     success=True,
                     message="No changes detected",
@@ -1739,29 +2063,27 @@ def update_vocab_term():
 
             # Perform lemmatization and context extraction if language model is available
             if language and language.spacy_model_status == "available":
-                nlp = get_spacy_model(language.name)
+                nlp = get_spacy_model(language.name, profile="lemma")
                 if nlp:
-                    # Lemmatization
-                    doc = nlp(original_term.strip())
-                    if doc and len(doc) > 0:
-                        found_lemma = doc[0].lemma_
-                        if found_lemma and found_lemma != "-PRON-": # Avoid generic pronoun lemmas
-                            lemma = found_lemma.lower()
-                        print(f"Lemmatized '{original_term}' to '{lemma}' for language '{language.name}'")
-                    else:
-                        print(f"spaCy could not process term: '{original_term}'")
+                    # Lemmatization (memoized per language, see text_processor.get_lemmas)
+                    lemma, _pos = get_lemmas([original_term], language.name).get(
+                        original_term.strip(), (lower_term, "")
+                    )
+                    print(f"Lemmatized '{original_term}' to '{lemma}' for language '{language.name}'")
 
                     # Extract context sentence if lesson_id provided and sentence is not already set
                     if lesson_id is not None and not sentence: # Only try to extract if frontend didn't provide it
                         lesson = db.session.get(Lesson, lesson_id)
+                        sentence_idx = None
                         if lesson and lesson.text_content:
-                            lesson_doc = nlp(lesson.text_content)
-                            for sent in lesson_doc.sents:
-                                if original_term.lower() in sent.text.lower():
-                                    extracted_context_sentence = sent.text.strip()
-                                    print(f"Extracted context sentence for NEW term '{original_term}': '{extracted_context_sentence}'")
-                                    break
-                            if not extracted_context_sentence:
+                            sentence_idx = load_sentence_index(lesson, "lesson")
+                        if sentence_idx:
+                            extracted_context_sentence = find_context_sentence(
+                                sentence_idx, lesson.text_content, original_term
+                            )
+                            if extracted_context_sentence:
+                                print(f"Extracted context sentence for NEW term '{original_term}': '{extracted_context_sentence}'")
+                            else:
                                 print(f"No context sentence found for NEW term '{original_term}' in lesson {lesson_id}")
                         else:
                             print(f"Lesson {lesson_id} not found or no text content for context sentence extraction.")
@@ -1788,7 +2110,9 @@ def update_vocab_term():
                 state="new"
             )
 
+            readability_before = snapshot_lemmas(lang_id, [lemma])
             db.session.add(new_entry)
+            apply_lemma_changes(lang_id, readability_before)
             db.session.commit()
             return jsonify(
                 success=True,
@@ -1819,28 +2143,104 @@ def update_vocab_term():
         return jsonify(error="An unexpected server error occurred."), 500
 
 
+# --- API Endpoint to UPDATE many vocabulary terms at once ---
+@app.route("/api/vocab/bulk_update", methods=["POST"])
+def bulk_update_vocab_terms():
+    """
+    Apply {term, status, translation, sentence} operations for one language
+    in a single transaction (see vocab_bulk.py), e.g. to mark every remaining
+    unknown word of a page as known. Optional lesson_id supplies context
+    sentences. Returns the resulting status of every term.
+    """
+    data = request.get_json()
+    if not data or "lang_id" not in data or "operations" not in data:
+        return jsonify(error="Missing required data (lang_id, operations)"), 400
+
+    language = db.session.get(Language, data["lang_id"])
+    if not language:
+        return jsonify(error="Language not found"), 404
+    lesson = None
+    if data.get("lesson_id") is not None:
+        lesson = db.session.get(Lesson, data["lesson_id"])
+        if lesson is None or lesson.language_id != language.id:
+            return jsonify(error="Lesson not found"), 404
+
+    try:
+        operations = parse_bulk_operations(data["operations"])
+    except BulkUpdateError as e:
+        return jsonify(error=str(e), index=e.index), 400
+
+    try:
+        results = bulk_update_terms(language, operations, lesson=lesson)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        app.logger.error(f"Database integrity error in bulk vocab update: {e}")
+        return jsonify(error="A database error occurred while saving the terms."), 409
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Unexpected error in bulk vocab update: {e}")
+        return jsonify(error="An unexpected server error occurred."), 500
+
+    return jsonify(
+        success=True,
+        version=language.vocab_version,
+        updated=sum(result["updated"] for result in results),
+        terms=results,
+    )
+
+
 # --- End Restore Vocab API Routes ---
 
 
-# --- API Endpoint to get ALL MULTI-WORD vocabulary terms for a language ---
+# --- API Endpoint to get MULTI-WORD vocabulary terms for a language ---
 @app.route("/api/multiword-terms/<int:lang_id>", methods=["GET"])
 def get_multiword_terms(lang_id):
-    # Query for terms containing at least one space
-    # Adjust this logic if multi-word terms can be defined differently
-    multiword_terms = (
-        VocabTerm.query.filter(
-            VocabTerm.language_id == lang_id,
-            VocabTerm.term.contains(" "),  # Simple check for spaces
-        )
-        .order_by(db.func.length(VocabTerm.term).desc())
-        .all()
-    )  # Order by length descending
+    """
+    Saved terms containing a space, longest first. With ?lesson_id= or
+    ?story_id= only the terms occurring in that text are returned, with the
+    spans (token indexes as parseText splits the text) where they occur.
+    """
+    item_type, item_id = None, None
+    for param, candidate in (("lesson_id", "lesson"), ("story_id", "story")):
+        if request.args.get(param):
+            item_type = candidate
+            try:
+                item_id = int(request.args[param])
+            except ValueError:
+                return jsonify(error=f"{param} must be an integer"), 400
+
+    if item_type is None:
+        # Query for terms containing at least one space
+        multiword_terms = (
+            VocabTerm.query.filter(
+                VocabTerm.language_id == lang_id,
+                VocabTerm.term.contains(" "),  # Simple check for spaces
+            )
+            .order_by(db.func.length(VocabTerm.term).desc())
+            .all()
+        )  # Order by length descending
+
+        terms_data = [
+            {"term": term.term, "status": term.status, "translation": term.translation}
+            for term in multiword_terms
+        ]
+        return jsonify(multiword_terms=terms_data)
+
+    item = db.session.get(Lesson if item_type == "lesson" else Story, item_id)
+    if not item or item.language_id != lang_id:
+        return jsonify(error=f"{item_type.capitalize()} not found"), 404
+    text = item.text_content if item_type == "lesson" else item.content
 
+    # Matched on the server against the language's phrase automaton
+    _, _, (matcher, phrases) = vocab_snapshots.lookup(lang_id, (), phrases=True)
+    spans = matcher.match_text(text)
+    matched = sorted({term for _, _, term in spans}, key=len, reverse=True)
     terms_data = [
-        {"term": term.term, "status": term.status, "translation": term.translation}
-        for term in multiword_terms
+        {"term": term, "status": phrases[term][0], "translation": phrases[term][1]}
+        for term in matched
     ]
-    return jsonify(multiword_terms=terms_data)
+    return jsonify(multiword_terms=terms_data, spans=[list(span) for span in spans])
 
 
 # ---------------------------------------------------------------------
@@ -1906,6 +2306,9 @@ RATING_MAP = {
     RATING_EASY: Rating.Easy,
 }
 
+# Answers accepted per /api/review/batch_update request
+REVIEW_BATCH_MAX_ANSWERS = 500
+
 
 @app.route("/api/review/<int:lang_id>", methods=["GET"])
 def get_review_cards(lang_id):
@@ -1913,34 +2316,9 @@ def get_review_cards(lang_id):
     if not language:
         return jsonify(error="Language not found"), 404
 
-    # Get SRS settings for the language
-    srs_settings = SRSSettings.query.filter_by(language_id=lang_id).first()
-    if not srs_settings:
-        srs_settings = SRSSettings(language_id=lang_id)
-        db.session.add(srs_settings)
-        db.session.commit()
-
-    now = datetime.now(timezone.utc)
-    app.logger.info(
-        f"DEBUG: get_review_cards called for lang_id={lang_id}. Current UTC time: {now}"
-    )
-
-    # Fetch cards with status between 1 and 5 (inclusive) for review
-    # FSRS will handle next review date, but we filter based on custom status here
-    review_terms_query = VocabTerm.query.filter(
-        VocabTerm.language_id == lang_id,
-        VocabTerm.status.in_([STATUS_LEVEL_1, STATUS_LEVEL_2, STATUS_LEVEL_3, STATUS_LEVEL_4, STATUS_LEVEL_5]),
-        VocabTerm.next_review_date <= now, # Only due cards
-    ).order_by(VocabTerm.next_review_date)
-
-    # Prioritize 'learning' state cards if they fall within the status range
-    # and then 'review' and 'relearning' states.
-    # This ensures new cards (status 1) are shown first if due.
-    due_review_cards = review_terms_query.limit(srs_settings.max_reviews_per_day).all()
-
-    app.logger.info(
-        f"DEBUG: Due review cards found ({len(due_review_cards)}): {[t.term for t in due_review_cards]}"
-    )
+    # Today's queue is selected once (SRSSettings limits) and then only read
+    build_queue(lang_id, rebuild=request.args.get("rebuild") == "1")
+    due_review_cards = queued_terms(lang_id)
 
     review_cards_data = []
     for term in due_review_cards:
@@ -1957,77 +2335,71 @@ def get_review_cards(lang_id):
                 "translation": term.translation,
                 "context_sentence": term.context_sentence,
                 "status": term.status, # Send custom status, not FSRS state
+                "last_rating": term.last_rating_type, # Lets the client predict the level change
                 "direction": current_direction, 
             }
         )
 
-    return jsonify(review_cards=review_cards_data)
+    return jsonify(review_cards=review_cards_data, queue=queue_counts(lang_id))
 
 
-@app.route("/api/review/update", methods=["POST"])
-def update_review_card():
-    data = request.get_json()
-    if (
-        not data
-        or "term_id" not in data
-        or "rating" not in data
-        or "direction" not in data
-    ):
-        return jsonify(error="Missing required data (term_id, rating, direction)"), 400
+def _aware_utc(value):
+    """A stored (naive UTC) datetime as an aware UTC datetime."""
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
 
-    term_id = data["term_id"]
-    rating_str = data["rating"]
-    direction = data["direction"]
 
-    term = db.session.get(VocabTerm, term_id)
-    if not term:
-        return jsonify(error="Term not found"), 404
+def _apply_review(term, rating_str, direction, reviewed_at, track_readability=True):
+    """
+    Apply one answer to a term: FSRS scheduling as of ``reviewed_at`` (aware
+    UTC), the custom level, and today's queue. Does not commit.
 
-    # Get FSRS rating
-    rating = RATING_MAP.get(rating_str)
-    if rating is None:
-        return jsonify(error="Invalid rating provided"), 400
+    With ``track_readability`` the readability of documents containing the
+    term is updated if its level changes; callers applying many answers pass
+    False and bracket the whole batch with snapshot_lemmas/apply_lemma_changes.
 
-    today = datetime.now(timezone.utc)
+    Returns the review_logs.record arguments of the answer.
+    """
+    rating = RATING_MAP[rating_str]
 
     # Calculate elapsed days
     elapsed_days = 0
-    if term.last_review_date:
-        # Ensure term.last_review_date is timezone-aware (assume UTC if naive)
-        aware_last_review_date = term.last_review_date
-        if term.last_review_date.tzinfo is None:
-            aware_last_review_date = term.last_review_date.replace(tzinfo=timezone.utc)
-
-        elapsed_days = (today - aware_last_review_date).days
-        if elapsed_days < 0:
-            elapsed_days = 0
+    last_review = _aware_utc(term.last_review_date)
+    if last_review:
+        elapsed_days = max((reviewed_at - last_review).days, 0)
 
     # Create FSRS card
     card = Card()
 
     # Set card attributes based on current term state for FSRS calculation
-    card.due = term.next_review_date or today
-    card.stability = max(term.stability, 0.1)  # Ensure minimum stability of 0.1
-    card.difficulty = term.difficulty
-    card.elapsed_days = elapsed_days
-    card.lapses = term.lapses
-    card.reps = term.reviews
+    card.due = _aware_utc(term.next_review_date) or reviewed_at
+    if last_review:
+        card.stability = max(term.stability, 0.1)  # Ensure minimum stability of 0.1
+        card.difficulty = term.difficulty
+        # Lets FSRS compute the card's actual retrievability (the fitted
+        # parameters of fsrs_optimizer.py assume it)
+        card.last_review = last_review
+    # else: never reviewed, FSRS starts from the initial stability/difficulty of the rating
     card.state = STATE_MAP.get(
         term.state, State.Learning
     )  # Use STATE_MAP with Learning as default
+    state_before = term.state or "new"
 
     # Review the card with FSRS
-    card, review_log = scheduler.review_card(card, rating)
+    card, review_log = scheduler_for(term.language_id, scheduler).review_card(card, rating, reviewed_at)
 
     # Update VocabTerm with FSRS results for scheduling
     term.difficulty = card.difficulty
     term.stability = card.stability
-    term.reviews = card.reps
-    term.lapses = card.lapses
+    # fsrs.Card does not count reviews or lapses
+    term.reviews = (term.reviews or 0) + 1
+    if rating == Rating.Again and STATE_MAP.get(state_before) == State.Review:
+        term.lapses = (term.lapses or 0) + 1
     term.state = card.state.name.lower() # Store FSRS state for internal tracking
-    term.interval = (card.due - today).days
+    term.interval = (card.due - reviewed_at).days
     term.next_review_date = card.due
-    term.last_review_date = today
+    term.last_review_date = reviewed_at
     term.last_reviewed_direction = direction
 
     # --- Custom Leveling Logic (overrides FSRS status for display/custom behavior) ---
@@ -2055,15 +2427,170 @@ def update_review_card():
                 new_status = STATUS_LEVEL_1
         # If not consecutive 'Again', new_status remains old_status (pass)
 
-    term.status = new_status # Apply the determined new status
+    if new_status != old_status:
+        readability_before = snapshot_lemmas(term.language_id, [term.lemma or term.term]) if track_readability else None
+        term.status = new_status # Apply the determined new status
+        if track_readability:
+            apply_lemma_changes(term.language_id, readability_before)
 
     # Store the current rating type for the next review
     term.last_rating_type = rating_str
 
+    # Take the card off today's queue (or back to its end if due again today)
+    dequeue(term, reviewed_at)
+
+    return (term, review_log.rating.value, reviewed_at, elapsed_days, term.interval, state_before, card.state.value)
+
+
+@app.route("/api/review/update", methods=["POST"])
+def update_review_card():
+    data = request.get_json()
+    if (
+        not data
+        or "term_id" not in data
+        or "rating" not in data
+        or "direction" not in data
+    ):
+        return jsonify(error="Missing required data (term_id, rating, direction)"), 400
+
+    term_id = data["term_id"]
+    rating_str = data["rating"]
+    direction = data["direction"]
+
+    term = db.session.get(VocabTerm, term_id)
+    if not term:
+        return jsonify(error="Term not found"), 404
+
+    # Get FSRS rating
+    if rating_str not in RATING_MAP:
+        return jsonify(error="Invalid rating provided"), 400
+
+    review = _apply_review(term, rating_str, direction, datetime.now(timezone.utc))
     db.session.commit()
+    # Buffered; written with the next batch
+    review_logs.record(*review)
+    forecasts.invalidate(term.language_id)
     return jsonify(success=True, new_status=term.status)
 
 
+def _parse_answered_at(value, now):
+    """Answer time from epoch milliseconds or an ISO 8601 string, never later than ``now``."""
+    if isinstance(value, bool):
+        raise ValueError("invalid answered_at")
+    if isinstance(value, (int, float)):
+        answered_at = datetime.fromtimestamp(value / 1000.0, timezone.utc)
+    elif isinstance(value, str):
+        answered_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        answered_at = _aware_utc(answered_at).astimezone(timezone.utc)
+    else:
+        raise ValueError("invalid answered_at")
+    # The client's clock may run ahead of ours
+    return min(answered_at, now)
+
+
+@app.route("/api/review/batch_update", methods=["POST"])
+def batch_update_review_cards():
+    """
+    Apply queued review answers in one transaction.
+
+    Request: {"answers": [{"term_id", "rating", "direction", "answered_at"}, ...]}
+    with answered_at in epoch milliseconds (or ISO 8601). Answers are applied
+    in answer order with their own timestamps. An answer not newer than the
+    term's last review was already applied (e.g. a batch sent again after a
+    lost response) and is skipped, so resending a batch is safe.
+
+    Response: {"success": true, "applied": n, "results": [{"term_id",
+    "new_status", "skipped"}, ...]} in request order. Unknown terms are
+    reported as skipped; an invalid answer rejects the whole batch (400).
+    """
+    data = request.get_json(silent=True)
+    answers = data.get("answers") if isinstance(data, dict) else None
+    if not isinstance(answers, list):
+        return jsonify(error="Missing required data (answers)"), 400
+    if len(answers) > REVIEW_BATCH_MAX_ANSWERS:
+        return jsonify(error=f"At most {REVIEW_BATCH_MAX_ANSWERS} answers per batch"), 400
+
+    now = datetime.now(timezone.utc)
+    parsed = []
+    for index, answer in enumerate(answers):
+        if not isinstance(answer, dict) or not all(key in answer for key in ("term_id", "rating", "direction", "answered_at")):
+            return jsonify(error="Missing required data (term_id, rating, direction, answered_at)", index=index), 400
+        if answer["rating"] not in RATING_MAP:
+            return jsonify(error="Invalid rating provided", index=index), 400
+        try:
+            term_id = int(answer["term_id"])
+            answered_at = _parse_answered_at(answer["answered_at"], now)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return jsonify(error="Invalid term_id or answered_at", index=index), 400
+        parsed.append((answered_at, index, term_id, answer["rating"], answer["direction"]))
+
+    terms = {}
+    term_ids = list({item[2] for item in parsed})
+    for i in range(0, len(term_ids), LOOKUP_CHUNK_SIZE):
+        for term in VocabTerm.query.filter(VocabTerm.id.in_(term_ids[i:i + LOOKUP_CHUNK_SIZE])):
+            terms[term.id] = term
+
+    # One readability snapshot per language for the whole batch
+    readability_before = {}
+    for term in terms.values():
+        readability_before.setdefault(term.language_id, set()).add(term.lemma or term.term)
+    readability_before = {
+        language_id: snapshot_lemmas(language_id, lemmas) for language_id, lemmas in readability_before.items()
+    }
+
+    results = [None] * len(parsed)
+    reviews = []
+    try:
+        for answered_at, index, term_id, rating_str, direction in sorted(parsed, key=lambda item: (item[0], item[1])):
+            term = terms.get(term_id)
+            last_review = _aware_utc(term.last_review_date) if term else None
+            if term is None or (last_review is not None and answered_at <= last_review):
+                results[index] = {"term_id": term_id, "new_status": term.status if term else None, "skipped": True}
+                continue
+            reviews.append(_apply_review(term, rating_str, direction, answered_at, track_readability=False))
+            results[index] = {"term_id": term_id, "new_status": term.status, "skipped": False}
+
+        for language_id, before in readability_before.items():
+            apply_lemma_changes(language_id, before)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error applying review batch: {e}")
+        return jsonify(error="An internal error occurred while saving the reviews."), 500
+
+    for review in reviews:
+        review_logs.record(*review)
+    for language_id in {review[0].language_id for review in reviews}:
+        forecasts.invalidate(language_id)
+    return jsonify(success=True, applied=len(reviews), results=results)
+
+
+@app.route("/api/srs/forecast/<int:lang_id>", methods=["GET"])
+def srs_forecast_api(lang_id):
+    """
+    Current predicted recall of the review deck and the reviews expected per
+    day over the next ``days`` (default 30, at most 365). See srs_forecast.py.
+    """
+    language = db.session.get(Language, lang_id)
+    if not language:
+        return jsonify(error="Language not found"), 404
+    try:
+        days = int(request.args.get("days", 30))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        return jsonify(error=f"days must be between 1 and {MAX_FORECAST_DAYS}"), 400
+
+    settings = SRSSettings.query.filter_by(language_id=lang_id).first()
+    new_per_day = settings.new_cards_per_day if settings else 20
+    try:
+        result = forecasts.get(lang_id, days, scheduler_for(lang_id, scheduler), new_per_day)
+    except Exception as e:
+        app.logger.error(f"Error building review forecast for language {lang_id}: {e}")
+        return jsonify(error="Could not build the forecast."), 500
+    return jsonify(result)
+
+
 # --- End SRS / Review API Endpoints ---
 
 
@@ -2097,6 +2624,190 @@ def debug_cards(lang_id):
 # --- End Debug Route ---
 
 
+# --- Debug Route for spaCy Model Cache ---
+@app.route("/debug/spacy_models", methods=["GET"])
+def debug_spacy_models():
+    return jsonify(model_registry.stats())
+
+
+# --- End Debug Route ---
+
+
+# --- Background NLP Job Status API ---
+@app.route("/api/nlp_jobs", methods=["GET"])
+def nlp_jobs_stats():
+    return jsonify(nlp_jobs.stats())
+
+
+@app.route("/api/nlp_jobs/<job_id>", methods=["GET"])
+def nlp_job_status(job_id):
+    job = nlp_jobs.get_job(job_id)
+    if job is None:
+        return jsonify(error="Job not found"), 404
+    return jsonify(job)
+
+
+@app.route("/api/readability/<item_type>/<int:item_id>", methods=["GET"])
+def get_readability_status(item_type, item_id):
+    if item_type == "lesson":
+        item = db.session.get(Lesson, item_id)
+    elif item_type == "story":
+        item = db.session.get(Story, item_id)
+    else:
+        return jsonify(error="Invalid item type specified (must be 'lesson' or 'story')"), 400
+    if not item:
+        return jsonify(error=f"{item_type.capitalize()} not found"), 404
+    return jsonify(
+        status=item.readability_status or "ready",
+        readability_score=item.readability_score,
+    )
+
+
+# --- End Background NLP Job Status API ---
+
+
+# --- Sentence Lookup API ---
+@app.route("/api/sentences/<item_type>/<int:item_id>", methods=["GET"])
+def get_item_sentences(item_type, item_id):
+    """
+    Sentences of a lesson/story that use a word form (?term=) and/or lemma (?lemma=).
+    Without either parameter, all sentences are returned.
+    """
+    if item_type == "lesson":
+        item = db.session.get(Lesson, item_id)
+    elif item_type == "story":
+        item = db.session.get(Story, item_id)
+    else:
+        return jsonify(error="Invalid item type specified (must be 'lesson' or 'story')"), 400
+    if not item:
+        return jsonify(error=f"{item_type.capitalize()} not found"), 404
+
+    index = load_sentence_index(item, item_type, commit=True)
+    if index is None:
+        return jsonify(error="Sentence index unavailable (no spaCy model for this language)."), 503
+
+    term = request.args.get("term")
+    lemma = request.args.get("lemma")
+    limit = request.args.get("limit", 50, type=int)
+    if term or lemma:
+        ids = sentence_ids_for(index, term=term, lemma=lemma)
+    else:
+        ids = range(len(index["sentences"]))
+    text = item.text_content if item_type == "lesson" else item.content
+    sentences = [
+        {"id": sentence_id, "text": sentence_text(index, text, sentence_id)}
+        for sentence_id in list(ids)[:limit]
+    ]
+    return jsonify(sentences=sentences, total=len(ids))
+
+
+# --- End Sentence Lookup API ---
+
+
+# --- Lesson Recommendation API ---
+@app.route("/api/recommend/<int:lang_id>", methods=["GET"])
+def recommend_lessons(lang_id):
+    """
+    Lessons/stories whose comprehension is closest to ?target= (known-token
+    ratio 0..1, default 0.95). ?k= limits the results (default 10, max 100);
+    ?reinforce= (0..1) favours texts with more lemmas currently being learned.
+    """
+    language = db.session.get(Language, lang_id)
+    if not language:
+        return jsonify(error="Language not found"), 404
+    try:
+        target = float(request.args.get("target", 0.95))
+        k = int(request.args.get("k", 10))
+        reinforce = float(request.args.get("reinforce", 0.0))
+    except ValueError:
+        return jsonify(error="target, k and reinforce must be numbers"), 400
+    if not 0.0 <= target <= 1.0:
+        return jsonify(error="target must be between 0 and 1"), 400
+    k = max(1, min(k, 100))
+    reinforce = max(0.0, min(reinforce, 1.0))
+
+    results = recommend(lang_id, target=target, k=k, reinforce=reinforce)
+
+    # Titles and links for the k results only
+    titles = {}
+    for item_type, Model in (("lesson", Lesson), ("story", Story)):
+        ids = [r["id"] for r in results if r["type"] == item_type]
+        if ids:
+            for item_id, title in db.session.query(Model.id, Model.title).filter(Model.id.in_(ids)):
+                titles[(item_type, item_id)] = title
+    for result in results:
+        result["title"] = titles.get((result["type"], result["id"]))
+        result["readability_score"] = round(result["comprehension"] * 100, 2)
+        if result["type"] == "lesson":
+            result["url"] = url_for("reader", lang_name=language.name.lower(), lesson_id=result["id"])
+        else:
+            result["url"] = url_for("read_story", story_id=result["id"])
+
+    return jsonify(language_id=lang_id, target=target, k=k, reinforce=reinforce, results=results)
+
+
+# --- End Lesson Recommendation API ---
+
+
+# --- Word Status Report API ---
+@app.route("/api/reports/word_status/<int:lang_id>", methods=["GET"])
+def word_status_report_api(lang_id):
+    """
+    Word-status histogram of every lesson/story of a language.
+    ?mode=lemma|surface (default lemma), ?stories=0 to skip stories,
+    ?format=csv for a CSV download instead of JSON.
+    """
+    language = db.session.get(Language, lang_id)
+    if not language:
+        return jsonify(error="Language not found"), 404
+    mode = request.args.get("mode", "lemma")
+    if mode not in word_status_report.MODES:
+        return jsonify(error=f"mode must be one of {', '.join(word_status_report.MODES)}"), 400
+    include_stories = request.args.get("stories", "1") not in ("0", "false", "no")
+
+    rows = list(word_status_report.language_report(language, mode, include_stories=include_stories))
+    if request.args.get("format") == "csv":
+        return Response(
+            word_status_report.rows_to_csv(rows),
+            mimetype="text/csv",
+            headers={
+                "Content-Disposition": f'attachment; filename="word_status_{language.name.lower()}_{mode}.csv"'
+            },
+        )
+    return jsonify(language=language.name, mode=mode, documents=rows)
+
+
+# --- End Word Status Report API ---
+
+
+# --- Reader Payload API ---
+@app.route("/api/reader/<int:lesson_id>", methods=["GET"])
+def reader_payload_api(lesson_id):
+    """
+    Everything the reader needs for first paint (tokens, statuses, multiword
+    spans, timestamps, offset; see reader_payload.py). Served with an ETag
+    that changes with the lesson or the language's vocabulary, so reopening
+    an unchanged lesson is a 304.
+    """
+    lesson = db.session.get(Lesson, lesson_id)
+    if not lesson:
+        return jsonify(error="Lesson not found"), 404
+
+    key, etag = payload_key(lesson)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        key, body = reader_payload(lesson, key)
+        etag = payload_etag(*key)
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# --- End Reader Payload API ---
+
+
 # --- Temporary Backfill Route for FSRS Data ---
 @app.route("/backfill_fsrs_data")
 def backfill_fsrs_data():
@@ -2416,7 +3127,34 @@ def import_vocab(lang_id):
             vt.term: vt for vt in VocabTerm.query.filter_by(language_id=lang_id).all()
         }
 
-        for row in csv_reader:
+        # --- Lemmatize all new terms in one batched pass ---
+        rows = list(csv_reader)
+        new_term_strs = [
+            row[term_idx].strip()
+            for row in rows
+            if len(row) > term_idx
+            and row[term_idx].strip()
+            and row[term_idx].strip().lower() not in existing_terms
+        ]
+        lemmas = {}
+        if new_term_strs and language.spacy_model_status == "available":
+            lemmas = get_lemmas(new_term_strs, language.name)
+            print(f"Lemmatized {len(lemmas)} new terms for import into {language.name}")
+
+        # Statuses of every lemma the import can touch, for the readability update
+        affected_lemmas = set()
+        for row in rows:
+            if len(row) <= term_idx or not row[term_idx].strip():
+                continue
+            term_str = row[term_idx].strip()
+            existing_term = existing_terms.get(term_str.lower())
+            if existing_term is not None:
+                affected_lemmas.add(existing_term.lemma or existing_term.term)
+            else:
+                affected_lemmas.add(lemmas.get(term_str, (term_str.lower(), ""))[0])
+        readability_before = snapshot_lemmas(lang_id, affected_lemmas)
+
+        for row in rows:
             try:
                 if len(row) <= max(term_idx, trans_idx, status_idx):
                     skipped_count += 1  # Skip rows that don't have enough columns
@@ -2489,7 +3227,7 @@ def import_vocab(lang_id):
                     new_term = VocabTerm(
                         language_id=lang_id,
                         term=lower_term,  # Store lowercase
-                        lemma=lower_term,  # Default lemma
+                        lemma=lemmas.get(term_str, (lower_term, ""))[0],  # Default lemma is the term
                         translation=translation_str,
                         status=status_int,
                         context_sentence=context_str,
@@ -2508,7 +3246,9 @@ def import_vocab(lang_id):
                 error_count += 1
                 db.session.rollback()  # Rollback potential partial add for this row
 
-        # Commit all changes at the end
+        # Update the readability of documents using the imported lemmas, then
+        # commit all changes at the end
+        apply_lemma_changes(lang_id, readability_before)
         db.session.commit()
         flash(
             f"Import complete for {language.name}. Added: {imported_count}, Updated: {updated_count}, Skipped: {skipped_count}, Errors: {error_count}",
@@ -2584,6 +3324,9 @@ def update_srs_settings(lang_id):
         # TODO: Add validation for learning_steps format (numbers separated by space)
 
         db.session.commit()
+        # Apply the new daily limits to today's queue (if it was built already)
+        if ReviewQueueEntry.query.filter_by(language_id=lang_id, day=queue_day()).first():
+            build_queue(lang_id, rebuild=True)
         flash(f"Review settings updated for {language.name}.", "success")
     except ValueError as e:
         db.session.rollback()
@@ -2730,6 +3473,7 @@ def generate_ai_story(lang_id):
             grammar_summary=None,  # Initialize as None
             created_at=datetime.utcnow(),
             readability_score=0.0, # New field for readability
+            readability_status=READABILITY_PENDING,  # Scored in the background once saved
         )
         db.session.add(new_story)
         db.session.flush()  # Flush to get the ID without full commit yet
@@ -2747,6 +3491,7 @@ def generate_ai_story(lang_id):
         if not elevenlabs_api_key:
             # Commit the story text before returning the error
             db.session.commit()
+            nlp_jobs.submit_readability("story", story_id)
             app.logger.warning(
                 f"Story {story_id} created, but ElevenLabs API key not configured. Skipping TTS."
             )
@@ -2803,6 +3548,7 @@ def generate_ai_story(lang_id):
             # Log the error but don't fail the whole request
             # The story text is already saved
             db.session.commit()  # Commit the story text even if TTS fails
+            nlp_jobs.submit_readability("story", story_id)
             app.logger.error(
                 f"ElevenLabs API error or file save error for story {story_id}: {e}"
             )
@@ -2833,6 +3579,7 @@ def generate_ai_story(lang_id):
         app.logger.info(
             f"Story {story_id} fully saved (Audio: {generated_audio_filename})"
         )
+        nlp_jobs.submit_readability("story", story_id)
     except Exception as e:
         db.session.rollback()
         app.logger.error(
@@ -2948,6 +3695,21 @@ def get_grammar_summary(item_type, item_id):
     cefr_level = language.level or "intermediate"  # Default level if not set
     lang_name = language.name
 
+    # Keep the prompt bounded for long texts, cutting at a sentence boundary
+    max_chars = app.config["GRAMMAR_SUMMARY_MAX_CHARS"]
+    if max_chars and len(text_content) > max_chars:
+        analysis = get_text_analysis(text_content, lang_name)
+        cut = 0
+        if analysis:
+            for start, end in analysis.sentences:
+                if end > max_chars:
+                    break
+                cut = end
+        text_content = text_content[: cut or max_chars].strip()
+        app.logger.info(
+            f"Trimmed {item_type} {item_id} to {len(text_content)} characters for grammar summary"
+        )
+
     # Construct the prompt
     prompt = (
         f"You are an expert language tutor. Analyze the following {lang_name} text "
@@ -3070,7 +3832,6 @@ def analyze_text():
         }), 400
     
     try:
-        from .vocab_utils import process_text_for_vocab
         analysis = process_text_for_vocab(data['text'], data['language_id'])
         return jsonify({
             'success': True,
@@ -3227,6 +3988,7 @@ def download_and_update_status(language_id, model_name):
         if language:
             success = download_spacy_model_async(model_name)
             if success:
+                model_registry.forget_failure(model_name)
                 language.spacy_model_status = "available"
                 logging.info(
                     f"Model for {language.name} successfully downloaded and status updated."
@@ -3281,33 +4043,24 @@ def backfill_vocab_reviews_data():
 
 @app.route("/backfill_readability_scores")
 def backfill_readability_scores():
-    from vocab_utils import compute_readability, get_words_for_readability
-    # Use the model registry to avoid circular import
-    Lesson = db.Model.registry._class_registry.get("Lesson")
-    Story = db.Model.registry._class_registry.get("Story")
-
-    updated_lessons_count = 0
-    updated_stories_count = 0
-
     try:
-        lessons = Lesson.query.all()
-        for lesson in lessons:
-            if lesson.text_content:
-                words_data = get_words_for_readability(lesson.text_content, lesson.language_id)
-                lesson.readability_score = compute_readability(words_data)
-                db.session.add(lesson)
-                updated_lessons_count += 1
-
-        stories = Story.query.all()
-        for story in stories:
-            if story.content:
-                words_data = get_words_for_readability(story.content, story.language_id)
-                story.readability_score = compute_readability(words_data)
-                db.session.add(story)
-                updated_stories_count += 1
-
+        # Documents that already have a lemma index are rescored in one
+        # matrix-vector product per language (see readability_matrix.py)
+        rescored = 0
+        for (language_id,) in db.session.query(DocumentLemma.language_id).distinct():
+            rescored += rescore_language(language_id)
         db.session.commit()
-        flash(f"Successfully backfilled readability scores for {updated_lessons_count} lessons and {updated_stories_count} stories!", "success")
+
+        # The rest are analyzed in batches by a background thread; large
+        # libraries are better served by `flask backfill-readability`
+        if background_backfill.start(app):
+            flash(
+                f"Rescored {rescored} analyzed lessons/stories; analyzing the rest in the background "
+                f"(progress: /api/readability/backfill).",
+                "success",
+            )
+        else:
+            flash(f"Rescored {rescored} analyzed lessons/stories; a backfill is already running.", "info")
 
     except Exception as e:
         db.session.rollback()
@@ -3317,6 +4070,12 @@ def backfill_readability_scores():
     return redirect(url_for("dashboard"))
 
 
+@app.route("/api/readability/backfill", methods=["GET"])
+def readability_backfill_status():
+    """Progress of the background readability backfill."""
+    return jsonify(background_backfill.status())
+
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()  # Create tables if they don't exist
@@ -0,0 +1,81 @@
+"""
+Compare chunked analysis (text_processor.pipe_text_chunks) with a single-Doc run.
+
+For texts of growing length it reports the time and peak traced memory of
+each run, and how far the lemma counts differ (chunk borders can change the
+tokenization of a few words, nothing more). The "single" and "chunked" runs
+build a text_processor.TextSummary (lemma counts, ignored words, sentence
+offsets) as readability does; the chunked peak should stay flat as the text
+grows. The "analysis" run builds the TextAnalysis token table and its JSON as
+the analysis cache stores them, which grows linearly with the text.
+
+Usage:
+    python benchmark_chunked_analysis.py --model en_core_web_sm --text-file lesson.txt
+    python benchmark_chunked_analysis.py --model en_core_web_sm --text-file lesson.txt --sizes 1 10 50
+"""
+import argparse
+import time
+import tracemalloc
+
+from model_registry import load_pipeline
+from text_analysis import TextAnalysis
+from text_processor import TEXT_CHUNK_CHARS, pipe_text_chunks, summarize_chunks
+
+
+def summary_counts(chunk_docs):
+    summary = summarize_chunks(chunk_docs)
+    return summary.lemma_counts, summary.words
+
+
+def analysis_counts(nlp, text, chunk_chars):
+    """Lemma counts through the analysis cache's token table and its stored JSON."""
+    analysis = TextAnalysis.from_chunks(text, pipe_text_chunks(nlp, text, chunk_chars))
+    analysis.to_json()
+    summary = analysis.summary()
+    return summary.lemma_counts, summary.words
+
+
+def measure(label, run):
+    tracemalloc.start()
+    started = time.perf_counter()
+    counts, tokens = run()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<8} {seconds:>8.2f}s  peak {peak / (1024 * 1024):>8.1f} MB  {tokens:>9,} words")
+    return counts, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", required=True, help="spaCy model name or path")
+    parser.add_argument("--text-file", required=True, help="Text to repeat up to each size")
+    parser.add_argument("--profile", default="analysis", help="Pipeline profile to load")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.5, 2, 8],
+                        help="Text sizes in MB")
+    parser.add_argument("--chunk-chars", type=int, default=TEXT_CHUNK_CHARS)
+    args = parser.parse_args()
+
+    nlp = load_pipeline(args.model, args.profile)
+    with open(args.text_file, encoding="utf-8") as f:
+        sample = f.read().strip() + "\n\n"
+
+    for size_mb in args.sizes:
+        target = int(size_mb * 1024 * 1024)
+        text = sample * max(1, target // len(sample))
+        print(f"\n{len(text) / (1024 * 1024):.1f} MB of text")
+
+        nlp.max_length = max(nlp.max_length, len(text) + 1)
+        single, single_tokens = measure("single", lambda: summary_counts([(0, nlp(text))]))
+        chunked, chunked_tokens = measure(
+            "chunked", lambda: summary_counts(pipe_text_chunks(nlp, text, args.chunk_chars))
+        )
+        measure("analysis", lambda: analysis_counts(nlp, text, args.chunk_chars))
+
+        differing = sum(abs(single[k] - chunked[k]) for k in set(single) | set(chunked))
+        print(f"  lemma count difference: {differing} of {single_tokens:,} words "
+              f"({differing / max(single_tokens, 1):.4%})")
+
+
+if __name__ == "__main__":
+    main()
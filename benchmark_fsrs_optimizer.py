@@ -0,0 +1,85 @@
+"""
+Benchmark the NumPy FSRS optimizer on a simulated review history.
+
+Simulates cards reviewed with fsrs.Scheduler under known ("true") parameters,
+recall drawn from the scheduler's own retrievability, then times one
+loss/gradient replay and a full fit with fsrs_optimizer, and compares the log
+loss of the default, fitted and true parameters.
+
+Usage:
+    python benchmark_fsrs_optimizer.py
+    python benchmark_fsrs_optimizer.py --reviews 100000 --iterations 100
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from fsrs import Card, Rating, Scheduler
+from fsrs.scheduler import DEFAULT_PARAMETERS, LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS
+
+from fsrs_optimizer import ReviewHistory, fit_parameters, loss_and_gradient
+
+
+def true_parameters(rng):
+    return [
+        min(max(w * rng.uniform(0.7, 1.3), low), high)
+        for w, low, high in zip(DEFAULT_PARAMETERS, LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS)
+    ]
+
+
+def simulate(parameters, n_reviews, reviews_per_card, rng):
+    """(term ids, timestamps, ratings) of simulated reviews."""
+    scheduler = Scheduler(parameters=parameters, enable_fuzzing=False)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    term_ids, timestamps, ratings = [], [], []
+    card_id = 0
+    while len(ratings) < n_reviews:
+        card = Card()
+        now = start + timedelta(days=rng.uniform(0, 30))
+        for _ in range(reviews_per_card):
+            if card.last_review is None:
+                rating = Rating(rng.choices([1, 2, 3, 4], [0.2, 0.1, 0.6, 0.1])[0])
+            else:
+                recalled = rng.random() < scheduler.get_card_retrievability(card, now)
+                rating = Rating(rng.choices([2, 3, 4], [0.15, 0.75, 0.1])[0]) if recalled else Rating.Again
+            card, _ = scheduler.review_card(card, rating, now)
+            term_ids.append(card_id)
+            timestamps.append(now.timestamp())
+            ratings.append(int(rating))
+            # Reviewed when due, sometimes late
+            now = card.due + timedelta(days=rng.expovariate(1 / 3) if card.due - now > timedelta(days=1) else 0)
+        card_id += 1
+    return np.array(term_ids), np.array(timestamps), np.array(ratings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=100000, help="Simulated reviews")
+    parser.add_argument("--reviews-per-card", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=40, help="Adam iterations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    truth = true_parameters(rng)
+    started = time.perf_counter()
+    history = ReviewHistory(*simulate(truth, args.reviews, args.reviews_per_card, rng))
+    print(
+        f"{history.n_reviews} reviews of {history.n_cards} cards ({history.n_predicted} predicted), "
+        f"simulated in {time.perf_counter() - started:.1f}s"
+    )
+
+    started = time.perf_counter()
+    loss_and_gradient(DEFAULT_PARAMETERS, history)
+    print(f"  loss + gradient:   {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    started = time.perf_counter()
+    fitted, loss, default_loss = fit_parameters(history, iterations=args.iterations)
+    print(f"  fit ({args.iterations} iter.):   {time.perf_counter() - started:8.2f} s")
+    print(f"  log loss: default {default_loss:.4f}, fitted {loss:.4f}, true {loss_and_gradient(truth, history)[0]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark multiword term matching: Aho–Corasick automaton vs the reader's scan.
+
+Generates a text and a set of saved phrases (half of them taken from the text,
+half not occurring) and compares multiword_matcher.PhraseMatcher with a port
+of buildStyledParagraphHtml's loop (every phrase tried at every word), checking
+that both find the same spans.
+
+Usage:
+    python benchmark_multiword_matcher.py
+    python benchmark_multiword_matcher.py --words 5000 --phrases 2000
+"""
+import argparse
+import random
+import re
+import time
+
+from multiword_matcher import PhraseMatcher
+import word_tokenizer
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def scan_match(tokens, phrases):
+    """The reader's matching, paragraph by paragraph, longest phrase first."""
+    phrases = sorted(phrases, key=len, reverse=True)
+    lowered = [phrase.lower() for phrase in phrases]
+    spans = []
+    paragraph_start = 0
+    for position, (kind, text) in enumerate(tokens + [("separator", "\n")]):
+        if kind != "separator" or "\n" not in text:
+            continue
+        paragraph = tokens[paragraph_start:position + 1]
+        i = 0
+        while i < len(paragraph):
+            match = None
+            if paragraph[i][0] == "word":
+                for phrase, lower in zip(phrases, lowered):
+                    candidate = ""
+                    for j in range(i, len(paragraph)):
+                        candidate += paragraph[j][1]
+                        normalized = _whitespace_re.sub(" ", candidate).strip().lower()
+                        if normalized == lower:
+                            match = (paragraph_start + i, paragraph_start + j + 1, phrase)
+                            break
+                        if len(normalized) > len(lower):
+                            # The browser keeps going to the end of the paragraph
+                            break
+                    if match:
+                        break
+            if match:
+                spans.append(match)
+                i = match[1] - paragraph_start
+            else:
+                i += 1
+        paragraph_start = position + 1
+    return spans
+
+
+def synthetic(words, phrases, seed):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(max(words // 10, 50))]
+    parts = []
+    for i in range(words):
+        parts.append(rng.choice(vocabulary))
+        parts.append(rng.choice([" ", " ", " ", ", ", ".\n"]) if i % 40 else ".\n")
+    text = "".join(parts)
+    tokens = word_tokenizer.parse_text(text)
+    word_positions = [i for i, (kind, _) in enumerate(tokens) if kind == "word"]
+    saved = set()
+    while len(saved) < phrases // 2:
+        start = rng.choice(word_positions)
+        end = min(start + 2 * rng.randint(1, 3) + 1, len(tokens))
+        phrase = "".join(text for _, text in tokens[start:end]).strip()
+        if " " in phrase and "\n" not in phrase:
+            saved.add(phrase.lower())
+    while len(saved) < phrases:
+        saved.add(" ".join(f"x{rng.randrange(10 * phrases)}" for _ in range(rng.randint(2, 4))))
+    return text, tokens, sorted(saved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, default=1500, help="Words in the text")
+    parser.add_argument("--phrases", type=int, default=1000, help="Saved multiword terms")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text, tokens, phrases = synthetic(args.words, args.phrases, args.seed)
+    print(f"{len(tokens)} tokens, {len(phrases)} phrases")
+
+    started = time.perf_counter()
+    matcher = PhraseMatcher(phrases)
+    print(f"  build automaton:   {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    started = time.perf_counter()
+    spans = matcher.match(tokens)
+    print(f"  automaton match:   {(time.perf_counter() - started) * 1000:8.1f} ms ({len(spans)} spans)")
+
+    started = time.perf_counter()
+    expected = scan_match(tokens, phrases)
+    print(f"  reader scan:       {(time.perf_counter() - started) * 1000:8.1f} ms ({len(expected)} spans)")
+    print(f"  same spans:        {spans == expected}")
+
+
+if __name__ == "__main__":
+    main()
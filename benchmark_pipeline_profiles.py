@@ -0,0 +1,107 @@
+"""
+Benchmark spaCy pipeline profiles (full / lemma / sentences) on lesson-sized texts.
+
+For every language with an installed model, the lessons and stories stored for
+that language are run through each profile and the tokens/sec throughput is
+reported together with the speed-up over the full pipeline.
+
+Usage:
+    python benchmark_pipeline_profiles.py                  # all languages in app.db
+    python benchmark_pipeline_profiles.py --language Spanish --repeat 5
+    python benchmark_pipeline_profiles.py --model en_core_web_sm --text-file lesson.txt
+"""
+import argparse
+import time
+
+from model_registry import load_pipeline
+
+PROFILES = ["full", "lemma", "sentences"]
+
+
+def time_profile(nlp, texts, repeat):
+    """Return (tokens, seconds) for ``repeat`` passes of ``texts`` through ``nlp``."""
+    # Warm-up so one-off allocations are not counted
+    for _ in nlp.pipe(texts[:1]):
+        pass
+    tokens = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for doc in nlp.pipe(texts, batch_size=16):
+            tokens += len(doc)
+    return tokens, time.perf_counter() - started
+
+
+def benchmark_model(label, model_name, texts, repeat):
+    print(f"\n{label} ({model_name}): {len(texts)} texts, "
+          f"{sum(len(t) for t in texts) / max(len(texts), 1):.0f} chars avg")
+    results = {}
+    for profile in PROFILES:
+        try:
+            nlp = load_pipeline(model_name, profile)
+        except OSError as e:
+            print(f"  Model not installed: {e}")
+            return results
+        tokens, seconds = time_profile(nlp, texts, repeat)
+        results[profile] = tokens / seconds if seconds else 0.0
+        speedup = results[profile] / results["full"] if results.get("full") else 1.0
+        print(f"  {profile:<10} {results[profile]:>12,.0f} tokens/sec  "
+              f"x{speedup:.2f}  components: {', '.join(nlp.pipe_names)}")
+    return results
+
+
+def lesson_texts_by_language(language_filter=None, limit=50):
+    """Yield (language name, model name, texts) for every language with stored texts."""
+    from app import app
+    from extensions import db, resolve_spacy_model_name
+
+    with app.app_context():
+        Language = db.Model.registry._class_registry.get("Language")
+        Lesson = db.Model.registry._class_registry.get("Lesson")
+        Story = db.Model.registry._class_registry.get("Story")
+
+        for lang in Language.query.order_by(Language.name):
+            if language_filter and lang.name.lower() != language_filter.lower():
+                continue
+            model_name = resolve_spacy_model_name(lang.name)
+            if not model_name:
+                print(f"\n{lang.name}: no spaCy model mapped, skipping.")
+                continue
+            texts = [
+                row.text_content
+                for row in Lesson.query.filter_by(language_id=lang.id).limit(limit)
+                if row.text_content
+            ]
+            texts += [
+                row.content
+                for row in Story.query.filter_by(language_id=lang.id).limit(limit)
+                if row.content
+            ]
+            if not texts:
+                print(f"\n{lang.name}: no lessons or stories to benchmark, skipping.")
+                continue
+            yield lang.name, model_name, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--language", help="Only benchmark this language (name as stored in the DB)")
+    parser.add_argument("--model", help="Benchmark this model on --text-file instead of DB lessons")
+    parser.add_argument("--text-file", help="Text file to use with --model")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the texts per profile")
+    parser.add_argument("--limit", type=int, default=50, help="Max lessons/stories per language")
+    args = parser.parse_args()
+
+    if args.model:
+        if not args.text_file:
+            parser.error("--model requires --text-file")
+        with open(args.text_file, encoding="utf-8") as f:
+            texts = [f.read()]
+        benchmark_model(args.model, args.model, texts, args.repeat)
+        return
+
+    for language_name, model_name, texts in lesson_texts_by_language(args.language, args.limit):
+        benchmark_model(language_name, model_name, texts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark whole-library rescoring with the sparse lesson x lemma matrix.
+
+Builds a synthetic library (Zipf-distributed lemmas, like real texts) and
+compares rescoring every document with one mat-vec (readability_matrix) against
+the per-document loop over lemma counts it replaces. Also times replacing a
+single document's row.
+
+Usage:
+    python benchmark_readability_matrix.py
+    python benchmark_readability_matrix.py --documents 5000 --words 2000 --vocabulary 30000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+from readability_index import score_from_sums
+from readability_matrix import LemmaMatrix
+from vocab_utils import STATUS_WEIGHTS
+
+
+def synthetic_library(documents, words, vocabulary, seed):
+    rng = np.random.default_rng(seed)
+    lemmas = [f"lemma{i}" for i in range(vocabulary)]
+    library = []
+    for doc_id in range(1, documents + 1):
+        ranks = rng.zipf(1.2, size=words)
+        ranks = ranks[ranks <= vocabulary] - 1
+        library.append((("lesson", doc_id), Counter(lemmas[r] for r in ranks.tolist())))
+    return lemmas, library
+
+
+def python_loop(library, statuses):
+    scores = []
+    for _, counts in library:
+        weight_sum = 0.0
+        token_count = 0
+        for lemma, count in counts.items():
+            status = statuses.get(lemma, 0)
+            if status == 7:
+                continue
+            weight_sum += count * STATUS_WEIGHTS.get(status, 0.0)
+            token_count += count
+        scores.append(score_from_sums(weight_sum, token_count))
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=2000, help="Words per document")
+    parser.add_argument("--vocabulary", type=int, default=30000, help="Distinct lemmas")
+    parser.add_argument("--known", type=int, default=8000, help="Lemmas with a saved status")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    lemmas, library = synthetic_library(args.documents, args.words, args.vocabulary, args.seed)
+    print(f"Generated {len(library)} documents in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(args.seed)
+    statuses = {lemma: rng.randint(0, 7) for lemma in rng.sample(lemmas, min(args.known, len(lemmas)))}
+
+    started = time.perf_counter()
+    matrix = LemmaMatrix.from_triplets(
+        0,
+        ((doc_type, doc_id, lemma, count) for (doc_type, doc_id), counts in library for lemma, count in counts.items()),
+    )
+    matrix.csr()
+    rows, columns = matrix.shape
+    print(f"Matrix {rows} x {columns}, {matrix.nnz:,} entries, built in {time.perf_counter() - started:.2f}s")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        _, _, _, scores = matrix.score(statuses)
+        timings.append(time.perf_counter() - started)
+    print(f"  mat-vec rescoring:     {min(timings) * 1000:8.1f} ms (best of {args.repeat})")
+
+    started = time.perf_counter()
+    expected = python_loop(library, statuses)
+    print(f"  per-document loop:     {(time.perf_counter() - started) * 1000:8.1f} ms")
+    print(f"  max score difference:  {np.max(np.abs(scores - np.array(expected))):.2e}")
+
+    key, counts = library[len(library) // 2]
+    started = time.perf_counter()
+    matrix.set_row(*key, counts)
+    matrix.score(statuses)
+    print(f"  replace one row + rescore: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark the NumPy review forecast against per-card fsrs.Scheduler calls.
+
+Builds a synthetic deck (random stability, difficulty, last review and due
+dates), then times the current retrievability of every card with
+srs_forecast.ForgettingModel versus Scheduler.get_card_retrievability in a
+Python loop, and one simulated forecast with srs_forecast.simulate.
+
+Usage:
+    python benchmark_srs_forecast.py
+    python benchmark_srs_forecast.py --cards 200000 --days 365
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from fsrs import Card, Scheduler, State
+
+from srs_forecast import ForgettingModel, simulate
+
+
+def synthetic_deck(n_cards, rng):
+    """(stability, difficulty, last review, due) arrays; dates as day offsets from today."""
+    stability = rng.lognormal(mean=2.0, sigma=1.2, size=n_cards)
+    difficulty = rng.uniform(1, 10, size=n_cards)
+    last_day = -rng.uniform(0, 60, size=n_cards)
+    due_day = last_day + np.maximum(np.round(stability), 1)
+    unseen = rng.random(n_cards) < 0.1
+    last_day[unseen] = np.nan
+    return stability, difficulty, last_day, due_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type=int, default=50000, help="Cards in the deck")
+    parser.add_argument("--days", type=int, default=30, help="Forecast horizon")
+    parser.add_argument("--new-per-day", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    stability, difficulty, last_day, due_day = synthetic_deck(args.cards, rng)
+    scheduler = Scheduler(enable_fuzzing=False)
+    model = ForgettingModel(scheduler.parameters, scheduler.desired_retention, scheduler.maximum_interval)
+    reviewed = ~np.isnan(last_day)
+    print(f"{args.cards} cards ({int(reviewed.sum())} reviewed)")
+
+    started = time.perf_counter()
+    vectorized = model.retrievability(stability[reviewed], -last_day[reviewed])
+    print(f"  retrievability, NumPy:      {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    now = datetime.now(timezone.utc)
+    cards = [
+        Card(state=State.Review, stability=s, difficulty=d, last_review=now + timedelta(days=l), due=now)
+        for s, d, l in zip(stability[reviewed], difficulty[reviewed], last_day[reviewed])
+    ]
+    started = time.perf_counter()
+    looped = [scheduler.get_card_retrievability(card, now) for card in cards]
+    print(f"  retrievability, per card:   {(time.perf_counter() - started) * 1000:8.1f} ms")
+    print(f"  max difference:             {np.abs(vectorized - np.array(looped)).max():.2e}")
+
+    started = time.perf_counter()
+    reviews, new, lapses = simulate(
+        model, stability.copy(), difficulty.copy(), last_day.copy(), due_day.copy(), args.days, args.new_per_day
+    )
+    print(f"  {args.days}-day simulation:        {(time.perf_counter() - started) * 1000:8.1f} ms")
+    print(f"  reviews {int(reviews.sum())}, new {int(new.sum())}, lapses {int(lapses.sum())}")
+
+
+if __name__ == "__main__":
+    main()
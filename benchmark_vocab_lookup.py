@@ -0,0 +1,132 @@
+"""
+Benchmark /api/vocab term-status lookups for growing term lists.
+
+Seeds a throwaway SQLite database with a large vocabulary and times, for
+request sizes from 100 to 20,000 terms:
+
+    single IN     the old one-query lookup (fails past SQLite's bound-parameter limit)
+    chunked       IN lists of LOOKUP_CHUNK_SIZE terms
+    snapshot      vocab_snapshot.lookup_vocab_status with a current snapshot
+    after write   the same right after this process changed a term (patched snapshot)
+    other process the same right after another process changed a term (stale snapshot)
+
+Usage:
+    python benchmark_vocab_lookup.py
+    python benchmark_vocab_lookup.py --vocabulary 50000 --repeat 50
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from app import Language, VocabTerm
+from vocab_snapshot import lookup_terms_chunked, lookup_vocab_status, vocab_snapshots
+
+SIZES = (100, 1000, 5000, 20000)
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2] * 1000, timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+
+
+def single_in(language_id, terms):
+    rows = db.session.query(VocabTerm.term, VocabTerm.status, VocabTerm.translation).filter(
+        VocabTerm.language_id == language_id, VocabTerm.term.in_(list(terms))
+    )
+    return {term: (status, translation) for term, status, translation in rows}
+
+
+def seed(vocabulary, seed_value):
+    rng = random.Random(seed_value)
+    language = Language(name="Benchmark")
+    db.session.add(language)
+    db.session.flush()
+    db.session.execute(
+        VocabTerm.__table__.insert(),
+        [
+            {"language_id": language.id, "term": f"term{i}", "lemma": f"term{i}",
+             "status": rng.randint(1, 7), "translation": f"translation {i}"}
+            for i in range(vocabulary)
+        ],
+    )
+    db.session.commit()
+    return language.id
+
+
+def time_strategy(function, language_id, terms, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        try:
+            function(language_id, terms)
+        except OperationalError as e:
+            return f"fails ({str(e.orig)[:30]})"
+        timings.append(time.perf_counter() - started)
+    p50, p99 = percentiles(timings)
+    return f"p50 {p50:7.1f} ms  p99 {p99:7.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vocabulary", type=int, default=30000, help="Saved terms in the language")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    bench_app = Flask(__name__)
+    bench_app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(bench_app)
+    vocab_snapshots.init_app(bench_app)
+
+    try:
+        with bench_app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            language_id = seed(args.vocabulary, args.seed)
+            print(f"Seeded {args.vocabulary:,} terms in {time.perf_counter() - started:.1f}s")
+
+            rng = random.Random(args.seed)
+            term = db.session.query(VocabTerm).filter_by(language_id=language_id).first()
+
+            def write():
+                term.status = 1 if term.status != 1 else 2
+                db.session.commit()
+
+            def write_elsewhere():
+                # Bypasses this process's session, like a commit from another worker
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        update(Language.__table__)
+                        .where(Language.__table__.c.id == language_id)
+                        .values(vocab_version=Language.__table__.c.vocab_version + 1)
+                    )
+
+            for size in SIZES:
+                # Half saved terms, half unknown words, as in a real page
+                terms = [f"Term{rng.randrange(args.vocabulary)}" for _ in range(size // 2)]
+                terms += [f"unknown{i}" for i in range(size - len(terms))]
+                unique = {t.lower() for t in terms}
+                print(f"{size:>6} terms")
+                print(f"    single IN     {time_strategy(single_in, language_id, unique, args.repeat)}")
+                print(f"    chunked       {time_strategy(lookup_terms_chunked, language_id, unique, args.repeat)}")
+                lookup_vocab_status(language_id, terms)
+                print(f"    snapshot      {time_strategy(lookup_vocab_status, language_id, terms, args.repeat)}")
+                print(f"    after write   {time_strategy(lookup_vocab_status, language_id, terms, args.repeat, write)}")
+                print(f"    other process {time_strategy(lookup_vocab_status, language_id, terms, args.repeat, write_elsewhere)}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from functools import lru_cache
 import spacy
 import importlib
+from model_registry import SpacyModelRegistry
 
 # Initialize SQLAlchemy and Migrate
 db = SQLAlchemy()
 migrate = Migrate()
 
+# Single process-wide cache of loaded spaCy pipelines (configured in app.py)
+model_registry = SpacyModelRegistry(max_models=32)
+
 # List of models to pre-download during setup
 PRE_DOWNLOAD_MODELS = [
     # Most widely spoken languages
@@ -60,8 +63,26 @@ SPACY_MODEL_MAP = {
     "Danish": "da_core_news_sm",
     "Croatian": "hr_core_news_sm",
     "Catalan": "ca_core_news_sm",
+    "Norwegian": "nb_core_news_sm",
+    "Polish": "pl_core_news_sm",
 }
 
+
+def resolve_spacy_model_name(language_name):
+    """
+    Return the spaCy model name for a language name (case-insensitive),
+    or None if the language has no dedicated model.
+    """
+    if not language_name:
+        return None
+    if language_name in SPACY_MODEL_MAP:
+        return SPACY_MODEL_MAP[language_name]
+    normalized_name = language_name.strip().lower()
+    for lang_name, model in SPACY_MODEL_MAP.items():
+        if lang_name.lower() == normalized_name:
+            return model
+    return None
+
 class Setting(db.Model):
     key = db.Column(db.String(50), primary_key=True)
     value = db.Column(db.String(200))
@@ -201,53 +222,66 @@ def pre_download_models(python_executable=None):
             import traceback
             logger.error(traceback.format_exc())
 
-@lru_cache(maxsize=32)  # Increased cache size to accommodate more languages
-def get_spacy_model(language_name):
+def warm_up_spacy_models(mode="available", profiles=("analysis", "lemma")):
+    """
+    Load spaCy pipelines before serving requests (see gunicorn.conf.py).
+
+    Args:
+        mode (str): 'available' loads the models of every language whose
+            spacy_model_status is 'available'; 'all' loads PRE_DOWNLOAD_MODELS;
+            'none' (or empty) does nothing.
+        profiles (iterable): Pipeline profiles to load for each model. The
+            defaults are the ones used while serving requests.
+
+    Must be called inside an app context. Returns the registry's warm-up report,
+    or None if warm-up is disabled.
+    """
+    mode = (mode or "none").lower()
+    if mode in ("none", "off", "0", "false"):
+        return None
+    if mode == "all":
+        model_names = list(PRE_DOWNLOAD_MODELS)
+    else:
+        Language = db.Model.registry._class_registry.get("Language")
+        model_names = []
+        for language in Language.query.filter_by(spacy_model_status="available"):
+            model_name = resolve_spacy_model_name(language.name)
+            if model_name:
+                model_names.append(model_name)
+    return model_registry.warm_up(model_names, profiles=tuple(profiles))
+
+def get_spacy_model(language_name, profile="full"):
     """
     Get a spaCy language model for the specified language.
+
+    Models are shared through ``model_registry``, so every caller in this
+    process gets the same pipeline object for a given model and profile.
     
     Args:
         language_name (str): Name of the language (e.g., 'English', 'Spanish')
+        profile (str): Pipeline profile from model_registry.PIPELINE_PROFILES
+            ('full', 'lemma' or 'sentences'). Load only what you need.
         
     Returns:
-        spacy.language.Language: Loaded spaCy model. Falls back to multilingual model if specific model not found.
+        spacy.language.Language: Loaded spaCy model, or None if the language has
+        no installed model. Callers then fall back to word_tokenizer, which
+        splits text the same way as the reader.
     """
     if not language_name:
         language_name = "English"  # Default to English if no language specified
     
-    # Try to find the model in our mapping (case-insensitive)
-    model_name = None
+    model_name = resolve_spacy_model_name(language_name)
     
-    # First try exact match
-    if language_name in SPACY_MODEL_MAP:
-        model_name = SPACY_MODEL_MAP[language_name]
-    else:
-        # Try case-insensitive match
-        normalized_name = language_name.lower()
-        for lang_name, model in SPACY_MODEL_MAP.items():
-            if lang_name.lower() == normalized_name:
-                model_name = model
-                break
-    
-    # If no specific model found, use the multilingual model
+    # No specific model: use the model-free tokenizer instead of loading the
+    # heavy multilingual model
     if not model_name:
-        print(f"No specific model found for '{language_name}'. Falling back to multilingual model.")
-        model_name = "xx_ent_wiki_sm"
+        print(f"No specific model found for '{language_name}'. Using the regex tokenizer.")
+        return None
     
     try:
-        # Try to load the model
-        nlp = spacy.load(model_name)
-        print(f"Loaded spaCy model: {model_name}")
-        return nlp
+        # Try to load the model (or reuse the already loaded one)
+        return model_registry.get(model_name, profile)
     except OSError:
-        # If the specific model fails to load, try the multilingual model
-        if model_name != "xx_ent_wiki_sm":
-            print(f"Failed to load model '{model_name}'. Falling back to multilingual model.")
-            try:
-                return spacy.load("xx_ent_wiki_sm")
-            except OSError as e:
-                print(f"Failed to load multilingual model: {e}")
-                return None
         print(f"Warning: spaCy model '{model_name}' not found. Please run: python -m spacy download {model_name}")
         return None
     except Exception as e:
@@ -0,0 +1,388 @@
+"""
+Per-language FSRS parameters fitted from the review log.
+
+The FSRS-6 memory model (the formulas of fsrs.Scheduler) is replayed over a
+language's whole review history at once with NumPy: reviews are grouped by
+their position in each card's history, and every step updates the stability
+and difficulty of all cards reviewed at that position as arrays. Along with
+them the derivatives of stability, difficulty and predicted recall with
+respect to the 21 parameters are carried forward (forward-mode
+differentiation), so one replay gives both the log loss of the recall
+predictions and its exact gradient. Parameters are fitted with Adam and
+clipped to the bounds fsrs accepts.
+
+Run it with ``flask optimize-fsrs``. The fitted parameters are stored on the
+language's SRSSettings row (fsrs_parameters, JSON) and only kept if they
+predict the history better than the defaults; scheduler_for() returns a
+scheduler using them, cached per parameter set.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from fsrs import Scheduler
+from fsrs.scheduler import DEFAULT_PARAMETERS, LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+N_PARAMETERS = len(DEFAULT_PARAMETERS)
+MIN_STABILITY = 0.001
+MIN_DIFFICULTY = 1.0
+MAX_DIFFICULTY = 10.0
+
+# Reviews needed before fitting is worth it
+MIN_REVIEWS = 400
+# Like fsrs.Optimizer: only the first reviews of each card are replayed
+MAX_SEQUENCE_LENGTH = 64
+DEFAULT_ITERATIONS = 40
+LEARNING_RATE = 0.05
+
+_LOWER = np.array(LOWER_BOUNDS_PARAMETERS, dtype=np.float64)
+_UPPER = np.array(UPPER_BOUNDS_PARAMETERS, dtype=np.float64)
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+class ReviewHistory:
+    """
+    A language's review log arranged for replay: for each position in a
+    card's history, the number of cards reviewed at that position (always
+    the first ones), their ratings and the whole days elapsed since each
+    card's previous review.
+    """
+
+    def __init__(self, term_ids, timestamps, ratings, max_length=MAX_SEQUENCE_LENGTH):
+        order = np.lexsort((timestamps, term_ids))
+        term_ids, timestamps, ratings = term_ids[order], timestamps[order], ratings[order]
+
+        first = np.ones(len(term_ids), dtype=bool)
+        first[1:] = term_ids[1:] != term_ids[:-1]
+        starts = np.flatnonzero(first)
+        lengths = np.diff(np.append(starts, len(term_ids)))
+        # Cards with the longest histories first: the cards reviewed at any
+        # position are then a prefix of the card arrays (views, no copies)
+        rank = np.empty(len(starts), dtype=np.int64)
+        rank[np.argsort(-lengths, kind="stable")] = np.arange(len(starts))
+        card_of = np.cumsum(first) - 1
+        card = rank[card_of]
+        position = np.arange(len(term_ids)) - starts[card_of]
+        elapsed = np.zeros(len(term_ids))
+        elapsed[1:] = np.floor((timestamps[1:] - timestamps[:-1]) / 86400.0)
+        elapsed[first] = 0
+
+        keep = position < max_length
+        self.n_cards = len(starts)
+        self.n_reviews = int(keep.sum())
+        self.steps = []
+        for step in range(min(int(lengths.max()), max_length) if self.n_reviews else 0):
+            at = np.flatnonzero(position == step)
+            at = at[np.argsort(card[at])]
+            self.steps.append((len(at), ratings[at].astype(np.float64), elapsed[at]))
+        # Reviews whose recall is predicted: not a card's first, at least a day later
+        self.n_predicted = sum(int((e >= 1).sum()) for _, _, e in self.steps[1:])
+
+    @classmethod
+    def load(cls, language_id, max_length=MAX_SEQUENCE_LENGTH):
+        ReviewLogEntry = _get_model("ReviewLogEntry")
+        rows = (
+            db.session.query(ReviewLogEntry.term_id, ReviewLogEntry.ts, ReviewLogEntry.rating)
+            .filter(ReviewLogEntry.language_id == language_id, ReviewLogEntry.rating.between(1, 4))
+            .all()
+        )
+        term_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        timestamps = np.fromiter(
+            (row[1].replace(tzinfo=timezone.utc).timestamp() for row in rows), dtype=np.float64, count=len(rows)
+        )
+        ratings = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        return cls(term_ids, timestamps, ratings, max_length)
+
+
+def _clip_difficulty(d, dd):
+    dd[(d <= MIN_DIFFICULTY) | (d >= MAX_DIFFICULTY)] = 0
+    return np.clip(d, MIN_DIFFICULTY, MAX_DIFFICULTY), dd
+
+
+def _clip_stability(s, ds):
+    ds[s <= MIN_STABILITY] = 0
+    return np.maximum(s, MIN_STABILITY), ds
+
+
+# The helpers below return a value and its gradient (one row of 21 partial
+# derivatives per card). Gradients of the inputs are not modified; terms that
+# only involve one parameter are added to that column in place.
+
+def _initial_state(w, rating):
+    """Stability and difficulty after a card's first review."""
+    n = len(rating)
+    index = rating.astype(int) - 1
+    ds = np.zeros((n, N_PARAMETERS))
+    ds[np.arange(n), index] = 1
+    s, ds = _clip_stability(w[index], ds)
+    grow = np.exp(w[5] * (rating - 1))
+    dd = np.zeros((n, N_PARAMETERS))
+    dd[:, 4] = 1
+    dd[:, 5] = -(rating - 1) * grow
+    d, dd = _clip_difficulty(w[4] - grow + 1, dd)
+    return s, ds, d, dd
+
+
+def _next_difficulty(w, d, dd, r):
+    """fsrs.Scheduler._next_difficulty."""
+    arg_1 = w[4] - np.exp(3 * w[5]) + 1
+    delta = -w[6] * (r - 3)
+    arg_2 = d + (10 - d) * delta / 9
+    d_next = w[7] * arg_1 + (1 - w[7]) * arg_2
+    dd_next = dd * ((1 - w[7]) * (1 - delta / 9))[:, None]
+    dd_next[:, 4] += w[7]
+    dd_next[:, 5] -= w[7] * 3 * np.exp(3 * w[5])
+    dd_next[:, 6] -= (1 - w[7]) * (10 - d) * (r - 3) / 9
+    dd_next[:, 7] += arg_1 - arg_2
+    return _clip_difficulty(d_next, dd_next)
+
+
+def _retrievability(w, s, ds, elapsed):
+    """Predicted recall after ``elapsed`` days."""
+    decay = w[20]
+    base_factor = 0.9 ** (-1 / decay)
+    factor = base_factor - 1
+    dfactor = base_factor * np.log(0.9) / decay ** 2
+    b = 1 + factor * elapsed / s
+    r = b ** -decay
+    # d ln r = -decay / b * db - ln b * d decay, with db = -factor * elapsed / s^2 * ds (+ d factor)
+    dr = ds * (r * decay / b * factor * elapsed / s ** 2)[:, None]
+    dr[:, 20] += r * (-np.log(b) - decay / b * elapsed / s * dfactor)
+    return r, dr
+
+
+def _forget_stability(w, s, ds, d, dd, r, dr):
+    """fsrs.Scheduler._next_forget_stability."""
+    a = d ** -w[12]
+    bt_power = (s + 1) ** w[13]
+    c = np.exp((1 - r) * w[14])
+    long = w[11] * a * (bt_power - 1) * c
+    # d long = long * d ln(a c w11) + w11 a c * d bt
+    dlong = (
+        dd * (-long * w[12] / d)[:, None]
+        + dr * (-long * w[14])[:, None]
+        + ds * (w[11] * a * c * bt_power * w[13] / (s + 1))[:, None]
+    )
+    dlong[:, 11] += long / w[11]
+    dlong[:, 12] -= long * np.log(d)
+    dlong[:, 13] += w[11] * a * c * bt_power * np.log(s + 1)
+    dlong[:, 14] += long * (1 - r)
+
+    e = np.exp(w[17] * w[18])
+    short = s / e
+    use_long = long < short
+    dshort = ds[~use_long] / e
+    dshort[:, 17] -= short[~use_long] * w[18]
+    dshort[:, 18] -= short[~use_long] * w[17]
+    dlong[~use_long] = dshort
+    return np.where(use_long, long, short), dlong
+
+
+def _recall_stability(w, s, ds, d, dd, r, dr, rating):
+    """fsrs.Scheduler._next_recall_stability."""
+    hard, easy = rating == 2, rating == 4
+    bonus = np.where(hard, w[15], 1.0) * np.where(easy, w[16], 1.0)
+    growth = np.exp((1 - r) * w[10])
+    core = np.exp(w[8]) * (11 - d) * s ** -w[9] * bonus
+    g = core * (growth - 1)
+    # S' = s (1 + g); dS' = ds (1 + g) + s dg
+    sg = s * g
+    ds_next = (
+        ds * (1 + g - sg * w[9] / s)[:, None]
+        + dd * (-sg / (11 - d))[:, None]
+        + dr * (-s * core * growth * w[10])[:, None]
+    )
+    ds_next[:, 8] += sg
+    ds_next[:, 9] -= sg * np.log(s)
+    ds_next[:, 10] += s * core * growth * (1 - r)
+    ds_next[:, 15] += np.where(hard, sg / w[15], 0)
+    ds_next[:, 16] += np.where(easy, sg / w[16], 0)
+    return s * (1 + g), ds_next
+
+
+def _short_term_stability(w, s, ds, rating):
+    """fsrs.Scheduler._short_term_stability."""
+    increase = np.exp(w[17] * (rating - 3 + w[18])) * s ** -w[19]
+    floored = (rating >= 2) & (increase < 1)
+    increase = np.where(floored, 1.0, increase)
+    s_next = s * increase
+    # d ln increase is 0 where it was floored to 1
+    grows = np.where(floored, 0.0, s_next)
+    ds_next = ds * (increase - grows * w[19] / s)[:, None]
+    ds_next[:, 17] += grows * (rating - 3 + w[18])
+    ds_next[:, 18] += grows * w[17]
+    ds_next[:, 19] -= grows * np.log(s)
+    return s_next, ds_next
+
+
+def loss_and_gradient(parameters, history):
+    """Mean log loss of the history's recall predictions and its gradient."""
+    w = np.asarray(parameters, dtype=np.float64)
+    s = np.zeros(history.n_cards)
+    d = np.zeros(history.n_cards)
+    ds = np.zeros((history.n_cards, N_PARAMETERS))
+    dd = np.zeros((history.n_cards, N_PARAMETERS))
+    loss = 0.0
+    gradient = np.zeros(N_PARAMETERS)
+
+    for step, (count, rating, elapsed) in enumerate(history.steps):
+        if step == 0:
+            s[:], ds[:], d[:], dd[:] = _initial_state(w, rating)
+            continue
+
+        cs, cds, cd, cdd = s[:count], ds[:count], d[:count], dd[:count]
+        same_day = elapsed < 1
+        later = ~same_day
+
+        new_s = np.empty_like(cs)
+        new_ds = np.empty_like(cds)
+        if same_day.any():
+            new_s[same_day], new_ds[same_day] = _short_term_stability(
+                w, cs[same_day], cds[same_day], rating[same_day]
+            )
+        if later.any():
+            ls, lds, ld, ldd, lrating = cs[later], cds[later], cd[later], cdd[later], rating[later]
+            r, dr = _retrievability(w, ls, lds, elapsed[later])
+            r_clipped = np.clip(r, 1e-4, 1 - 1e-4)
+            recalled = lrating > 1
+            loss -= np.sum(np.where(recalled, np.log(r_clipped), np.log(1 - r_clipped)))
+            dloss_dr = np.where(recalled, -1 / r_clipped, 1 / (1 - r_clipped)) * (r == r_clipped)
+            gradient += dloss_dr @ dr
+
+            forgot = ~recalled
+            ls_next = np.empty_like(ls)
+            lds_next = np.empty_like(lds)
+            if forgot.any():
+                ls_next[forgot], lds_next[forgot] = _forget_stability(
+                    w, ls[forgot], lds[forgot], ld[forgot], ldd[forgot], r[forgot], dr[forgot]
+                )
+            if recalled.any():
+                ls_next[recalled], lds_next[recalled] = _recall_stability(
+                    w, ls[recalled], lds[recalled], ld[recalled], ldd[recalled], r[recalled], dr[recalled],
+                    lrating[recalled],
+                )
+            new_s[later], new_ds[later] = ls_next, lds_next
+
+        new_s, new_ds = _clip_stability(new_s, new_ds)
+        new_d, new_dd = _next_difficulty(w, cd, cdd, rating)
+        s[:count], ds[:count], d[:count], dd[:count] = new_s, new_ds, new_d, new_dd
+
+    n = max(history.n_predicted, 1)
+    return loss / n, gradient / n
+
+
+def fit_parameters(history, initial=DEFAULT_PARAMETERS, iterations=DEFAULT_ITERATIONS, learning_rate=LEARNING_RATE):
+    """
+    Fit FSRS parameters to a ReviewHistory with Adam (full batch).
+    Returns (best parameters, their loss, loss of ``initial``).
+    """
+    w = np.clip(np.array(initial, dtype=np.float64), _LOWER, _UPPER)
+    m = np.zeros(N_PARAMETERS)
+    v = np.zeros(N_PARAMETERS)
+    initial_loss = best_loss = None
+    best = w.copy()
+    for i in range(1, iterations + 1):
+        loss, gradient = loss_and_gradient(w, history)
+        if initial_loss is None:
+            initial_loss = loss
+        if best_loss is None or loss < best_loss:
+            best_loss, best = loss, w.copy()
+        m = 0.9 * m + 0.1 * gradient
+        v = 0.999 * v + 0.001 * gradient ** 2
+        step = learning_rate * (m / (1 - 0.9 ** i)) / (np.sqrt(v / (1 - 0.999 ** i)) + 1e-8)
+        w = np.clip(w - step, _LOWER, _UPPER)
+    loss, _ = loss_and_gradient(w, history)
+    if loss < best_loss:
+        best_loss, best = loss, w
+    return [round(float(x), 4) for x in best], best_loss, initial_loss
+
+
+def optimize_language(language_id, iterations=DEFAULT_ITERATIONS, min_reviews=MIN_REVIEWS, save=True):
+    """
+    Fit and (if they beat the defaults) store FSRS parameters for a language.
+    Returns a summary dict; "saved" tells whether the settings were changed.
+    """
+    from review_log import review_logs
+
+    started = time.perf_counter()
+    review_logs.flush()
+    history = ReviewHistory.load(language_id)
+    result = {
+        "language_id": language_id,
+        "reviews": history.n_reviews,
+        "predicted_reviews": history.n_predicted,
+        "cards": history.n_cards,
+        "saved": False,
+    }
+    if history.n_predicted < min_reviews:
+        result["message"] = f"Not enough review history ({history.n_predicted} < {min_reviews} predictable reviews)"
+        result["seconds"] = round(time.perf_counter() - started, 2)
+        return result
+
+    parameters, loss, default_loss = fit_parameters(history, iterations=iterations)
+    result.update(parameters=parameters, loss=round(loss, 5), default_loss=round(default_loss, 5))
+    if save and loss < default_loss:
+        SRSSettings = _get_model("SRSSettings")
+        settings = SRSSettings.query.filter_by(language_id=language_id).first()
+        if not settings:
+            settings = SRSSettings(language_id=language_id)
+            db.session.add(settings)
+        settings.fsrs_parameters = json.dumps(parameters)
+        settings.fsrs_optimized_at = datetime.utcnow()
+        settings.fsrs_review_count = history.n_reviews
+        db.session.commit()
+        result["saved"] = True
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+class SchedulerCache:
+    """fsrs Schedulers with the settings of a base scheduler, one per parameter set."""
+
+    def __init__(self):
+        self._schedulers = {}
+        self._lock = threading.Lock()
+
+    def get(self, base, parameters_json):
+        if not parameters_json:
+            return base
+        with self._lock:
+            scheduler = self._schedulers.get(parameters_json)
+            if scheduler is None:
+                try:
+                    scheduler = Scheduler(
+                        parameters=json.loads(parameters_json),
+                        desired_retention=base.desired_retention,
+                        learning_steps=base.learning_steps,
+                        relearning_steps=base.relearning_steps,
+                        maximum_interval=base.maximum_interval,
+                        enable_fuzzing=base.enable_fuzzing,
+                    )
+                except (ValueError, TypeError) as e:
+                    logger.error(f"Ignoring invalid FSRS parameters {parameters_json!r}: {e}")
+                    scheduler = base
+                self._schedulers[parameters_json] = scheduler
+            return scheduler
+
+
+schedulers = SchedulerCache()
+
+
+def scheduler_for(language_id, base):
+    """The scheduler for a language: ``base`` with the language's fitted parameters, if any."""
+    SRSSettings = _get_model("SRSSettings")
+    parameters_json = (
+        db.session.query(SRSSettings.fsrs_parameters).filter_by(language_id=language_id).scalar()
+    )
+    return schedulers.get(base, parameters_json)
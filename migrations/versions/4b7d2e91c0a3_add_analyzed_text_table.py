@@ -0,0 +1,34 @@
+"""Add analyzed_text table for cached spaCy analyses
+
+Revision ID: 4b7d2e91c0a3
+Revises: 8a207a18ab21
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7d2e91c0a3'
+down_revision = '8a207a18ab21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analyzed_text',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('model_key', sa.String(length=120), nullable=False),
+        sa.Column('token_count', sa.Integer(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_hash', 'model_key', name='uq_analyzed_text_hash_model'),
+    )
+
+
+def downgrade():
+    op.drop_table('analyzed_text')
@@ -0,0 +1,32 @@
+"""Add readability_status to Lesson and Story
+
+Revision ID: 9e3f6a1d5c27
+Revises: 4b7d2e91c0a3
+Create Date: 2026-10-17 10:41:03.552817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3f6a1d5c27'
+down_revision = '4b7d2e91c0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('readability_status', sa.String(length=10), nullable=True, server_default='ready'))
+
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('readability_status', sa.String(length=10), nullable=True, server_default='ready'))
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_column('readability_status')
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.drop_column('readability_status')
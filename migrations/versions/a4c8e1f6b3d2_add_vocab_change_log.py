@@ -0,0 +1,40 @@
+"""Add vocab_change log for vocabulary delta sync
+
+Revision ID: a4c8e1f6b3d2
+Revises: e7b2f4a9c1d6
+Create Date: 2026-10-17 16:48:03.552914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e1f6b3d2'
+down_revision = 'e7b2f4a9c1d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('vocab_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('term', sa.String(length=200), nullable=False),
+    sa.Column('status', sa.Integer(), nullable=True),
+    sa.Column('translation', sa.Text(), nullable=True),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['language_id'], ['language.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('language_id', 'term', name='uq_vocab_change_language_term')
+    )
+    with op.batch_alter_table('vocab_change', schema=None) as batch_op:
+        batch_op.create_index('ix_vocab_change_language_version', ['language_id', 'version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vocab_change', schema=None) as batch_op:
+        batch_op.drop_index('ix_vocab_change_language_version')
+
+    op.drop_table('vocab_change')
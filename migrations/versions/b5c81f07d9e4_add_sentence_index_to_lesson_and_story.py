@@ -0,0 +1,32 @@
+"""Add sentence_index to Lesson and Story
+
+Revision ID: b5c81f07d9e4
+Revises: 9e3f6a1d5c27
+Create Date: 2026-10-17 11:26:37.904126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5c81f07d9e4'
+down_revision = '9e3f6a1d5c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sentence_index', sa.Text(), nullable=True))
+
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sentence_index', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_column('sentence_index')
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.drop_column('sentence_index')
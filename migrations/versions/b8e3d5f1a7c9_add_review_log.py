@@ -0,0 +1,55 @@
+"""Add the append-only review_log table
+
+Revision ID: b8e3d5f1a7c9
+Revises: c6f1d8a3e5b7
+Create Date: 2026-10-17 19:02:41.381920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3d5f1a7c9'
+down_revision = 'c6f1d8a3e5b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('review_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('term_id', sa.Integer(), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.Column('rating', sa.SmallInteger(), nullable=False),
+    sa.Column('elapsed_days', sa.Float(), nullable=True),
+    sa.Column('scheduled_days', sa.Integer(), nullable=True),
+    sa.Column('state_before', sa.SmallInteger(), nullable=True),
+    sa.Column('state_after', sa.SmallInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['language_id'], ['language.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('review_log', schema=None) as batch_op:
+        batch_op.create_index('ix_review_log_language_ts', ['language_id', 'ts'], unique=False)
+        batch_op.create_index(batch_op.f('ix_review_log_term_id'), ['term_id'], unique=False)
+
+    # Until now only the last review of each term was kept; start the log with it
+    op.execute("""
+        INSERT INTO review_log (term_id, language_id, ts, rating, scheduled_days, state_after)
+        SELECT id, language_id, last_review_date,
+               CASE last_rating_type WHEN 'again' THEN 1 WHEN 'hard' THEN 2 WHEN 'good' THEN 3 ELSE 4 END,
+               interval,
+               CASE state WHEN 'learning' THEN 1 WHEN 'review' THEN 2 WHEN 'relearning' THEN 3 ELSE 0 END
+        FROM vocab_term
+        WHERE last_review_date IS NOT NULL
+          AND last_rating_type IN ('again', 'hard', 'good', 'easy')
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('review_log', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_review_log_term_id'))
+        batch_op.drop_index('ix_review_log_language_ts')
+
+    op.drop_table('review_log')
@@ -0,0 +1,48 @@
+"""Add review_queue and a covering index for due cards
+
+Revision ID: c6f1d8a3e5b7
+Revises: a4c8e1f6b3d2
+Create Date: 2026-10-17 18:10:27.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f1d8a3e5b7'
+down_revision = 'a4c8e1f6b3d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('review_queue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('term_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('is_new', sa.Boolean(), nullable=False),
+    sa.Column('requeued', sa.Boolean(), nullable=False),
+    sa.Column('answered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['language_id'], ['language.id'], ),
+    sa.ForeignKeyConstraint(['term_id'], ['vocab_term.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('language_id', 'day', 'term_id', name='uq_review_queue_language_day_term')
+    )
+    with op.batch_alter_table('review_queue', schema=None) as batch_op:
+        batch_op.create_index('ix_review_queue_language_day_position', ['language_id', 'day', 'position'], unique=False)
+
+    with op.batch_alter_table('vocab_term', schema=None) as batch_op:
+        batch_op.create_index('ix_vocab_term_review_due', ['language_id', 'status', 'next_review_date', 'last_review_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vocab_term', schema=None) as batch_op:
+        batch_op.drop_index('ix_vocab_term_review_due')
+
+    with op.batch_alter_table('review_queue', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_queue_language_day_position')
+
+    op.drop_table('review_queue')
@@ -0,0 +1,56 @@
+"""Add document_lemma index and readability sums to Lesson and Story
+
+Revision ID: d3a9c4e7f2b1
+Revises: b5c81f07d9e4
+Create Date: 2026-10-17 13:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9c4e7f2b1'
+down_revision = 'b5c81f07d9e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_lemma',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doc_type', sa.String(length=10), nullable=False),
+    sa.Column('doc_id', sa.Integer(), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('lemma', sa.String(length=200), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['language_id'], ['language.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('document_lemma', schema=None) as batch_op:
+        batch_op.create_index('ix_document_lemma_language_lemma', ['language_id', 'lemma'], unique=False)
+        batch_op.create_index('ix_document_lemma_doc', ['doc_type', 'doc_id'], unique=False)
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('readability_weight_sum', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('readability_token_count', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('readability_weight_sum', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('readability_token_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_column('readability_token_count')
+        batch_op.drop_column('readability_weight_sum')
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.drop_column('readability_token_count')
+        batch_op.drop_column('readability_weight_sum')
+
+    with op.batch_alter_table('document_lemma', schema=None) as batch_op:
+        batch_op.drop_index('ix_document_lemma_doc')
+        batch_op.drop_index('ix_document_lemma_language_lemma')
+
+    op.drop_table('document_lemma')
@@ -0,0 +1,26 @@
+"""Add vocab_version to Language
+
+Revision ID: e7b2f4a9c1d6
+Revises: d3a9c4e7f2b1
+Create Date: 2026-10-17 15:22:40.193617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2f4a9c1d6'
+down_revision = 'd3a9c4e7f2b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('language', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('vocab_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('language', schema=None) as batch_op:
+        batch_op.drop_column('vocab_version')
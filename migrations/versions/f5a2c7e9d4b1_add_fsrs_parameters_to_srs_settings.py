@@ -0,0 +1,30 @@
+"""Add fitted FSRS parameters to srs_settings
+
+Revision ID: f5a2c7e9d4b1
+Revises: b8e3d5f1a7c9
+Create Date: 2026-10-17 19:48:12.507733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5a2c7e9d4b1'
+down_revision = 'b8e3d5f1a7c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('srs_settings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fsrs_parameters', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('fsrs_optimized_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('fsrs_review_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('srs_settings', schema=None) as batch_op:
+        batch_op.drop_column('fsrs_review_count')
+        batch_op.drop_column('fsrs_optimized_at')
+        batch_op.drop_column('fsrs_parameters')
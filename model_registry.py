@@ -0,0 +1,408 @@
+"""
+Process-wide registry for loaded spaCy pipelines.
+
+Every part of the app that needs a spaCy model (``extensions.get_spacy_model``,
+``text_processor.get_nlp`` and everything built on them) goes through the single
+``model_registry`` instance created in extensions.py, so a pipeline is loaded at
+most once per worker process.
+
+Pipelines are cached per (model name, profile). A profile names the subset of
+components a caller needs (see PIPELINE_PROFILES); everything else is excluded
+at load time so it costs neither memory nor CPU.
+
+The registry:
+  - keeps pipelines in LRU order and evicts the least recently used ones when the
+    configured memory budget (or maximum model count) is exceeded,
+  - makes concurrent first requests for the same model wait on a single
+    ``spacy.load`` call instead of each loading their own copy,
+  - counts hits, misses, loads, failures, evictions and total load time.
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Components excluded from each pipeline profile. spaCy ignores names a model
+# does not have, so one list covers every model family.
+_NON_LEMMA_COMPONENTS = (
+    "parser",
+    "ner",
+    "senter",
+    "entity_ruler",
+    "entity_linker",
+    "textcat",
+    "textcat_multilabel",
+    "spancat",
+    "span_finder",
+)
+_LEMMA_COMPONENTS = (
+    "tok2vec",
+    "tagger",
+    "morphologizer",
+    "attribute_ruler",
+    "lemmatizer",
+    "trainable_lemmatizer",
+)
+
+PIPELINE_PROFILES = {
+    # Everything the model ships with (parser, NER, ...).
+    "full": {"exclude": ()},
+    # Tokens, is_stop, POS and lemma_: tagger/morphologizer + lemmatizer only.
+    "lemma": {"exclude": _NON_LEMMA_COMPONENTS},
+    # Sentence boundaries only: the statistical senter, or a rule-based
+    # sentencizer for models that do not ship one.
+    "sentences": {
+        "exclude": tuple(
+            c for c in _NON_LEMMA_COMPONENTS + _LEMMA_COMPONENTS if c != "senter"
+        ),
+        "sentences": True,
+    },
+    # Lemma profile plus sentence boundaries, used for cached text analyses
+    # (see text_analysis.py).
+    "analysis": {
+        "exclude": tuple(c for c in _NON_LEMMA_COMPONENTS if c != "senter"),
+        "sentences": True,
+    },
+}
+
+DEFAULT_PROFILE = "full"
+
+
+def load_pipeline(model_name, profile=DEFAULT_PROFILE):
+    """Load ``model_name`` with only the components needed for ``profile``."""
+    import spacy
+
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile: {profile}")
+    spec = PIPELINE_PROFILES[profile]
+    nlp = spacy.load(model_name, exclude=list(spec["exclude"]))
+    if spec.get("sentences"):
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+        elif "senter" not in nlp.pipe_names:
+            nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def get_process_rss():
+    """
+    Return the resident set size of the current process in bytes.
+
+    Uses /proc on Linux and falls back to psutil when it is installed.
+    Returns None if the RSS cannot be determined on this platform.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class _CachedModel:
+    """A loaded pipeline plus the bookkeeping used for eviction."""
+
+    def __init__(self, nlp, size_bytes, load_seconds):
+        self.nlp = nlp
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.last_used = time.monotonic()
+
+
+class _PendingLoad:
+    """Shared state for callers waiting on a load that is already running."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.nlp = None
+        self.error = None
+
+
+class SpacyModelRegistry:
+    """
+    Thread-safe LRU cache of spaCy pipelines keyed by (model name, profile).
+
+    Args:
+        memory_budget_mb (float, optional): Evict idle pipelines once the
+            estimated memory of all cached pipelines exceeds this many MB.
+            None or 0 disables the budget.
+        max_models (int, optional): Upper bound on the number of cached
+            pipelines. None or 0 means unlimited.
+        loader (callable, optional): Function called as
+            ``loader(model_name, profile)`` to load a pipeline.
+            Defaults to ``load_pipeline``.
+        retry_failed_after (float): Seconds during which a failed load is not
+            retried; the original error is raised again instead. Models can be
+            installed in the background, so failures are not cached forever.
+    """
+
+    def __init__(self, memory_budget_mb=None, max_models=None, loader=None,
+                 retry_failed_after=60.0):
+        self._loader = loader
+        self.retry_failed_after = retry_failed_after
+        self._models = OrderedDict()  # (model, profile) -> _CachedModel, LRU first
+        self._pending = {}  # (model, profile) -> _PendingLoad
+        self._failed = {}  # (model, profile) -> (monotonic time, exception)
+        self._lock = threading.Lock()
+        # Loads are serialized so the RSS delta of each load can be attributed
+        # to the model being loaded.
+        self._load_lock = threading.Lock()
+        self.configure(memory_budget_mb=memory_budget_mb, max_models=max_models)
+        self.reset_stats()
+        self.last_warm_up = None
+
+    def configure(self, memory_budget_mb=None, max_models=None):
+        """Update the memory budget and model limit, evicting if needed."""
+        self.memory_budget_bytes = (
+            int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        )
+        self.max_models = int(max_models) if max_models else None
+        with self._lock:
+            self._evict_over_budget(keep=None)
+
+    def init_app(self, app):
+        """Read SPACY_MODEL_MEMORY_MB and SPACY_MAX_MODELS from the app config."""
+        self.configure(
+            memory_budget_mb=app.config.get("SPACY_MODEL_MEMORY_MB"),
+            max_models=app.config.get("SPACY_MAX_MODELS"),
+        )
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, model_name, profile=DEFAULT_PROFILE):
+        """
+        Return the ``profile`` variant of ``model_name``, loading it on first use.
+
+        Concurrent callers asking for a model that is still loading wait for
+        that load to finish and share its result. Load errors (e.g. OSError
+        for a missing model package) are raised to every waiting caller.
+        """
+        if profile not in PIPELINE_PROFILES:
+            raise ValueError(f"Unknown pipeline profile: {profile}")
+        key = (model_name, profile)
+        with self._lock:
+            cached = self._models.get(key)
+            if cached is not None:
+                self._models.move_to_end(key)
+                cached.last_used = time.monotonic()
+                self.hits += 1
+                return cached.nlp
+
+            self.misses += 1
+            failed = self._failed.get(key)
+            if failed is not None:
+                failed_at, error = failed
+                if time.monotonic() - failed_at < self.retry_failed_after:
+                    raise error
+                del self._failed[key]
+
+            pending = self._pending.get(key)
+            is_loader = pending is None
+            if is_loader:
+                pending = _PendingLoad()
+                self._pending[key] = pending
+
+        if not is_loader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.nlp
+
+        try:
+            nlp = self._load(key)
+            pending.nlp = nlp
+            return nlp
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.done.set()
+
+    def _load(self, key):
+        model_name, profile = key
+        loader = self._loader or load_pipeline
+
+        with self._load_lock:
+            rss_before = get_process_rss()
+            started = time.perf_counter()
+            try:
+                nlp = loader(model_name, profile)
+            except Exception as e:
+                with self._lock:
+                    self.load_failures += 1
+                    self._failed[key] = (time.monotonic(), e)
+                raise
+            elapsed = time.perf_counter() - started
+            rss_after = get_process_rss()
+
+        size_bytes = 0
+        if rss_before is not None and rss_after is not None:
+            size_bytes = max(rss_after - rss_before, 0)
+
+        with self._lock:
+            self._models[key] = _CachedModel(nlp, size_bytes, elapsed)
+            self.loads += 1
+            self.load_seconds += elapsed
+            self._evict_over_budget(keep=key)
+
+        logger.info(
+            f"Loaded spaCy model '{model_name}' ({profile}) in {elapsed:.2f}s "
+            f"(~{size_bytes / (1024 * 1024):.1f} MB)"
+        )
+        return nlp
+
+    def _cached_bytes(self):
+        return sum(entry.size_bytes for entry in self._models.values())
+
+    def _over_budget(self):
+        if self.max_models and len(self._models) > self.max_models:
+            return True
+        if self.memory_budget_bytes and self._cached_bytes() > self.memory_budget_bytes:
+            return True
+        return False
+
+    def _evict_over_budget(self, keep):
+        """Drop least recently used pipelines (except ``keep``). Caller holds the lock."""
+        evicted = []
+        for key in list(self._models):
+            if not self._over_budget():
+                break
+            if key == keep:
+                continue
+            self._models.pop(key)
+            self.evictions += 1
+            evicted.append(f"{key[0]} ({key[1]})")
+        if evicted:
+            logger.info(f"Evicted idle spaCy models: {', '.join(evicted)}")
+            gc.collect()
+
+    def evict(self, model_name, profile=None):
+        """
+        Remove a model from the registry (every profile unless ``profile`` is given).
+        Returns True if anything was cached.
+        """
+        with self._lock:
+            keys = [
+                key for key in self._models
+                if key[0] == model_name and profile in (None, key[1])
+            ]
+            for key in keys:
+                del self._models[key]
+            self.evictions += len(keys)
+        if keys:
+            gc.collect()
+        return bool(keys)
+
+    def forget_failure(self, model_name):
+        """Allow an immediate retry of a model whose load failed (e.g. after installing it)."""
+        with self._lock:
+            for key in [key for key in self._failed if key[0] == model_name]:
+                del self._failed[key]
+
+    def clear(self):
+        """Remove every cached pipeline and forget earlier load failures."""
+        with self._lock:
+            self.evictions += len(self._models)
+            self._models.clear()
+            self._failed.clear()
+        gc.collect()
+
+    def warm_up(self, model_names, profiles=(DEFAULT_PROFILE,)):
+        """
+        Load every (model, profile) pair up front, e.g. in a preforking master
+        so worker processes share the pages copy-on-write.
+
+        Models that fail to load are reported, not raised. Returns a report dict
+        (also kept as ``last_warm_up`` and included in ``stats()``).
+        """
+        rss_before = get_process_rss()
+        started = time.perf_counter()
+        loaded, failed = [], []
+        for model_name in dict.fromkeys(model_names):
+            for profile in profiles:
+                try:
+                    self.get(model_name, profile)
+                    loaded.append(f"{model_name} ({profile})")
+                except Exception as e:
+                    failed.append({"model": model_name, "profile": profile, "error": str(e)})
+        gc.collect()
+        rss_after = get_process_rss()
+
+        report = {
+            "loaded": loaded,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - started, 3),
+            "rss_before_mb": round(rss_before / (1024 * 1024), 1) if rss_before is not None else None,
+            "rss_after_mb": round(rss_after / (1024 * 1024), 1) if rss_after is not None else None,
+        }
+        if rss_before is not None and rss_after is not None:
+            report["rss_delta_mb"] = round((rss_after - rss_before) / (1024 * 1024), 1)
+        self.last_warm_up = report
+        logger.info(
+            f"Warmed up {len(loaded)} spaCy pipelines in {report['seconds']:.2f}s "
+            f"(RSS {report['rss_before_mb']} -> {report['rss_after_mb']} MB, {len(failed)} failed)"
+        )
+        return report
+
+    def is_loaded(self, model_name, profile=DEFAULT_PROFILE):
+        with self._lock:
+            return (model_name, profile) in self._models
+
+    def loaded_models(self):
+        """Return (model name, profile) of cached pipelines, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def stats(self):
+        """Return counters and per-model details as a JSON-serializable dict."""
+        rss = get_process_rss()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "loads": self.loads,
+                "load_failures": self.load_failures,
+                "evictions": self.evictions,
+                "load_seconds_total": round(self.load_seconds, 3),
+                "memory_budget_mb": (
+                    self.memory_budget_bytes / (1024 * 1024)
+                    if self.memory_budget_bytes
+                    else None
+                ),
+                "max_models": self.max_models,
+                "cached_mb": round(self._cached_bytes() / (1024 * 1024), 1),
+                "process_rss_mb": (
+                    round(rss / (1024 * 1024), 1) if rss is not None else None
+                ),
+                "models": [
+                    {
+                        "name": name,
+                        "profile": profile,
+                        "size_mb": round(entry.size_bytes / (1024 * 1024), 1),
+                        "load_seconds": round(entry.load_seconds, 3),
+                        "idle_seconds": round(time.monotonic() - entry.last_used, 1),
+                    }
+                    for (name, profile), entry in self._models.items()
+                ],
+                "last_warm_up": self.last_warm_up,
+                "pid": os.getpid(),
+            }
@@ -0,0 +1,128 @@
+"""
+Server-side multiword term matching with an Aho–Corasick automaton.
+
+The saved terms of a language that contain a space are compiled into an
+automaton over reader tokens (word_tokenizer.parse_text): words are
+lowercased, whitespace in separators collapses to one space, and a separator
+containing a newline (a paragraph break) is a symbol no phrase contains, so
+matches never cross paragraphs. One pass over a text finds every occurrence
+of every phrase in O(tokens + matches), however many phrases are saved.
+
+Occurrences are then resolved like buildStyledParagraphHtml in
+static/script.js: scanning left to right, the longest term (by characters)
+starting at a word wins and the scan continues after it.
+
+A matcher belongs to a vocab snapshot (vocab_snapshot.VocabSnapshot): it is
+built on first use and dropped when a committed write adds, removes or
+changes a multiword term.
+"""
+import re
+
+import word_tokenizer
+
+# Symbol for a separator that ends a paragraph
+PARAGRAPH_BREAK = None
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def token_symbol(kind, text):
+    """The automaton symbol of one reader token."""
+    if kind == "word":
+        return text.lower()
+    if "\n" in text:
+        return PARAGRAPH_BREAK
+    return _whitespace_re.sub(" ", text)
+
+
+def phrase_symbols(term):
+    """Symbols of a saved term, or None if the reader could never match it."""
+    tokens = word_tokenizer.parse_text(term.strip())
+    if len(tokens) < 2 or tokens[0][0] != "word" or tokens[-1][0] != "word":
+        return None
+    return tuple(_whitespace_re.sub(" ", text) if kind == "separator" else text.lower() for kind, text in tokens)
+
+
+class PhraseMatcher:
+    """Aho–Corasick automaton over the token symbols of a set of phrases."""
+
+    def __init__(self, terms):
+        # Node 0 is the root; per node: transitions, failure link, and the
+        # (length in tokens, term) of phrases ending there, own and inherited
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self.size = 0
+        for term in terms:
+            symbols = phrase_symbols(term)
+            if symbols:
+                self._add(symbols, term)
+        self._link()
+
+    def _add(self, symbols, term):
+        node = 0
+        for symbol in symbols:
+            following = self._goto[node].get(symbol)
+            if following is None:
+                following = len(self._goto)
+                self._goto[node][symbol] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = following
+        if not self._output[node]:
+            self.size += 1
+        self._output[node].append((len(symbols), term))
+
+    def _link(self):
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for symbol, following in self._goto[node].items():
+                queue.append(following)
+                fail = self._fail[node]
+                while fail and symbol not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(symbol, 0)
+                self._fail[following] = target if target != following else 0
+                self._output[following] = self._output[following] + self._output[self._fail[following]]
+
+    def __len__(self):
+        return self.size
+
+    def occurrences(self, tokens):
+        """Yield (first token, last token + 1, term) of every phrase occurrence in ``tokens``."""
+        if not self.size:
+            return
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for position, (kind, text) in enumerate(tokens):
+            symbol = token_symbol(kind, text)
+            while node and symbol not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(symbol, 0)
+            for length, term in output[node]:
+                yield position + 1 - length, position + 1, term
+
+    def match(self, tokens):
+        """
+        Non-overlapping (first token, last token + 1, term) spans as the reader
+        shows them: left to right, the longest term at each starting word.
+        """
+        best = {}
+        for start, end, term in self.occurrences(tokens):
+            current = best.get(start)
+            if current is None or len(term) > len(current[1]):
+                best[start] = (end, term)
+
+        spans = []
+        resume = 0
+        for start in sorted(best):
+            if start < resume:
+                continue
+            end, term = best[start]
+            spans.append((start, end, term))
+            resume = end
+        return spans
+
+    def match_text(self, text):
+        return self.match(word_tokenizer.parse_text(text or ""))
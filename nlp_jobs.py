@@ -0,0 +1,304 @@
+"""
+Background NLP jobs for lesson and story texts.
+
+spaCy analysis of a long transcript can take many seconds, so it runs in a
+bounded process pool instead of the request thread. The request saves the
+lesson with ``readability_status = "pending"`` and returns right away; when the
+worker process finishes, the analysis is stored in the analyzed_text cache and
+the readability score (and the lemma index that keeps it current, see
+readability_index.py) is filled in from a completion callback running under
+the app context.
+
+Analysis never falls back to the request thread: past NLP_MAX_PENDING_JOBS
+jobs keep queueing in the pool (with a warning), and if the pool cannot be
+started the item stays "pending" and is retried on the next submit (or by
+`flask backfill-readability`).
+
+Every process that submits jobs owns its own pool, and pool workers load
+their own models (spawned, so they do not share the pages preloaded by the
+gunicorn master). Under gunicorn that is WEB_CONCURRENCY x NLP_WORKERS model
+copies; gunicorn.conf.py derives NLP_WORKERS from NLP_TOTAL_WORKERS to bound
+the total.
+
+Configuration (app.config):
+    NLP_WORKERS: worker processes of this process's pool; 0 analyzes inline
+        in the request (development only).
+    NLP_MAX_PENDING_JOBS: jobs in flight before submits log a backlog warning.
+    NLP_WORKER_START_METHOD: multiprocessing start method for the pool.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from extensions import db
+from sentence_index import ITEM_TEXT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+READABILITY_PENDING = "pending"
+READABILITY_READY = "ready"
+READABILITY_FAILED = "failed"
+
+# Finished jobs remembered for the status endpoint
+JOB_HISTORY_SIZE = 500
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def analyze_in_worker(text, language_name):
+    """
+    Run in a pool process: analyze ``text`` with the analysis pipeline.
+
+    Each worker keeps its own model registry, so a model is loaded once per
+    worker process. Returns (model key, analysis JSON).
+    """
+    from extensions import get_spacy_model
+    from text_analysis import ANALYSIS_PROFILE, TextAnalysis, model_version_key
+
+    nlp = get_spacy_model(language_name, profile=ANALYSIS_PROFILE)
+    if nlp is None:
+        raise RuntimeError(f"No spaCy model available for {language_name}")
+    return model_version_key(nlp), TextAnalysis.analyze(nlp, text).to_json()
+
+
+def apply_analysis(item_type, item, analysis):
+    """
+    Fill in a lesson/story's sentence index, lemma index and readability score
+    from its analysis (None without a model) and mark it ready. Does not commit.
+    """
+    import json
+    from readability_index import index_document
+    from sentence_index import build_sentence_index
+
+    if analysis is not None:
+        item.sentence_index = json.dumps(
+            build_sentence_index(analysis), ensure_ascii=False, separators=(",", ":")
+        )
+    # Without a model the reader's tokenization is indexed instead; the lemma
+    # index keeps the score current as term statuses change
+    index_document(item_type, item, analysis)
+    item.readability_status = READABILITY_READY
+
+
+class NLPJob:
+    """Handle for one readability analysis job."""
+
+    def __init__(self, item_type, item_id, text_hash):
+        self.id = uuid.uuid4().hex
+        self.item_type = item_type
+        self.item_id = item_id
+        self.text_hash = text_hash
+        self.status = "queued"  # queued -> done | failed | superseded | deferred
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.readability_score = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "item_type": self.item_type,
+            "item_id": self.item_id,
+            "status": self.status,
+            "error": self.error,
+            "readability_score": self.readability_score,
+            "seconds": round((self.finished_at or time.time()) - self.submitted_at, 3),
+        }
+
+
+class NLPJobPool:
+    """Bounded process pool for readability analysis jobs."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.workers = 0
+        self.max_pending = 0
+        self.start_method = "spawn"
+        self._executor = None
+        self._executor_pid = None
+        self._jobs = OrderedDict()  # job id -> NLPJob
+        self._deferred = OrderedDict()  # (item type, item id) left pending, pool unavailable
+        self._pending = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = int(app.config.get("NLP_WORKERS", 0) or 0)
+        self.max_pending = int(app.config.get("NLP_MAX_PENDING_JOBS", 64) or 0)
+        self.start_method = app.config.get("NLP_WORKER_START_METHOD", "spawn")
+        atexit.register(self.shutdown)
+
+    def _get_executor(self):
+        # Created lazily (and again after a fork) so a preloading master never
+        # hands a running pool to its workers
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._executor_pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _remember(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > JOB_HISTORY_SIZE:
+                self._jobs.popitem(last=False)
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "in_flight": self._pending,
+                "max_pending": self.max_pending,
+                "deferred": len(self._deferred),
+                "jobs": statuses,
+            }
+
+    def submit_readability(self, item_type, item_id):
+        """
+        Analyze a committed lesson/story and fill in its readability score.
+
+        The item should already be saved with readability_status "pending".
+        Runs in the pool (inline only with NLP_WORKERS = 0). If the pool
+        cannot be started the item is left pending and retried with the next
+        submit. Returns the job id.
+        """
+        from text_analysis import content_hash
+
+        model_name, text_field = ITEM_TEXT_FIELDS[item_type]
+        Model = _get_model(model_name)
+        item = db.session.get(Model, item_id)
+        text = getattr(item, text_field) if item else None
+        job = NLPJob(item_type, item_id, content_hash(text or ""))
+        self._remember(job)
+
+        if item is None or not text or not text.strip():
+            self._finish_inline(job)
+            return job.id
+
+        if self.workers <= 0:
+            self._finish_inline(job)
+            return job.id
+
+        with self._lock:
+            self._pending += 1
+            backlog = self._pending
+        if self.max_pending and backlog > self.max_pending:
+            logger.warning(f"NLP pool backlog: {backlog} jobs in flight (NLP_MAX_PENDING_JOBS={self.max_pending})")
+
+        try:
+            future = self._get_executor().submit(
+                analyze_in_worker, text, item.language.name
+            )
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+                self._deferred[(item_type, item_id)] = None
+            job.status = "deferred"
+            job.finished_at = time.time()
+            logger.warning(f"NLP pool unavailable ({e}); {item_type} {item_id} left pending")
+            return job.id
+
+        future.add_done_callback(lambda f: self._on_done(job, f))
+        self._resubmit_deferred()
+        return job.id
+
+    def _resubmit_deferred(self):
+        """Submit the items left pending while the pool was unavailable."""
+        with self._lock:
+            deferred, self._deferred = list(self._deferred), OrderedDict()
+        for item_type, item_id in deferred:
+            self.submit_readability(item_type, item_id)
+
+    def _on_done(self, job, future):
+        with self._lock:
+            self._pending -= 1
+        with self.app.app_context():
+            try:
+                model_key, data = future.result()
+                self._finish(job, model_key=model_key, data=data)
+            except Exception as e:
+                db.session.rollback()
+                self._fail(job, e)
+
+    def _finish_inline(self, job):
+        try:
+            self._finish(job)
+        except Exception as e:
+            db.session.rollback()
+            self._fail(job, e)
+
+    def _finish(self, job, model_key=None, data=None):
+        """Store the analysis (if computed in a worker), the sentence index and the readability score."""
+        from text_analysis import TextAnalysis, content_hash, get_text_analysis, store_text_analysis
+
+        model_name, text_field = ITEM_TEXT_FIELDS[job.item_type]
+        item = db.session.get(_get_model(model_name), job.item_id)
+        text = getattr(item, text_field) if item else None
+        if item is None or content_hash(text or "") != job.text_hash:
+            # Deleted or edited again meanwhile; a newer job owns the score
+            job.status = "superseded"
+            job.finished_at = time.time()
+            return
+
+        if data is not None:
+            analysis = TextAnalysis.from_json(text, data)
+            store_text_analysis(analysis, model_key, commit=False)
+        else:
+            analysis = get_text_analysis(text, item.language.name, commit=False)
+
+        apply_analysis(job.item_type, item, analysis)
+        db.session.commit()
+
+        job.readability_score = item.readability_score
+        job.status = "done"
+        job.finished_at = time.time()
+        logger.info(
+            f"Readability for {job.item_type} {job.item_id}: {item.readability_score:.1f}% "
+            f"({job.finished_at - job.submitted_at:.2f}s)"
+        )
+
+    def _fail(self, job, error):
+        job.status = "failed"
+        job.error = str(error)
+        job.finished_at = time.time()
+        logger.error(f"Readability job for {job.item_type} {job.item_id} failed: {error}")
+        try:
+            model_name, _ = ITEM_TEXT_FIELDS[job.item_type]
+            item = db.session.get(_get_model(model_name), job.item_id)
+            if item is not None:
+                item.readability_status = READABILITY_FAILED
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Could not mark {job.item_type} {job.item_id} as failed: {e}")
+
+
+nlp_jobs = NLPJobPool()
@@ -0,0 +1,305 @@
+"""
+Resumable, batched readability backfill.
+
+Works through the lessons and stories of a language in batches: the texts of a
+batch are analyzed together (one ``nlp.pipe`` stream, cached analyses reused),
+indexed (see readability_index.py) and committed with a checkpoint, so a run
+holds the SQLite write lock for one batch at a time and an interrupted run
+picks up where it stopped.
+
+Used by ``flask backfill-readability`` and, in a background thread, by
+/backfill_readability_scores.
+
+The checkpoint of a language is stored in the Setting table under
+``readability_backfill:<language id>`` as "<doc type>:<id>" of the last
+committed document with no failed batch before it. Batches after a failed one
+are still committed but do not move the checkpoint, and it is only removed
+once a run finishes without failures, so the failed documents are retried
+by the next run (also with --all).
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extensions import Setting, db
+from nlp_jobs import READABILITY_READY, apply_analysis
+from sentence_index import ITEM_TEXT_FIELDS
+from text_analysis import get_text_analyses
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 25
+
+# Documents are processed in this order, each type by id
+DOC_TYPES = ("lesson", "story")
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def checkpoint_key(language_id):
+    return f"readability_backfill:{language_id}"
+
+
+def get_checkpoint(language_id):
+    """Return (doc type, id) of the last committed document, or None."""
+    setting = db.session.get(Setting, checkpoint_key(language_id))
+    if not setting or not setting.value:
+        return None
+    doc_type, _, doc_id = setting.value.partition(":")
+    return doc_type, int(doc_id)
+
+
+def _set_checkpoint(language_id, doc_type, doc_id):
+    key = checkpoint_key(language_id)
+    setting = db.session.get(Setting, key)
+    if setting is None:
+        db.session.add(Setting(key=key, value=f"{doc_type}:{doc_id}"))
+    else:
+        setting.value = f"{doc_type}:{doc_id}"
+
+
+def clear_checkpoint(language_id):
+    db.session.query(Setting).filter_by(key=checkpoint_key(language_id)).delete(
+        synchronize_session=False
+    )
+
+
+def pending_documents(language_id, force=False, after=None):
+    """
+    (doc type, id) of the documents to process, in processing order.
+
+    Without ``force`` only documents that are not indexed or not ready are
+    selected. ``after`` (a checkpoint) skips everything up to and including it.
+    """
+    documents = []
+    for doc_type in DOC_TYPES:
+        if after is not None and DOC_TYPES.index(doc_type) < DOC_TYPES.index(after[0]):
+            continue
+        model_name, text_field = ITEM_TEXT_FIELDS[doc_type]
+        Model = _get_model(model_name)
+        query = db.session.query(Model.id).filter(
+            Model.language_id == language_id, getattr(Model, text_field) != ""
+        )
+        if not force:
+            query = query.filter(
+                db.or_(
+                    Model.readability_token_count.is_(None),
+                    Model.readability_status != READABILITY_READY,
+                )
+            )
+        if after is not None and doc_type == after[0]:
+            query = query.filter(Model.id > after[1])
+        documents.extend((doc_type, doc_id) for (doc_id,) in query.order_by(Model.id))
+    return documents
+
+
+class BackfillProgress:
+    """Counters and throughput of one language's backfill."""
+
+    def __init__(self, language_name, total, resumed_from=None):
+        self.language_name = language_name
+        self.total = total
+        self.resumed_from = resumed_from
+        self.done = 0
+        self.failed = 0
+        self.characters = 0
+        self.started = time.time()
+        self.finished = None
+
+    @property
+    def seconds(self):
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        seconds = self.seconds
+        return {
+            "language": self.language_name,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "resumed_from": ":".join(map(str, self.resumed_from)) if self.resumed_from else None,
+            "seconds": round(seconds, 2),
+            "documents_per_second": round(self.done / seconds, 2) if seconds else 0.0,
+            "characters_per_second": round(self.characters / seconds) if seconds else 0,
+            "finished": self.finished is not None,
+        }
+
+    def line(self):
+        stats = self.to_dict()
+        remaining = self.total - self.done - self.failed
+        eta = remaining / stats["documents_per_second"] if stats["documents_per_second"] else 0
+        return (
+            f"[{self.language_name}] {self.done + self.failed}/{self.total} documents "
+            f"({self.failed} failed), {stats['documents_per_second']:.1f} docs/s, "
+            f"{stats['characters_per_second'] / 1000:.0f}k chars/s, ETA {eta:.0f}s"
+        )
+
+
+def _process_batch(language, batch, pipe_batch_size, checkpoint=True):
+    """Analyze, index and commit one batch (with a checkpoint after it if ``checkpoint``). Returns (documents, characters)."""
+    items = []
+    for doc_type, doc_id in batch:
+        model_name, text_field = ITEM_TEXT_FIELDS[doc_type]
+        item = db.session.get(_get_model(model_name), doc_id)
+        if item is not None:
+            items.append((doc_type, item, getattr(item, text_field) or ""))
+
+    analyses = get_text_analyses(
+        [text for _, _, text in items], language.name, commit=False, batch_size=pipe_batch_size
+    )
+    for position, (doc_type, item, _) in enumerate(items):
+        apply_analysis(doc_type, item, analyses[position] if analyses else None)
+
+    if checkpoint:
+        last_type, last_id = batch[-1]
+        _set_checkpoint(language.id, last_type, last_id)
+    db.session.commit()
+    return len(items), sum(len(text) for _, _, text in items)
+
+
+def backfill_language(language_id, batch_size=DEFAULT_BATCH_SIZE, force=False, restart=False,
+                      pipe_batch_size=None, report=None, progress=None):
+    """
+    Backfill the readability of one language, committing after every batch.
+
+    Args:
+        language_id: Language to process.
+        batch_size: Documents analyzed and committed together.
+        force: Re-analyze every document, not only unindexed/unfinished ones.
+        restart: Ignore a checkpoint left by an interrupted run.
+        pipe_batch_size: Text chunks per nlp.pipe batch.
+        report: Called with a progress line after every batch (e.g. print).
+        progress: BackfillProgress to update instead of creating one.
+
+    Returns:
+        The BackfillProgress of the run.
+    """
+    Language = _get_model("Language")
+    language = db.session.get(Language, language_id)
+    if language is None:
+        raise ValueError(f"Language {language_id} not found")
+
+    if restart:
+        # A stale checkpoint would otherwise survive a run whose first batch fails
+        clear_checkpoint(language_id)
+        db.session.commit()
+    checkpoint = None if restart else get_checkpoint(language_id)
+    documents = pending_documents(language_id, force=force, after=checkpoint)
+    if progress is None:
+        progress = BackfillProgress(language.name, len(documents), checkpoint)
+    else:
+        progress.total, progress.resumed_from = len(documents), checkpoint
+
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        try:
+            # Past a failed batch the checkpoint stays put so a resumed run retries it
+            done, characters = _process_batch(language, batch, pipe_batch_size, checkpoint=not progress.failed)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Readability backfill batch failed for {language.name}: {e}")
+            progress.failed += len(batch)
+            continue
+        progress.done += done
+        progress.characters += characters
+        if report:
+            report(progress.line())
+
+    if progress.failed:
+        logger.warning(
+            f"Readability backfill of {language.name}: {progress.failed} documents failed; "
+            f"the checkpoint is kept so the next run retries them"
+        )
+    else:
+        clear_checkpoint(language_id)
+        db.session.commit()
+    progress.finished = time.time()
+    return progress
+
+
+def _backfill_in_worker(language_id, options):
+    """Run in a pool process: backfill one language inside its own app context."""
+    from app import app
+
+    with app.app_context():
+        return backfill_language(language_id, report=print, **options).to_dict()
+
+
+def backfill_languages(language_ids, jobs=1, report=None, **options):
+    """
+    Backfill several languages, one after another or with up to ``jobs``
+    worker processes (one language per worker). Returns a list of result dicts.
+    """
+    if jobs <= 1 or len(language_ids) <= 1:
+        return [
+            backfill_language(language_id, report=report, **options).to_dict()
+            for language_id in language_ids
+        ]
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(language_ids)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = {
+            executor.submit(_backfill_in_worker, language_id, options): language_id
+            for language_id in language_ids
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            if report:
+                report(
+                    f"[{result['language']}] done: {result['done']} documents in {result['seconds']}s"
+                )
+            results.append(result)
+    return results
+
+
+class BackgroundBackfill:
+    """Runs a backfill of every language in a daemon thread of the web process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._progress = []
+
+    def start(self, app, **options):
+        """Start a run unless one is in progress. Returns False if already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._progress = []
+            self._thread = threading.Thread(
+                target=self._run, args=(app, options), name="readability-backfill", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def _run(self, app, options):
+        with app.app_context():
+            Language = _get_model("Language")
+            for (language_id, name) in db.session.query(Language.id, Language.name).order_by(Language.name):
+                progress = BackfillProgress(name, 0)
+                with self._lock:
+                    self._progress.append(progress)
+                try:
+                    backfill_language(language_id, progress=progress, report=logger.info, **options)
+                except Exception as e:
+                    db.session.rollback()
+                    progress.finished = time.time()
+                    logger.error(f"Readability backfill for {name} stopped: {e}")
+
+    def status(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "languages": [progress.to_dict() for progress in self._progress],
+            }
+
+
+background_backfill = BackgroundBackfill()
@@ -0,0 +1,216 @@
+"""
+Incremental readability scores for lessons and stories.
+
+compute_readability averages the status weights of a text's counted words, so
+a document's score only depends on how many times each lemma occurs in it:
+
+    score = 100 * Σ count(lemma) * weight(lemma) / Σ count(lemma)
+
+where the sums run over lemmas that are not ignored. When a document is
+analyzed, its lemma counts are stored in the document_lemma table (an inverted
+index lemma -> documents) together with the two sums on the lesson/story row.
+When a term's status changes, only the documents containing its lemma are
+touched, by adding ``count * (new weight - old weight)`` to their sums:
+
+    before = snapshot_lemmas(language_id, [term.lemma])
+    term.status = new_status
+    apply_lemma_changes(language_id, before)
+    db.session.commit()
+
+Documents that have not been indexed yet (readability_token_count is NULL)
+are left alone; they get indexed the next time they are analyzed. Rescoring
+a whole language at once goes through readability_matrix.py instead.
+"""
+import logging
+from collections import defaultdict
+
+from sqlalchemy import bindparam, case, update
+
+import readability_matrix
+from extensions import db
+from sentence_index import ITEM_TEXT_FIELDS
+from text_processor import summarize_words
+from vocab_utils import LOOKUP_CHUNK_SIZE, STATUS_WEIGHTS, lemma_statuses
+
+logger = logging.getLogger(__name__)
+
+STATUS_IGNORED = 7
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def _weight(status):
+    """(weight, counted) contribution of one occurrence of a word with ``status``."""
+    if status == STATUS_IGNORED:
+        return 0.0, 0
+    return STATUS_WEIGHTS.get(status, 0.0), 1
+
+
+def score_from_sums(weight_sum, token_count):
+    """Readability percentage from the stored sums, like compute_readability."""
+    if not token_count:
+        return 100.0  # nothing to read = "fully readable"
+    return (weight_sum / token_count) * 100
+
+
+def document_lemma_counts(text, analysis=None):
+    """
+    Count the lemmas of a text that take part in its readability score.
+
+    With a TextAnalysis these are the lemma counts of its summary (alphabetic,
+    no stop words, no generic pronouns); without one, the lowercase words of
+    the reader's tokenization.
+    """
+    if analysis is not None:
+        return analysis.summary().lemma_counts
+    return summarize_words(text).lemma_counts
+
+
+def index_document(item_type, item, analysis=None):
+    """
+    (Re)build the lemma index of a lesson/story and set its readability score.
+
+    Replaces the item's document_lemma rows and fills readability_weight_sum,
+    readability_token_count and readability_score. Does not commit.
+    """
+    DocumentLemma = _get_model("DocumentLemma")
+    _, text_field = ITEM_TEXT_FIELDS[item_type]
+
+    counts = document_lemma_counts(getattr(item, text_field) or "", analysis)
+    statuses = lemma_statuses(item.language_id, counts)
+
+    weight_sum = 0.0
+    token_count = 0
+    for lemma, count in counts.items():
+        weight, counted = _weight(statuses.get(lemma, 0))
+        weight_sum += count * weight
+        token_count += count * counted
+
+    signature_before = readability_matrix.current_signature(item.language_id)
+    _delete_rows(item_type, item.id)
+    if counts:
+        db.session.execute(
+            DocumentLemma.__table__.insert(),
+            [
+                {
+                    "doc_type": item_type,
+                    "doc_id": item.id,
+                    "language_id": item.language_id,
+                    "lemma": lemma,
+                    "count": count,
+                }
+                for lemma, count in counts.items()
+            ],
+        )
+    readability_matrix.update_document(item.language_id, item_type, item.id, counts, signature_before)
+
+    item.readability_weight_sum = weight_sum
+    item.readability_token_count = token_count
+    item.readability_score = score_from_sums(weight_sum, token_count)
+    return item.readability_score
+
+
+def _delete_rows(item_type, item_id):
+    DocumentLemma = _get_model("DocumentLemma")
+    db.session.query(DocumentLemma).filter_by(doc_type=item_type, doc_id=item_id).delete(
+        synchronize_session=False
+    )
+
+
+def remove_document(item_type, item_id):
+    """Drop the lemma index rows of a lesson/story (call before deleting it). Does not commit."""
+    item = db.session.get(_get_model(ITEM_TEXT_FIELDS[item_type][0]), item_id)
+    if item is None:
+        _delete_rows(item_type, item_id)
+        return
+    signature_before = readability_matrix.current_signature(item.language_id)
+    _delete_rows(item_type, item_id)
+    readability_matrix.drop_document(item.language_id, item_type, item_id, signature_before)
+
+
+def remove_language(language_id):
+    """Drop the lemma index rows of every document in a language. Does not commit."""
+    DocumentLemma = _get_model("DocumentLemma")
+    db.session.query(DocumentLemma).filter_by(language_id=language_id).delete(
+        synchronize_session=False
+    )
+    readability_matrix.drop_language(language_id)
+
+
+def snapshot_lemmas(language_id, lemmas):
+    """Current status of each lemma (0 if it has no term), taken before a change."""
+    lemmas = {lemma for lemma in lemmas if lemma}
+    statuses = lemma_statuses(language_id, lemmas)
+    return {lemma: statuses.get(lemma, 0) for lemma in lemmas}
+
+
+def apply_lemma_changes(language_id, before):
+    """
+    Update the readability of every document containing a lemma whose status
+    changed since ``before`` (from snapshot_lemmas) was taken.
+
+    Flushes the session so pending term changes are visible, then applies the
+    per-document deltas with one executemany UPDATE per document type. Does
+    not commit. Returns the number of documents updated.
+    """
+    if not before:
+        return 0
+    DocumentLemma = _get_model("DocumentLemma")
+
+    db.session.flush()
+    after = lemma_statuses(language_id, before)
+    deltas = {}
+    for lemma, old_status in before.items():
+        old_weight, old_counted = _weight(old_status)
+        new_weight, new_counted = _weight(after.get(lemma, 0))
+        if (old_weight, old_counted) != (new_weight, new_counted):
+            deltas[lemma] = (new_weight - old_weight, new_counted - old_counted)
+    if not deltas:
+        return 0
+
+    # (doc_type, doc_id) -> [Δ weight sum, Δ token count]
+    doc_deltas = defaultdict(lambda: [0.0, 0])
+    changed = list(deltas)
+    for i in range(0, len(changed), LOOKUP_CHUNK_SIZE):
+        rows = db.session.query(
+            DocumentLemma.doc_type, DocumentLemma.doc_id, DocumentLemma.lemma, DocumentLemma.count
+        ).filter(
+            DocumentLemma.language_id == language_id,
+            DocumentLemma.lemma.in_(changed[i:i + LOOKUP_CHUNK_SIZE]),
+        )
+        for doc_type, doc_id, lemma, count in rows:
+            d_weight, d_count = deltas[lemma]
+            doc_delta = doc_deltas[(doc_type, doc_id)]
+            doc_delta[0] += count * d_weight
+            doc_delta[1] += count * d_count
+
+    by_type = defaultdict(list)
+    for (doc_type, doc_id), (d_weight, d_count) in doc_deltas.items():
+        by_type[doc_type].append({"b_id": doc_id, "b_weight": d_weight, "b_count": d_count})
+
+    for doc_type, params in by_type.items():
+        table = _get_model(ITEM_TEXT_FIELDS[doc_type][0]).__table__
+        new_sum = table.c.readability_weight_sum + bindparam("b_weight")
+        new_count = table.c.readability_token_count + bindparam("b_count")
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .where(table.c.readability_token_count.isnot(None))
+            .values(
+                readability_weight_sum=new_sum,
+                readability_token_count=new_count,
+                readability_score=case(
+                    (new_count > 0, new_sum * 100.0 / new_count), else_=100.0
+                ),
+            ),
+            params,
+        )
+
+    logger.info(
+        f"Readability updated for {len(doc_deltas)} documents "
+        f"({len(deltas)} lemmas changed, language {language_id})"
+    )
+    return len(doc_deltas)
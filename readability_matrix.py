@@ -0,0 +1,350 @@
+"""
+Whole-library readability as one sparse matrix-vector product.
+
+The document_lemma table (see readability_index.py) is a persisted sparse
+document x lemma count matrix in coordinate form. For each language it is
+loaded once into CSR arrays:
+
+    indptr[row] .. indptr[row + 1]   entries of one lesson/story
+    indices[entry]                   lemma column
+    data[entry]                      occurrences of that lemma
+
+With a dense per-lemma weight vector w (STATUS_WEIGHTS of each lemma's
+status) and a 0/1 vector k (lemma counted, i.e. not ignored), the readability
+of every document is
+
+    score = 100 * (A @ w) / (A @ k)
+
+which NumPy computes for thousands of documents in milliseconds. Rows can be
+appended or replaced for single documents as they are (re)analyzed. Each
+process keeps its own matrices; a cheap (row count, max id) signature of the
+language's document_lemma rows detects changes made by other processes, and
+the matrix is rebuilt when it no longer matches. A local change only carries
+the signature forward when the matrix was current right before it (the
+caller takes current_signature() before writing); otherwise the signature is
+cleared so the next get_matrix reloads.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import bindparam, update
+
+from extensions import db
+from sentence_index import ITEM_TEXT_FIELDS
+from vocab_utils import STATUS_WEIGHTS, lemma_statuses
+
+logger = logging.getLogger(__name__)
+
+STATUS_IGNORED = 7
+
+# Status -> weight / counted, indexed by status 0..7
+_STATUS_WEIGHT = np.array([STATUS_WEIGHTS.get(s, 0.0) for s in range(STATUS_IGNORED + 1)])
+_STATUS_COUNTED = np.array([0.0 if s == STATUS_IGNORED else 1.0 for s in range(STATUS_IGNORED + 1)])
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+class LemmaMatrix:
+    """Sparse document x lemma count matrix of one language."""
+
+    def __init__(self, language_id):
+        self.language_id = language_id
+        self.lemmas = []  # column -> lemma
+        self.lemma_ids = {}  # lemma -> column
+        self.docs = []  # row -> (doc_type, doc_id), None once removed
+        self.doc_rows = {}  # (doc_type, doc_id) -> row
+        self._rows = []  # row -> (columns, counts) arrays
+        self._csr = None  # (indptr, indices, data, entry rows), built lazily
+        self.signature = None
+
+    @classmethod
+    def from_triplets(cls, language_id, triplets):
+        """Build from (doc_type, doc_id, lemma, count) tuples grouped by document."""
+        matrix = cls(language_id)
+        current = None
+        columns, counts = [], []
+        for doc_type, doc_id, lemma, count in triplets:
+            key = (doc_type, doc_id)
+            if key != current:
+                if current is not None:
+                    matrix._append(current, columns, counts)
+                current, columns, counts = key, [], []
+            columns.append(matrix._column(lemma))
+            counts.append(count)
+        if current is not None:
+            matrix._append(current, columns, counts)
+        return matrix
+
+    @property
+    def shape(self):
+        return len(self._rows), len(self.lemmas)
+
+    @property
+    def nnz(self):
+        return sum(len(columns) for columns, _ in self._rows)
+
+    def _column(self, lemma):
+        column = self.lemma_ids.get(lemma)
+        if column is None:
+            column = self.lemma_ids[lemma] = len(self.lemmas)
+            self.lemmas.append(lemma)
+        return column
+
+    def _append(self, key, columns, counts):
+        self.doc_rows[key] = len(self.docs)
+        self.docs.append(key)
+        self._rows.append((np.asarray(columns, dtype=np.int32), np.asarray(counts, dtype=np.int32)))
+
+    def set_row(self, doc_type, doc_id, counts):
+        """Append or replace the row of one document from a {lemma: count} mapping."""
+        key = (doc_type, doc_id)
+        columns = np.fromiter((self._column(lemma) for lemma in counts), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.int32, count=len(counts))
+        row = self.doc_rows.get(key)
+        if row is None:
+            self.doc_rows[key] = len(self.docs)
+            self.docs.append(key)
+            self._rows.append((columns, values))
+        else:
+            self._rows[row] = (columns, values)
+        self._csr = None
+
+    def remove_row(self, doc_type, doc_id):
+        """Drop a document; its row is kept empty until the next rebuild."""
+        row = self.doc_rows.pop((doc_type, doc_id), None)
+        if row is None:
+            return False
+        self.docs[row] = None
+        self._rows[row] = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))
+        self._csr = None
+        return True
+
+    def csr(self):
+        """Return (indptr, indices, data, row of each entry)."""
+        if self._csr is None:
+            lengths = np.fromiter((len(columns) for columns, _ in self._rows), dtype=np.int64, count=len(self._rows))
+            indptr = np.zeros(len(self._rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            if self._rows:
+                indices = np.concatenate([columns for columns, _ in self._rows])
+                data = np.concatenate([counts for _, counts in self._rows])
+            else:
+                indices = np.empty(0, dtype=np.int32)
+                data = np.empty(0, dtype=np.int32)
+            entry_rows = np.repeat(np.arange(len(self._rows)), lengths)
+            self._csr = (indptr, indices, data, entry_rows)
+        return self._csr
+
+    def status_vectors(self, statuses):
+        """Dense (weights, counted) vectors over the lemma columns for {lemma: status}."""
+        codes = np.zeros(len(self.lemmas), dtype=np.int8)
+        for lemma, status in statuses.items():
+            column = self.lemma_ids.get(lemma)
+            if column is not None and 0 <= status <= STATUS_IGNORED:
+                codes[column] = status
+        return _STATUS_WEIGHT[codes], _STATUS_COUNTED[codes]
+
+    def score(self, statuses):
+        """
+        Readability of every document for the given {lemma: status} mapping.
+
+        Returns (doc keys, weight sums, counted words, scores); removed rows
+        are left out.
+        """
+        indptr, indices, data, entry_rows = self.csr()
+        weights, counted = self.status_vectors(statuses)
+        n_rows = len(self._rows)
+        weight_sums = np.bincount(entry_rows, weights=data * weights[indices], minlength=n_rows)
+        token_counts = np.bincount(entry_rows, weights=data * counted[indices], minlength=n_rows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(token_counts > 0, weight_sums * 100.0 / token_counts, 100.0)
+
+        live = self._live()
+        keys = [key for key in self.docs if key is not None]
+        return keys, weight_sums[live], token_counts[live].astype(np.int64), scores[live]
+
+    def distinct_counts(self, lemmas):
+        """Number of the given lemmas occurring in each document (removed rows left out)."""
+        _, indices, _, entry_rows = self.csr()
+        selected = np.zeros(len(self.lemmas), dtype=bool)
+        columns = [self.lemma_ids[lemma] for lemma in lemmas if lemma in self.lemma_ids]
+        selected[columns] = True
+        counts = np.bincount(entry_rows, weights=selected[indices], minlength=len(self._rows))
+        return counts[self._live()].astype(np.int64)
+
+    def column_sums(self, values, weighted=True):
+        """
+        Per document Σ count * value (Σ value unless ``weighted``) over the
+        columns of a {lemma: value} mapping, removed rows left out. Only the
+        entries of those columns contribute, so this is cheap for a handful
+        of changed lemmas.
+        """
+        _, indices, data, entry_rows = self.csr()
+        column_values = np.zeros(len(self.lemmas))
+        for lemma, value in values.items():
+            column = self.lemma_ids.get(lemma)
+            if column is not None:
+                column_values[column] = value
+        selected = np.flatnonzero(column_values[indices])
+        contributions = column_values[indices[selected]]
+        if weighted:
+            contributions = contributions * data[selected]
+        sums = np.bincount(entry_rows[selected], weights=contributions, minlength=len(self._rows))
+        return sums[self._live()]
+
+    def _live(self):
+        return np.fromiter((key is not None for key in self.docs), dtype=bool, count=len(self.docs))
+
+
+_matrices = {}  # language id -> LemmaMatrix
+_lock = threading.Lock()
+
+
+def _signature(language_id):
+    DocumentLemma = _get_model("DocumentLemma")
+    return tuple(
+        db.session.query(db.func.count(DocumentLemma.id), db.func.max(DocumentLemma.id))
+        .filter(DocumentLemma.language_id == language_id)
+        .one()
+    )
+
+
+def current_signature(language_id):
+    """Signature of a language's document_lemma rows; take it before changing them."""
+    return _signature(language_id)
+
+
+def load_matrix(language_id):
+    """Build the matrix of a language from its document_lemma rows."""
+    DocumentLemma = _get_model("DocumentLemma")
+    started = time.perf_counter()
+    # Taken first: rows written while loading leave the matrix behind it
+    signature = _signature(language_id)
+    rows = (
+        db.session.query(DocumentLemma.doc_type, DocumentLemma.doc_id, DocumentLemma.lemma, DocumentLemma.count)
+        .filter(DocumentLemma.language_id == language_id)
+        .order_by(DocumentLemma.doc_type, DocumentLemma.doc_id)
+        .yield_per(10000)
+    )
+    matrix = LemmaMatrix.from_triplets(language_id, rows)
+    matrix.signature = signature
+    logger.info(
+        f"Loaded readability matrix for language {language_id}: "
+        f"{matrix.shape[0]} documents x {matrix.shape[1]} lemmas, {matrix.nnz} entries "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return matrix
+
+
+def get_matrix(language_id):
+    """Return the current matrix of a language, rebuilding it if the index changed."""
+    signature = _signature(language_id)
+    with _lock:
+        matrix = _matrices.get(language_id)
+        if matrix is None or matrix.signature != signature:
+            matrix = _matrices[language_id] = load_matrix(language_id)
+        return matrix
+
+
+def _advance(matrix, signature_before):
+    """
+    After applying this process's change to ``matrix``: adopt the new stored
+    signature if the matrix matched the rows right before the change, else
+    clear it so changes of other processes are loaded too.
+    """
+    if matrix.signature is not None and matrix.signature == signature_before:
+        matrix.signature = _signature(matrix.language_id)
+    else:
+        matrix.signature = None
+
+
+def update_document(language_id, doc_type, doc_id, counts, signature_before):
+    """
+    Replace one document's row in the language's matrix, if it is loaded.
+    ``signature_before`` is current_signature() from before its rows were written.
+    """
+    with _lock:
+        matrix = _matrices.get(language_id)
+        if matrix is None:
+            return
+        matrix.set_row(doc_type, doc_id, counts)
+        _advance(matrix, signature_before)
+
+
+def drop_document(language_id, doc_type, doc_id, signature_before):
+    """Remove a document from the language's matrix, if it is loaded (see update_document)."""
+    with _lock:
+        matrix = _matrices.get(language_id)
+        if matrix is None:
+            return
+        matrix.remove_row(doc_type, doc_id)
+        _advance(matrix, signature_before)
+
+
+def drop_language(language_id):
+    with _lock:
+        _matrices.pop(language_id, None)
+
+
+def score_documents(language_id, statuses, count_lemmas=None):
+    """
+    Score every indexed document of a language for {lemma: status}.
+
+    Returns (doc keys, weight sums, counted words, scores) and, when
+    ``count_lemmas`` is given, the number of those lemmas in each document.
+    """
+    matrix = get_matrix(language_id)
+    with _lock:
+        result = matrix.score(statuses)
+        if count_lemmas is not None:
+            result += (matrix.distinct_counts(count_lemmas),)
+    return result
+
+
+def column_sums(matrix, values, weighted=True):
+    """LemmaMatrix.column_sums of a matrix from get_matrix, under the module lock."""
+    with _lock:
+        return matrix.column_sums(values, weighted)
+
+
+def rescore_language(language_id):
+    """
+    Recompute the readability of every indexed lesson and story of a language
+    with one mat-vec and write the results back. Does not commit.
+
+    Returns the number of documents rescored.
+    """
+    started = time.perf_counter()
+    keys, weight_sums, token_counts, scores = score_documents(
+        language_id, lemma_statuses(language_id, None)
+    )
+
+    by_type = {}
+    for (doc_type, doc_id), weight_sum, token_count, score in zip(
+        keys, weight_sums.tolist(), token_counts.tolist(), scores.tolist()
+    ):
+        by_type.setdefault(doc_type, []).append(
+            {"b_id": doc_id, "b_weight": weight_sum, "b_count": token_count, "b_score": score}
+        )
+    for doc_type, params in by_type.items():
+        table = _get_model(ITEM_TEXT_FIELDS[doc_type][0]).__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                readability_weight_sum=bindparam("b_weight"),
+                readability_token_count=bindparam("b_count"),
+                readability_score=bindparam("b_score"),
+            ),
+            params,
+        )
+    logger.info(
+        f"Rescored {len(keys)} documents of language {language_id} "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+    return len(keys)
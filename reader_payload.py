@@ -0,0 +1,150 @@
+"""
+Server-prepared reader payloads.
+
+``/api/reader/<lesson_id>`` gives the reader everything it needs for first
+paint in one response: the lesson tokenized exactly like parseText in
+static/script.js (see word_tokenizer.py), the status and translation of every
+distinct word, the saved multiword terms found in the text (see
+multiword_matcher.py), the paragraph timestamps and the timestamp offset.
+
+Payload layout (lists instead of objects keep it small):
+
+    tokens        [["w", text, term id] | ["s", text], ...]
+    terms         [[lowercase term, status, translation id or null], ...]
+    translations  [translation, ...]
+    multiword     [[first token, last token + 1, term, status, translation id], ...]
+    timestamps    the lesson's paragraph timestamps, or null
+    offset        timestamp offset in seconds
+
+A payload depends only on the lesson (text, timestamps, offset) and the
+language's vocab_version, so its ETag is derived from those two and built
+payloads are kept in a small in-process LRU cache.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from vocab_snapshot import get_vocab_version, vocab_snapshots
+import word_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Built payloads kept per process
+PAYLOAD_CACHE_SIZE = 64
+
+
+def content_hash(lesson):
+    """Hash of everything in a payload that comes from the lesson itself."""
+    digest = hashlib.sha1()
+    for part in (lesson.text_content or "", lesson.timestamps or "", repr(lesson.timestamp_offset)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def payload_etag(lesson_id, lesson_hash, vocab_version):
+    return f"reader-{lesson_id}-{lesson_hash[:16]}-{vocab_version}"
+
+
+def build_payload(lesson, version=None):
+    """
+    Build the reader payload of a lesson from its language's vocab snapshot
+    (at ``version``, or the stored one). Word and phrase statuses are read in
+    one step, so they all belong to the ``vocab_version`` the payload reports.
+    """
+    tokens = word_tokenizer.parse_text(lesson.text_content or "")
+    words = {text.lower() for kind, text in tokens if kind == "word"}
+    version, known, (matcher, phrases) = vocab_snapshots.lookup(lesson.language_id, words, version, phrases=True)
+
+    term_ids = {}
+    terms = []
+    translation_ids = {}
+    translations = []
+
+    def translation_id(translation):
+        if not translation:
+            return None
+        if translation not in translation_ids:
+            translation_ids[translation] = len(translations)
+            translations.append(translation)
+        return translation_ids[translation]
+
+    token_rows = []
+    for kind, text in tokens:
+        if kind != "word":
+            token_rows.append(["s", text])
+            continue
+        lower = text.lower()
+        term_id = term_ids.get(lower)
+        if term_id is None:
+            status, translation = known.get(lower, (0, None))
+            term_id = term_ids[lower] = len(terms)
+            terms.append([lower, status, translation_id(translation)])
+        token_rows.append(["w", text, term_id])
+
+    multiword = []
+    for start, end, term in matcher.match(tokens):
+        status, translation = phrases[term]
+        multiword.append([start, end, term, status, translation_id(translation)])
+
+    return {
+        "lesson_id": lesson.id,
+        "language_id": lesson.language_id,
+        "vocab_version": version,
+        "tokens": token_rows,
+        "terms": terms,
+        "translations": translations,
+        "multiword": multiword,
+        "timestamps": json.loads(lesson.timestamps) if lesson.timestamps else None,
+        "offset": lesson.timestamp_offset or 0,
+    }
+
+
+class PayloadCache:
+    """LRU of serialized payloads keyed by (lesson id, content hash, vocab version)."""
+
+    def __init__(self, size=PAYLOAD_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+payload_cache = PayloadCache()
+
+
+def payload_key(lesson):
+    """(cache key, ETag) of a lesson's current payload; cheap, nothing is built."""
+    lesson_hash = content_hash(lesson)
+    version = get_vocab_version(lesson.language_id)
+    return (lesson.id, lesson_hash, version), payload_etag(lesson.id, lesson_hash, version)
+
+
+def reader_payload(lesson, key):
+    """
+    (key, serialized payload) for a key from payload_key, built only on a
+    cache miss. The returned key carries the vocab_version the payload was
+    built at, which is newer than the requested one if a commit landed since.
+    """
+    body = payload_cache.get(key)
+    if body is None:
+        payload = build_payload(lesson, key[2])
+        key = (key[0], key[1], payload["vocab_version"])
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        payload_cache.put(key, body)
+    return key, body
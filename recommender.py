@@ -0,0 +1,245 @@
+"""
+"Next lesson" recommendations from a per-language comprehension index.
+
+For every indexed lesson and story of a language the index keeps, sorted by
+comprehension (readability_score / 100, the weighted known-token ratio):
+
+    scores[i]      comprehension of the i-th document
+    learning[i]    distinct lemmas in it currently being learned (status 1-5)
+    docs[i]        (doc type, id)
+
+Both columns come from one pass over the sparse document x lemma matrix (see
+readability_matrix.py). A query for a target ratio is a ``searchsorted`` on the
+sorted scores followed by a walk outwards, so it costs O(log n + k) and never
+touches the texts.
+
+The index is stamped with the lemma matrix it was built from and the
+language's vocab_version (one primary-key read per request). A new matrix
+rebuilds it; term changes are applied incrementally: the terms changed since
+its version come from the VocabChange log, only their lemmas are looked up
+again, and each document's sums are adjusted by the changed lemmas' columns
+(see LemmaMatrix.column_sums) instead of a full status query and mat-vec.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+from extensions import db
+import readability_matrix
+from vocab_snapshot import get_vocab_version, logged_changes
+from vocab_utils import LOOKUP_CHUNK_SIZE, STATUS_WEIGHTS, lemma_statuses
+
+logger = logging.getLogger(__name__)
+
+LEARNING_STATUSES = (1, 2, 3, 4, 5)
+STATUS_IGNORED = 7
+
+# More changed terms than this since the index was built: rebuild it instead
+MAX_INCREMENTAL_TERMS = 5000
+
+# With reinforcement weighting, this many nearest documents per requested
+# result are re-ranked
+CANDIDATE_FACTOR = 5
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+class ComprehensionIndex:
+    """Documents of one language sorted by comprehension."""
+
+    def __init__(self, language_id, matrix, version, statuses, term_lemmas, docs, weight_sums, token_counts, learning):
+        self.language_id = language_id
+        self.matrix = matrix
+        self.signature = matrix.signature
+        self.version = version  # Language.vocab_version the statuses are current at
+        self.statuses = statuses  # lemma -> status
+        self.term_lemmas = term_lemmas  # term -> lemma (or the term itself)
+        # Per document, in matrix row order
+        self._docs = docs
+        self._weight_sums = weight_sums
+        self._token_counts = token_counts.astype(np.float64)
+        self._learning = learning.astype(np.int64)
+        self._sort()
+        self.built_at = time.time()
+
+    def _sort(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(self._token_counts > 0, self._weight_sums / self._token_counts, 1.0)
+        order = np.argsort(scores, kind="stable")
+        self.docs = [self._docs[i] for i in order.tolist()]
+        self.scores = scores[order]
+        self.learning = self._learning[order]
+
+    @classmethod
+    def build(cls, language_id, matrix, version):
+        VocabTerm = _get_model("VocabTerm")
+        statuses = lemma_statuses(language_id, None)
+        term_lemmas = dict(
+            db.session.query(VocabTerm.term, db.func.coalesce(VocabTerm.lemma, VocabTerm.term))
+            .filter(VocabTerm.language_id == language_id)
+        )
+        learning_lemmas = [lemma for lemma, status in statuses.items() if status in LEARNING_STATUSES]
+        docs, weight_sums, token_counts, _, learning = readability_matrix.score_documents(
+            language_id, statuses, count_lemmas=learning_lemmas
+        )
+        return cls(language_id, matrix, version, statuses, term_lemmas, docs, weight_sums, token_counts, learning)
+
+    def apply_changes(self, version, changed_terms):
+        """
+        Bring the index to ``version`` given the terms changed since its own
+        version: only the lemmas of those terms are looked up again, and only
+        their matrix columns are read to adjust the per-document sums.
+        """
+        VocabTerm = _get_model("VocabTerm")
+        lemmas = {self.term_lemmas.pop(term) for term in changed_terms if term in self.term_lemmas}
+        for i in range(0, len(changed_terms), LOOKUP_CHUNK_SIZE):
+            rows = db.session.query(VocabTerm.term, db.func.coalesce(VocabTerm.lemma, VocabTerm.term)).filter(
+                VocabTerm.language_id == self.language_id,
+                VocabTerm.term.in_(changed_terms[i:i + LOOKUP_CHUNK_SIZE]),
+            )
+            for term, lemma in rows:
+                self.term_lemmas[term] = lemma
+                lemmas.add(lemma)
+
+        current = lemma_statuses(self.language_id, lemmas)
+        weight_deltas, counted_deltas, learning_deltas = {}, {}, {}
+        for lemma in lemmas:
+            old, new = self.statuses.pop(lemma, 0), current.get(lemma, 0)
+            if lemma in current:
+                self.statuses[lemma] = new
+            if old == new:
+                continue
+            old_weight, old_counted = _weight(old)
+            new_weight, new_counted = _weight(new)
+            weight_deltas[lemma] = new_weight - old_weight
+            counted_deltas[lemma] = new_counted - old_counted
+            learning_deltas[lemma] = (new in LEARNING_STATUSES) - (old in LEARNING_STATUSES)
+
+        if weight_deltas:
+            matrix = self.matrix
+            self._weight_sums = self._weight_sums + readability_matrix.column_sums(matrix, weight_deltas)
+            self._token_counts = self._token_counts + readability_matrix.column_sums(matrix, counted_deltas)
+            self._learning = self._learning + np.rint(
+                readability_matrix.column_sums(matrix, learning_deltas, weighted=False)
+            ).astype(np.int64)
+            self._sort()
+        self.version = version
+        return len(weight_deltas)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def nearest(self, target, k):
+        """Positions of the k documents whose comprehension is closest to ``target``."""
+        n = len(self.scores)
+        right = int(np.searchsorted(self.scores, target))
+        left = right - 1
+        positions = []
+        while len(positions) < k and (left >= 0 or right < n):
+            if right >= n or (left >= 0 and target - self.scores[left] <= self.scores[right] - target):
+                positions.append(left)
+                left -= 1
+            else:
+                positions.append(right)
+                right += 1
+        return positions
+
+    def recommend(self, target, k=10, reinforce=0.0):
+        """
+        Top-k (position, rank key) pairs for a target comprehension in 0..1.
+
+        ``reinforce`` > 0 trades closeness for documents with more learning
+        lemmas: key = |score - target| - reinforce * learning / max learning,
+        evaluated over the nearest k * CANDIDATE_FACTOR documents.
+        """
+        if not len(self.docs) or k <= 0:
+            return []
+        if reinforce <= 0:
+            return [
+                (position, abs(float(self.scores[position]) - target))
+                for position in self.nearest(target, k)
+            ]
+        candidates = np.array(self.nearest(target, k * CANDIDATE_FACTOR))
+        most_learning = max(int(self.learning[candidates].max()), 1)
+        keys = np.abs(self.scores[candidates] - target) - reinforce * self.learning[candidates] / most_learning
+        best = np.argsort(keys, kind="stable")[:k]
+        return [(int(candidates[i]), float(keys[i])) for i in best]
+
+
+_indexes = {}  # language id -> ComprehensionIndex
+_lock = threading.Lock()
+
+
+def _weight(status):
+    """(weight, counted) of one occurrence of a lemma with ``status``, as in readability_index."""
+    if status == STATUS_IGNORED:
+        return 0.0, 0
+    return STATUS_WEIGHTS.get(status, 0.0), 1
+
+
+def _changed_terms(language_id, since, version):
+    """Terms changed after vocab_version ``since``, or None if the index has to be rebuilt."""
+    if since < 0 or since > version:
+        return None
+    changes = logged_changes(language_id, since)
+    if len(changes) > MAX_INCREMENTAL_TERMS:
+        return None
+    return [term for term, _, _ in changes]
+
+
+def get_index(language_id):
+    """
+    Return the comprehension index of a language: rebuilt when the lemma
+    matrix changed, brought forward through the VocabChange log when only
+    term statuses did.
+    """
+    matrix = readability_matrix.get_matrix(language_id)
+    version = get_vocab_version(language_id)
+    with _lock:
+        index = _indexes.get(language_id)
+        if index is not None and index.matrix is matrix and index.signature == matrix.signature:
+            if index.version == version:
+                return index
+            started = time.perf_counter()
+            changed = _changed_terms(language_id, index.version, version)
+            if changed is not None:
+                lemmas = index.apply_changes(version, changed)
+                logger.debug(
+                    f"Updated comprehension index for language {language_id}: {len(changed)} terms, "
+                    f"{lemmas} lemmas changed in {time.perf_counter() - started:.3f}s"
+                )
+                return index
+    started = time.perf_counter()
+    index = ComprehensionIndex.build(language_id, matrix, version)
+    with _lock:
+        _indexes[language_id] = index
+    logger.info(
+        f"Built comprehension index for language {language_id}: {len(index)} documents "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+    return index
+
+
+def recommend(language_id, target=0.95, k=10, reinforce=0.0):
+    """
+    Recommend the k lessons/stories closest to a target comprehension.
+
+    Returns a list of dicts (type, id, comprehension, learning_lemmas, rank)
+    in rank order.
+    """
+    index = get_index(language_id)
+    return [
+        {
+            "type": index.docs[position][0],
+            "id": index.docs[position][1],
+            "comprehension": round(float(index.scores[position]), 4),
+            "learning_lemmas": int(index.learning[position]),
+            "rank": round(key, 4),
+        }
+        for position, key in index.recommend(target, k, reinforce)
+    ]
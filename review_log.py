@@ -0,0 +1,168 @@
+"""
+Append-only review history with buffered, batched writes.
+
+Every answered review becomes one review_log row (ReviewLogEntry in app.py):
+term, language, time, rating (1 again .. 4 easy), days since the previous
+review, the interval scheduled by this review, and the FSRS state before and
+after. Rows are collected in memory and written with one executemany INSERT
+per batch, on a connection of its own, when:
+
+    - REVIEW_LOG_BATCH_SIZE rows are waiting,
+    - the oldest waiting row is REVIEW_LOG_MAX_DELAY seconds old (timer),
+    - something is about to read the log (stats, forecasts), or
+    - the process exits.
+
+Up to one batch of reviews can therefore be lost if the process is killed;
+the term's own scheduling fields are committed with the review and are not
+affected.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timezone
+
+from sqlalchemy import insert
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_DELAY = 5.0  # seconds
+
+# Rows kept when the database keeps rejecting a batch
+MAX_PENDING_ROWS = 10000
+
+# FSRS state values (fsrs.State) plus 0 for a card never reviewed
+STATE_NEW = 0
+STATE_VALUES = {"new": STATE_NEW, "learning": 1, "review": 2, "relearning": 3}
+RATING_VALUES = {"again": 1, "hard": 2, "good": 3, "easy": 4}
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ReviewLogBuffer:
+    """Collects review_log rows and writes them in batches."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.max_delay = DEFAULT_MAX_DELAY
+        self._rows = []
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = int(app.config.get("REVIEW_LOG_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+        self.max_delay = float(app.config.get("REVIEW_LOG_MAX_DELAY", DEFAULT_MAX_DELAY))
+        atexit.register(self._flush_at_exit)
+
+    def record(self, term, rating, reviewed_at, elapsed_days, scheduled_days, state_before, state_after):
+        """Queue one review. Call after the review itself has been committed."""
+        row = {
+            "term_id": term.id,
+            "language_id": term.language_id,
+            "ts": _naive_utc(reviewed_at),
+            "rating": RATING_VALUES.get(rating, rating),
+            "elapsed_days": elapsed_days,
+            "scheduled_days": scheduled_days,
+            "state_before": STATE_VALUES.get(state_before, state_before),
+            "state_after": STATE_VALUES.get(state_after, state_after),
+        }
+        with self._lock:
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._rows) >= self.batch_size
+            if not full and self._timer is None and self.app is not None:
+                self._timer = threading.Timer(self.max_delay, self._flush_in_app)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self):
+        """Write every waiting row. Needs an app context. Returns the rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows, self._oldest = self._rows, [], None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not rows:
+                return 0
+            table = _get_model("ReviewLogEntry").__table__
+            try:
+                # A connection of its own: never commits someone's open session
+                with db.engine.begin() as connection:
+                    connection.execute(insert(table), rows)
+            except Exception as e:
+                logger.error(f"Could not write {len(rows)} review log rows: {e}")
+                with self._lock:
+                    self._rows = (rows + self._rows)[-MAX_PENDING_ROWS:]
+                    self._oldest = self._oldest or time.monotonic()
+                return 0
+            return len(rows)
+
+    def discard_language(self, language_id):
+        """Drop waiting rows of a language that is being deleted."""
+        with self._lock:
+            self._rows = [row for row in self._rows if row["language_id"] != language_id]
+
+    def _flush_in_app(self):
+        with self._lock:
+            self._timer = None
+        with self.app.app_context():
+            self.flush()
+
+    def _flush_at_exit(self):
+        if self.app is not None and self.pending():
+            try:
+                self._flush_in_app()
+            except Exception as e:
+                logger.error(f"Review log rows lost at exit: {e}")
+
+
+review_logs = ReviewLogBuffer()
+
+
+def reviews_by_day(language_id, start, end):
+    """
+    {"YYYY-MM-DD": {rating: count}} of the reviews of a language between
+    ``start`` and ``end`` (datetimes), from the review log.
+    """
+    review_logs.flush()
+    ReviewLogEntry = _get_model("ReviewLogEntry")
+    day = db.func.strftime("%Y-%m-%d", ReviewLogEntry.ts)
+    rows = (
+        db.session.query(day, ReviewLogEntry.rating, db.func.count(ReviewLogEntry.id))
+        .filter(
+            ReviewLogEntry.language_id == language_id,
+            ReviewLogEntry.ts >= _naive_utc(start),
+            ReviewLogEntry.ts <= _naive_utc(end),
+        )
+        .group_by(day, ReviewLogEntry.rating)
+    )
+    days = {}
+    for review_day, rating, count in rows:
+        days.setdefault(review_day, {})[rating] = count
+    return days
@@ -0,0 +1,206 @@
+"""
+Per-day review queues.
+
+The first time a language's review session is requested on a (UTC) day, the
+day's cards are selected once and stored in the review_queue table:
+
+    reviews    cards already reviewed at least once, due by the end of the
+               day, earliest first, at most SRSSettings.max_reviews_per_day
+    new        cards never reviewed (status 1-5, no last_review_date), at
+               most SRSSettings.new_cards_per_day
+
+"Reviewed" means a last_review_date, not the reviews counter: that counter
+was not incremented before FSRS parameters were fitted per language, so it
+is 0 on most cards reviewed earlier.
+
+Both selections run on the (language_id, status, next_review_date,
+last_review_date) index of vocab_term, so they never touch the term rows. Afterwards the review
+page reads the remaining queue entries in order (a bounded, indexed read no
+matter how large the deck), and /api/review/update dequeues each card it
+answers. A card whose new due date is still today (e.g. rated "again") is put
+back at the end of the queue and shown again once it is due.
+"""
+import logging
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+LEARNING_STATUSES = (1, 2, 3, 4, 5)
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def queue_day(now=None):
+    """The (UTC) day a queue belongs to."""
+    return (now or datetime.now(timezone.utc)).date()
+
+
+def end_of_day(day):
+    """Naive UTC datetime of the end of ``day``, comparable with next_review_date."""
+    return datetime.combine(day + timedelta(days=1), time.min)
+
+
+def _settings(language_id):
+    SRSSettings = _get_model("SRSSettings")
+    settings = SRSSettings.query.filter_by(language_id=language_id).first()
+    if not settings:
+        settings = SRSSettings(language_id=language_id)
+        db.session.add(settings)
+        db.session.flush()
+    return settings
+
+
+def _due_cards(language_id, due_before, new, limit, exclude):
+    """(term id, due date) of cards due before ``due_before``, earliest first."""
+    if limit <= 0:
+        return []
+    VocabTerm = _get_model("VocabTerm")
+    query = db.session.query(VocabTerm.id, VocabTerm.next_review_date).filter(
+        VocabTerm.language_id == language_id,
+        VocabTerm.status.in_(LEARNING_STATUSES),
+        VocabTerm.next_review_date < due_before,
+        VocabTerm.last_review_date.is_(None) if new else VocabTerm.last_review_date.isnot(None),
+    )
+    cards = []
+    # Terms already queued today are skipped here rather than in SQL so the
+    # query stays on the index
+    for term_id, due in query.order_by(VocabTerm.next_review_date):
+        if term_id in exclude:
+            continue
+        cards.append((term_id, due))
+        if len(cards) >= limit:
+            break
+    return cards
+
+
+def build_queue(language_id, day=None, rebuild=False):
+    """
+    Materialize the queue of ``day`` (today by default) for a language and
+    commit it. Does nothing if it already exists, unless ``rebuild``: then the
+    entries not answered yet are selected again (e.g. after the limits were
+    changed), still counting what was already queued today against them.
+    """
+    ReviewQueueEntry = _get_model("ReviewQueueEntry")
+    day = day or queue_day()
+    entries = ReviewQueueEntry.query.filter_by(language_id=language_id, day=day)
+    if entries.first() is not None and not rebuild:
+        return
+
+    # Queues of earlier days are no longer needed
+    ReviewQueueEntry.query.filter(
+        ReviewQueueEntry.language_id == language_id, ReviewQueueEntry.day < day
+    ).delete(synchronize_session=False)
+    if rebuild:
+        entries.filter(
+            ReviewQueueEntry.answered_at.is_(None), ReviewQueueEntry.requeued.is_(False)
+        ).delete(synchronize_session=False)
+
+    kept = entries.all()
+    queued_ids = {entry.term_id for entry in kept}
+    settings = _settings(language_id)
+    due_before = end_of_day(day)
+    new_cards = _due_cards(
+        language_id, due_before, True,
+        settings.new_cards_per_day - sum(1 for entry in kept if entry.is_new), queued_ids,
+    )
+    reviews = _due_cards(
+        language_id, due_before, False,
+        settings.max_reviews_per_day - sum(1 for entry in kept if not entry.is_new), queued_ids,
+    )
+
+    position = max((entry.position for entry in kept), default=-1) + 1
+    cards = sorted([(due, term_id, True) for term_id, due in new_cards] + [(due, term_id, False) for term_id, due in reviews])
+    db.session.add_all(
+        ReviewQueueEntry(language_id=language_id, day=day, term_id=term_id, position=position + i, is_new=is_new)
+        for i, (_, term_id, is_new) in enumerate(cards)
+    )
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request built the same queue concurrently; use that one
+        db.session.rollback()
+        return
+    logger.info(
+        f"Built review queue for language {language_id} on {day}: "
+        f"{len(new_cards)} new, {len(reviews)} reviews"
+    )
+
+
+def queued_terms(language_id, day=None, now=None):
+    """
+    VocabTerms still to review today, in queue order. Requeued cards are
+    only included once they are due again; cards that left the learning
+    statuses since the queue was built are skipped.
+    """
+    ReviewQueueEntry = _get_model("ReviewQueueEntry")
+    VocabTerm = _get_model("VocabTerm")
+    now = now or datetime.now(timezone.utc)
+    day = day or queue_day(now)
+    return (
+        db.session.query(VocabTerm)
+        .join(ReviewQueueEntry, ReviewQueueEntry.term_id == VocabTerm.id)
+        .filter(
+            ReviewQueueEntry.language_id == language_id,
+            ReviewQueueEntry.day == day,
+            ReviewQueueEntry.answered_at.is_(None),
+            VocabTerm.status.in_(LEARNING_STATUSES),
+            db.or_(
+                ReviewQueueEntry.requeued.is_(False),
+                VocabTerm.next_review_date <= now.replace(tzinfo=None),
+            ),
+        )
+        .order_by(ReviewQueueEntry.position)
+        .all()
+    )
+
+
+def queue_counts(language_id, day=None):
+    """{"new": n, "review": n, "answered": n} of a day's queue."""
+    ReviewQueueEntry = _get_model("ReviewQueueEntry")
+    day = day or queue_day()
+    counts = {"new": 0, "review": 0, "answered": 0}
+    rows = (
+        db.session.query(ReviewQueueEntry.is_new, ReviewQueueEntry.answered_at.isnot(None), db.func.count())
+        .filter_by(language_id=language_id, day=day)
+        .group_by(ReviewQueueEntry.is_new, ReviewQueueEntry.answered_at.isnot(None))
+    )
+    for is_new, answered, count in rows:
+        if answered:
+            counts["answered"] += count
+        else:
+            counts["new" if is_new else "review"] += count
+    return counts
+
+
+def dequeue(term, now=None):
+    """
+    Mark ``term`` answered in today's queue (no commit). If its new due date
+    is still today it goes back to the end of the queue.
+    """
+    ReviewQueueEntry = _get_model("ReviewQueueEntry")
+    now = now or datetime.now(timezone.utc)
+    day = queue_day(now)
+    entry = ReviewQueueEntry.query.filter_by(language_id=term.language_id, day=day, term_id=term.id).first()
+    if entry is None:
+        return
+    due = term.next_review_date
+    if due is not None and due.tzinfo is not None:
+        due = due.astimezone(timezone.utc).replace(tzinfo=None)
+    if due is not None and due < end_of_day(day) and term.status in LEARNING_STATUSES:
+        last = (
+            db.session.query(db.func.max(ReviewQueueEntry.position))
+            .filter_by(language_id=term.language_id, day=day)
+            .scalar()
+        )
+        entry.position = (last or 0) + 1
+        entry.requeued = True
+        entry.answered_at = None
+    else:
+        entry.answered_at = now.replace(tzinfo=None)
@@ -0,0 +1,132 @@
+"""
+Per-lesson/story sentence index.
+
+Each lesson and story carries (in its ``sentence_index`` column) the character
+offsets of its sentences plus an inverted map from normalized word form and
+from lemma to the ids of the sentences using them:
+
+    {"v": 1,
+     "sentences": [[start, end], ...],
+     "terms": {"running": [0, 4], ...},
+     "lemmas": {"run": [0, 2, 4], ...}}
+
+The index is built from the cached text analysis when the item is analyzed
+(see nlp_jobs.py) and rebuilt after an edit, so finding a context sentence for
+a term is a dictionary lookup instead of a scan over the whole text.
+"""
+import json
+
+from extensions import db
+
+SENTENCE_INDEX_VERSION = 1
+
+# Item type -> (model class name, text column); shared with nlp_jobs and text_analysis
+ITEM_TEXT_FIELDS = {
+    "lesson": ("Lesson", "text_content"),
+    "story": ("Story", "content"),
+}
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def build_sentence_index(analysis):
+    """Build the sentence index dict for a TextAnalysis."""
+    sentences = [list(span) for span in analysis.sentences]
+    terms = {}
+    lemmas = {}
+    sentence_id = 0
+    for token in analysis.iter_tokens():
+        if token.is_space or token.is_punct:
+            continue
+        # Tokens and sentences are both in document order
+        while (
+            sentence_id < len(sentences) - 1
+            and token.idx >= sentences[sentence_id][1]
+        ):
+            sentence_id += 1
+        for mapping, key in ((terms, token.text.lower()), (lemmas, token.lemma)):
+            ids = mapping.setdefault(key, [])
+            if not ids or ids[-1] != sentence_id:
+                ids.append(sentence_id)
+    return {
+        "v": SENTENCE_INDEX_VERSION,
+        "sentences": sentences,
+        "terms": terms,
+        "lemmas": lemmas,
+    }
+
+
+def item_text(item, item_type):
+    _, text_field = ITEM_TEXT_FIELDS[item_type]
+    return getattr(item, text_field)
+
+
+def load_sentence_index(item, item_type, commit=False):
+    """
+    Return the sentence index of a lesson/story, building and storing it if it
+    is missing or outdated. Returns None if the text cannot be analyzed.
+    """
+    from text_analysis import get_text_analysis
+
+    if item.sentence_index:
+        try:
+            index = json.loads(item.sentence_index)
+            if index.get("v") == SENTENCE_INDEX_VERSION:
+                return index
+        except (ValueError, AttributeError):
+            pass
+
+    text = item_text(item, item_type)
+    analysis = get_text_analysis(text, item.language.name, commit=False)
+    if analysis is None:
+        return None
+    index = build_sentence_index(analysis)
+    item.sentence_index = json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+    if commit:
+        db.session.commit()
+    return index
+
+
+def sentence_text(index, text, sentence_id):
+    start, end = index["sentences"][sentence_id]
+    return text[start:end].strip()
+
+
+def sentence_ids_for(index, term=None, lemma=None):
+    """Ids of the sentences containing a word form and/or lemma, in order."""
+    ids = set()
+    if term:
+        ids.update(index["terms"].get(term.lower().strip(), ()))
+    if lemma:
+        ids.update(index["lemmas"].get(lemma.lower().strip(), ()))
+    return sorted(ids)
+
+
+def find_context_sentence(index, text, term):
+    """
+    Return the first sentence that contains ``term`` (case-insensitive), or None.
+
+    Single words are answered from the term map. For multi-word terms, only the
+    sentences containing every word are checked for the full phrase.
+    """
+    needle = term.lower().strip()
+    if not needle:
+        return None
+    words = needle.split()
+    candidates = None
+    for word in words:
+        ids = set(index["terms"].get(word, ()))
+        candidates = ids if candidates is None else candidates & ids
+        if not candidates:
+            break
+    if not candidates:
+        # Token boundaries can differ from whitespace splitting (e.g. "l'eau")
+        candidates = range(len(index["sentences"]))
+    for sentence_id in sorted(candidates):
+        sentence = sentence_text(index, text, sentence_id)
+        if needle in sentence.lower():
+            return sentence
+    return None
@@ -0,0 +1,240 @@
+"""
+Review workload forecast and current recall of a language's review deck.
+
+The deck (terms with status 1-5, the cards the review queue draws from) is
+loaded with one query as NumPy arrays: stability, difficulty, and the last
+review / next due dates as Julian day numbers (SQLite julianday(), no
+per-row datetime parsing). From them:
+
+    - the current retrievability of every reviewed card (FSRS forgetting
+      curve of the language's scheduler parameters),
+    - a day-by-day simulation of the next N days: the cards due on a day are
+      reviewed together, recalled with their predicted probability (fixed
+      seed, answered "good") or forgotten (one extra relearning review), and
+      rescheduled with the FSRS stability/difficulty updates; unreviewed
+      cards are introduced SRSSettings.new_cards_per_day at a time.
+
+Results are cached per language until a review is written in this process
+(invalidate()), the vocabulary changes (vocab_version), the scheduler
+parameters change or the day changes, and for at most SRS_FORECAST_TTL
+seconds so writes by other processes are picked up as well.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from extensions import db
+from vocab_snapshot import get_vocab_version
+
+logger = logging.getLogger(__name__)
+
+LEARNING_STATUSES = (1, 2, 3, 4, 5)
+MAX_FORECAST_DAYS = 365
+DEFAULT_TTL = 600  # seconds
+RETRIEVABILITY_BINS = 10
+MIN_STABILITY = 0.001
+# Like /api/review/update: a reviewed card has at least this stability
+MIN_CARD_STABILITY = 0.1
+RATING_GOOD = 3
+RATING_AGAIN = 1
+
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def julian_day(moment):
+    return moment.timestamp() / 86400.0 + _UNIX_EPOCH_JULIAN_DAY
+
+
+def load_deck(language_id):
+    """(stability, difficulty, last review, next due) arrays of a language's deck; dates as Julian days, NaN if unset."""
+    VocabTerm = _get_model("VocabTerm")
+    rows = db.session.execute(
+        db.select(
+            VocabTerm.stability,
+            VocabTerm.difficulty,
+            db.func.julianday(VocabTerm.last_review_date),
+            db.func.julianday(VocabTerm.next_review_date),
+        ).where(VocabTerm.language_id == language_id, VocabTerm.status.in_(LEARNING_STATUSES))
+    ).all()
+    deck = np.array(rows, dtype=np.float64).reshape(len(rows), 4)
+    return deck[:, 0], deck[:, 1], deck[:, 2], deck[:, 3]
+
+
+class ForgettingModel:
+    """The FSRS formulas of fsrs.Scheduler, over arrays of cards."""
+
+    def __init__(self, parameters, desired_retention, maximum_interval):
+        self.w = np.asarray(parameters, dtype=np.float64)
+        self.decay = self.w[20]
+        self.factor = 0.9 ** (-1 / self.decay) - 1
+        self.interval_scale = (desired_retention ** (-1 / self.decay) - 1) / self.factor
+        self.maximum_interval = maximum_interval
+
+    def retrievability(self, stability, elapsed_days):
+        # Whole days elapsed, as in Scheduler.get_card_retrievability
+        return (1 + self.factor * np.maximum(np.floor(elapsed_days), 0) / stability) ** -self.decay
+
+    def interval(self, stability):
+        return np.clip(np.round(stability * self.interval_scale), 1, self.maximum_interval).astype(np.int64)
+
+    def initial(self, rating):
+        w = self.w
+        stability = np.maximum(w[rating - 1], MIN_STABILITY)
+        difficulty = np.clip(w[4] - np.exp(w[5] * (rating - 1)) + 1, 1, 10)
+        return stability, difficulty
+
+    def next_difficulty(self, difficulty, rating):
+        w = self.w
+        easy = w[4] - np.exp(3 * w[5]) + 1
+        damped = difficulty + (10 - difficulty) * -(w[6] * (rating - 3)) / 9
+        return np.clip(w[7] * easy + (1 - w[7]) * damped, 1, 10)
+
+    def next_stability(self, stability, difficulty, retrievability, recalled):
+        w = self.w
+        recall = stability * (
+            1 + np.exp(w[8]) * (11 - difficulty) * stability ** -w[9] * (np.exp((1 - retrievability) * w[10]) - 1)
+        )
+        forget = np.minimum(
+            w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * np.exp((1 - retrievability) * w[14]),
+            stability / np.exp(w[17] * w[18]),
+        )
+        return np.maximum(np.where(recalled, recall, forget), MIN_STABILITY)
+
+
+def simulate(model, stability, difficulty, last_day, due_day, days, new_per_day, seed=0):
+    """
+    Reviews, new cards and expected lapses per day for ``days`` days.
+
+    ``last_day``/``due_day`` are day offsets from today (due cards before
+    today are due today; NaN last_day = never reviewed, introduced in due
+    order). Arrays are updated in place.
+    """
+    rng = np.random.default_rng(seed)
+    reviews = np.zeros(days, dtype=np.int64)
+    new = np.zeros(days, dtype=np.int64)
+    lapses = np.zeros(days, dtype=np.int64)
+
+    unseen = np.flatnonzero(np.isnan(last_day))
+    unseen = unseen[np.argsort(due_day[unseen], kind="stable")]
+    seen = ~np.isnan(last_day)
+    due_day = np.where(seen, np.maximum(due_day, 0), days)
+    due_day = np.nan_to_num(due_day, nan=0).astype(np.int64)
+
+    for day in range(days):
+        # Due before today's new cards are introduced (their first interval is >= 1 day)
+        cards = np.flatnonzero(due_day == day)
+        if new_per_day > 0:
+            introduced = unseen[day * new_per_day:(day + 1) * new_per_day]
+            if len(introduced):
+                stability[introduced], difficulty[introduced] = model.initial(RATING_GOOD)
+                last_day[introduced] = day
+                due_day[introduced] = day + model.interval(stability[introduced])
+                new[day] = len(introduced)
+
+        if not len(cards):
+            continue
+        r = model.retrievability(stability[cards], day - last_day[cards])
+        recalled = rng.random(len(cards)) < r
+        stability[cards] = model.next_stability(stability[cards], difficulty[cards], r, recalled)
+        difficulty[cards] = model.next_difficulty(difficulty[cards], np.where(recalled, RATING_GOOD, RATING_AGAIN))
+        last_day[cards] = day
+        due_day[cards] = day + model.interval(stability[cards])
+        reviews[day] = len(cards) + int((~recalled).sum())  # + relearning step
+        lapses[day] = int((~recalled).sum())
+    return reviews, new, lapses
+
+
+def build_forecast(language_id, scheduler, new_per_day, days, now=None):
+    """The forecast of a language as a JSON-ready dict."""
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+    now_jd = julian_day(now)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    midnight_jd = julian_day(midnight)
+
+    stability, difficulty, last_review, next_due = load_deck(language_id)
+    model = ForgettingModel(scheduler.parameters, scheduler.desired_retention, scheduler.maximum_interval)
+    reviewed = ~np.isnan(last_review)
+    stability = np.where(reviewed, np.maximum(np.nan_to_num(stability), MIN_CARD_STABILITY), 0)
+    difficulty = np.clip(np.nan_to_num(difficulty, nan=5.0), 1, 10)
+
+    retrievability = model.retrievability(stability[reviewed], now_jd - last_review[reviewed])
+    histogram, _ = np.histogram(retrievability, bins=RETRIEVABILITY_BINS, range=(0, 1))
+    due_now = reviewed & (np.nan_to_num(next_due, nan=-np.inf) <= now_jd)
+
+    last_day = np.floor(last_review - midnight_jd)
+    due_day = np.floor(np.nan_to_num(next_due, nan=midnight_jd) - midnight_jd)
+    reviews, new, lapses = simulate(model, stability, difficulty, last_day, due_day, days, new_per_day)
+
+    return {
+        "language_id": language_id,
+        "generated_at": now.isoformat(),
+        "cards": int(len(reviewed)),
+        "reviewed_cards": int(reviewed.sum()),
+        "new_cards": int((~reviewed).sum()),
+        "due_now": int(due_now.sum()),
+        "retrievability": {
+            "mean": round(float(retrievability.mean()), 4) if len(retrievability) else None,
+            "histogram": histogram.tolist(),  # cards per 0.1 step of predicted recall
+        },
+        "desired_retention": scheduler.desired_retention,
+        "new_cards_per_day": new_per_day,
+        "forecast": {
+            "labels": [(midnight + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(days)],
+            "reviews": reviews.tolist(),
+            "new": new.tolist(),
+            "lapses": lapses.tolist(),
+        },
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+class ForecastCache:
+    """Built forecasts per language, invalidated by review writes and a TTL."""
+
+    def __init__(self):
+        self.ttl = DEFAULT_TTL
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = float(app.config.get("SRS_FORECAST_TTL", DEFAULT_TTL))
+
+    def invalidate(self, language_id):
+        """Call after committing reviews of a language."""
+        with self._lock:
+            self._generations[language_id] = self._generations.get(language_id, 0) + 1
+            self._entries = {key: entry for key, entry in self._entries.items() if key[0] != language_id}
+
+    def get(self, language_id, days, scheduler, new_per_day):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            generation = self._generations.get(language_id, 0)
+        key = (
+            language_id, days, new_per_day, generation, get_vocab_version(language_id),
+            tuple(scheduler.parameters), scheduler.desired_retention, now.date(),
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        result = build_forecast(language_id, scheduler, new_per_day, days, now)
+        with self._lock:
+            # Keep the latest entry of each language/horizon only
+            self._entries = {
+                k: v for k, v in self._entries.items() if (k[0], k[1]) != (language_id, days) and v[0] > time.monotonic()
+            }
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+        return result
+
+
+forecasts = ForecastCache()
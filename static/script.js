@@ -26,6 +26,7 @@ let currentLessonId = null; // Re-add this global declaration
 let vocabCache = {}; // Simple cache for word statuses
 let currentEditorTerm = null; // Store term currently in editor
 let multiwordTermsCache = []; // Cache for known multi-word terms
+let vocabVersion = null; // Language vocab_version the caches above reflect
 let definitionTooltip = null; // Global variable for the tooltip element
 
 // --- Pagination Variables ---
@@ -67,6 +68,17 @@ let isVideoPlaying = false;
 let repeatPageStartTime = null;
 let repeatPageEndTime = null;
 
+// --- Review Answer Queue Variables ---
+const REVIEW_ANSWERS_PREFIX = 'fluentmind:review-answers:'; // localStorage key per language
+const REVIEW_FLUSH_SIZE = 10; // Send queued answers once this many are waiting
+const REVIEW_FLUSH_INTERVAL = 15000; // ...or this long after the first one (ms)
+let reviewFlushTimer = null;
+let reviewFlushInFlight = null;
+
+// --- Vocabulary Delta Sync Variables ---
+const VOCAB_STORE_PREFIX = 'fluentmind:vocab:'; // localStorage key per language
+const VOCAB_SYNC_INTERVAL = 60000; // Poll for changes from other tabs/devices (ms)
+
 // --- Initialization ---
 document.addEventListener('DOMContentLoaded', () => {
     console.log("DOMContentLoaded event fired.");
@@ -85,7 +97,12 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log("Initializing Flashcard Review features.");
         currentLanguageId = reviewArea.dataset.languageId; // Set currentLanguageId from data attribute
         console.log("currentLanguageId after reviewArea assignment:", currentLanguageId); // Add this line
-        loadReviewCards();
+        // Answers left over from an earlier session go first, so the queue reflects them
+        flushReviewAnswers().finally(loadReviewCards);
+        window.addEventListener('pagehide', beaconReviewAnswers);
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') beaconReviewAnswers();
+        });
         // Attach flashcard event listeners
         document.getElementById('show-answer').addEventListener('click', showAnswer);
         document.getElementById('go-back-btn').addEventListener('click', goBackToLastCard); // Attach event listener to Go Back button
@@ -136,46 +153,22 @@ function initializeReader() {
         return;
     }
 
-    // Get raw text from data attribute
-    const rawText = textContainer.dataset.rawText;
-    if (!rawText) {
-        console.error("Reader Error: Raw text not found in text container");
-        return;
-    }
+    // One request for tokens, statuses, multiword spans, timestamps and offset.
+    // 'no-cache' revalidates with the ETag, so an unchanged lesson is a 304.
+    fetchReaderPayload(currentLessonId)
+        .then(payload => {
+            const allParsedElements = elementsFromPayload(payload);
+            vocabCache = vocabFromPayload(payload);
+            multiwordTermsCache = multiwordTermsFromPayload(payload);
+            console.log("Reader payload loaded:", allParsedElements.length, "elements,", payload.multiword.length, "multi-word matches");
 
-    // Parse text into elements
-    const allParsedElements = parseText(rawText);
-    console.log("Parsed elements:", allParsedElements);
+            vocabVersion = payload.vocab_version;
+            startVocabSync(currentLanguageId);
 
-    // Extract unique single-word terms for vocabulary lookup
-    const uniqueSingleTerms = [...new Set(allParsedElements
-        .filter(el => el.type === 'word')
-        .map(el => el.term.toLowerCase()))];
-    console.log("Unique single terms:", uniqueSingleTerms);
-
-    // Fetch vocabulary status and multiword terms in parallel
-    Promise.all([
-            fetchVocabStatus(currentLanguageId, uniqueSingleTerms),
-            fetchMultiwordTerms(currentLanguageId)
-        ])
-        .then(([singleWordVocab, multiwordTerms]) => {
-            vocabCache = singleWordVocab;
-            multiwordTermsCache = multiwordTerms;
-            console.log("Vocab status and multiword terms fetched.");
-
-            // Load timestamps first
-            const timestampsScriptTag = document.getElementById('timestamps-data');
-            if (timestampsScriptTag) {
-                const timestampsJson = timestampsScriptTag.textContent;
-                if (timestampsJson && timestampsJson.trim() !== '' && timestampsJson.trim().toLowerCase() !== 'null') {
-                    try {
-                        timestamps = JSON.parse(timestampsJson);
-                        console.log("Timestamps loaded successfully:", timestamps);
-                    } catch (e) {
-                        console.error("Error parsing timestamps JSON:", e);
-                        timestamps = null;
-                    }
-                }
+            timestamps = payload.timestamps;
+            if (payload.offset !== undefined && payload.offset !== null) {
+                timestampOffset = parseFloat(payload.offset);
+                console.log("Loaded timestamp offset:", timestampOffset);
             }
 
             // Initialize media player if timestamps exist
@@ -222,28 +215,6 @@ function initializeReader() {
                 parsedTextArea.innerHTML = '<p class="text-danger">Error loading content. Please try refreshing the page.</p>';
             }
         });
-
-    console.log("About to fetch timestamp offset for lesson:", currentLessonId);
-    // Get the initial timestamp offset from the server
-    fetch(`/lesson/${currentLessonId}/get_offset`)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
-        .then(data => {
-            if (data.success && data.offset !== undefined && data.offset !== null) { // Add null check
-                timestampOffset = parseFloat(data.offset);
-                console.log("Loaded timestamp offset:", timestampOffset);
-            } else {
-                console.error("Failed to load offset from server or offset is invalid:", data.error || data.offset);
-                timestampOffset = 0; // Reset to 0 if loading fails
-            }
-        })
-        .catch(error => {
-            console.error("Error loading timestamp offset fetch:", error);
-        });
     console.log("Initializing Reader: END");
 }
 
@@ -273,6 +244,213 @@ function parseText(text) {
     return elements;
 }
 
+// --- Fetch the server-prepared reader payload (see reader_payload.py) ---
+async function fetchReaderPayload(lessonId) {
+    const response = await fetch(`/api/reader/${lessonId}`, {
+        cache: 'no-cache'
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP error fetching reader payload! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+// Payload tokens -> the elements parseText would produce
+function elementsFromPayload(payload) {
+    return payload.tokens.map(token => token[0] === 'w' ? {
+        type: 'word',
+        term: token[1]
+    } : {
+        type: 'separator',
+        text: token[1]
+    });
+}
+
+// Payload terms -> { 'term': {status: N, translation: '...'} }, like fetchVocabStatus
+function vocabFromPayload(payload) {
+    const vocab = {};
+    for (const [term, status, translationId] of payload.terms) {
+        vocab[term] = {
+            status: status,
+            translation: translationId === null ? null : payload.translations[translationId]
+        };
+    }
+    return vocab;
+}
+
+// Multi-word terms that occur in the lesson, longest first, like fetchMultiwordTerms
+function multiwordTermsFromPayload(payload) {
+    const seen = {};
+    for (const [, , term, status, translationId] of payload.multiword) {
+        seen[term] = {
+            term: term,
+            status: status,
+            translation: translationId === null ? null : payload.translations[translationId]
+        };
+    }
+    return Object.values(seen).sort((a, b) => b.term.length - a.term.length);
+}
+
+// --- Vocabulary Delta Sync (/api/vocab/<lang>/changes) ---
+// Fetch the terms changed after `since` ([term, status, translation], status null = removed)
+async function fetchVocabChanges(langId, since) {
+    const response = await fetch(`/api/vocab/${langId}/changes?since=${since}`);
+    if (!response.ok) {
+        throw new Error(`HTTP error fetching vocab changes! status: ${response.status}`);
+    }
+    return response.json(); // { version: N, full: bool, changes: [...] }
+}
+
+function loadVocabStore(langId) {
+    try {
+        return JSON.parse(localStorage.getItem(VOCAB_STORE_PREFIX + langId)) || null;
+    } catch (e) {
+        return null;
+    }
+}
+
+function saveVocabStore(langId, store) {
+    try {
+        localStorage.setItem(VOCAB_STORE_PREFIX + langId, JSON.stringify(store));
+    } catch (e) {
+        // Quota exceeded or storage disabled: the store just won't persist
+        console.warn("Could not persist vocabulary cache:", e);
+        localStorage.removeItem(VOCAB_STORE_PREFIX + langId);
+    }
+}
+
+function applyChangesToStore(store, data) {
+    if (data.full) {
+        store.terms = {};
+    }
+    for (const [term, status, translation] of data.changes) {
+        if (status === null) {
+            delete store.terms[term];
+        } else {
+            store.terms[term] = [status, translation];
+        }
+    }
+    store.version = data.version;
+}
+
+// Persistent local copy of a language's vocabulary ({ version, terms: { term: [status, translation] } }),
+// refreshed with only the terms changed since the stored version
+async function refreshVocabStore(langId) {
+    const store = loadVocabStore(langId) || {
+        version: 0,
+        terms: {}
+    };
+    const data = await fetchVocabChanges(langId, store.version);
+    if (data.full || data.changes.length || data.version !== store.version) {
+        applyChangesToStore(store, data);
+        saveVocabStore(langId, store);
+    }
+    return store;
+}
+
+// { 'term': {status: N, translation: '...'} } for the given terms, like fetchVocabStatus, from the local store
+async function fetchVocabStatusCached(langId, termsList) {
+    const store = await refreshVocabStore(langId);
+    const vocab = {};
+    for (const term of termsList) {
+        const entry = store.terms[term.toLowerCase()];
+        vocab[term] = entry ? {
+            status: entry[0],
+            translation: entry[1]
+        } : {
+            status: 0,
+            translation: null
+        };
+    }
+    return vocab;
+}
+
+// Saved phrases the server's matcher finds in the open lesson (lowercase)
+async function fetchLessonPhrases(langId) {
+    const response = await fetch(`/api/multiword-terms/${langId}?lesson_id=${currentLessonId}`);
+    if (!response.ok) {
+        throw new Error(`HTTP error fetching lesson phrases! status: ${response.status}`);
+    }
+    const data = await response.json();
+    return new Set(data.multiword_terms.map(t => t.term.toLowerCase()));
+}
+
+// Apply changes made elsewhere (other tabs, devices, reviews) to the reader's caches.
+// A phrase the reader does not show yet is only added if it is in lessonPhrases.
+function applyChangesToReader(changes, lessonPhrases) {
+    for (const [term, status, translation] of changes) {
+        if (term.includes(' ')) {
+            const index = multiwordTermsCache.findIndex(t => t.term.toLowerCase() === term);
+            if (status === null) {
+                if (index !== -1) multiwordTermsCache.splice(index, 1);
+            } else if (index !== -1) {
+                multiwordTermsCache[index].status = status;
+                multiwordTermsCache[index].translation = translation;
+            } else if (lessonPhrases.has(term)) {
+                multiwordTermsCache.push({
+                    term: term,
+                    status: status,
+                    translation: translation
+                });
+            }
+        } else if (status === null) {
+            delete vocabCache[term];
+        } else {
+            vocabCache[term] = {
+                status: status,
+                translation: translation
+            };
+        }
+    }
+    multiwordTermsCache.sort((a, b) => b.term.length - a.term.length);
+}
+
+async function syncVocabChanges(langId) {
+    if (vocabVersion === null || document.hidden) return;
+    try {
+        const since = vocabVersion;
+        const data = await fetchVocabChanges(langId, since);
+        if (data.version === since) return;
+        vocabVersion = data.version;
+
+        // Keep the persistent store current when it was at the same version
+        const store = loadVocabStore(langId);
+        if (store && store.version === since) {
+            applyChangesToStore(store, data);
+            saveVocabStore(langId, store);
+        }
+
+        // New phrases are only worth highlighting if they occur in this lesson
+        const shownPhrases = new Set(data.full ? [] : multiwordTermsCache.map(t => t.term.toLowerCase()));
+        const addsPhrase = data.changes.some(([term, status]) => term.includes(' ') && status !== null && !shownPhrases.has(term));
+        const lessonPhrases = addsPhrase ? await fetchLessonPhrases(langId) : new Set();
+
+        if (data.full) {
+            // The server no longer knows our version: reload everything
+            vocabCache = {};
+            multiwordTermsCache = [];
+        }
+        applyChangesToReader(data.changes, lessonPhrases);
+        console.log(`Applied ${data.changes.length} vocabulary changes (version ${data.version}).`);
+        if (data.changes.length) {
+            renderPage(currentPage);
+        }
+    } catch (error) {
+        console.error("Error syncing vocabulary changes:", error);
+    }
+}
+
+function startVocabSync(langId) {
+    document.addEventListener('visibilitychange', () => {
+        if (!document.hidden) syncVocabChanges(langId);
+    });
+    // Another tab of this browser refreshed the store
+    window.addEventListener('storage', (event) => {
+        if (event.key === VOCAB_STORE_PREFIX + langId) syncVocabChanges(langId);
+    });
+    setInterval(() => syncVocabChanges(langId), VOCAB_SYNC_INTERVAL);
+}
+
 // --- Fetch Vocab Status from API ---
 async function fetchVocabStatus(langId, termsList) {
     console.log("Fetching status for terms:", termsList);
@@ -294,9 +472,11 @@ async function fetchVocabStatus(langId, termsList) {
 }
 
 // --- Fetch Multi-word Terms from API ---
-async function fetchMultiwordTerms(langId) {
+// Pass { lesson_id: N } or { story_id: N } to get only the terms occurring in that text
+async function fetchMultiwordTerms(langId, occurringIn = null) {
     console.log("Fetching multi-word terms...");
-    const response = await fetch(`/api/multiword-terms/${langId}`);
+    const query = occurringIn ? `?${new URLSearchParams(occurringIn)}` : '';
+    const response = await fetch(`/api/multiword-terms/${langId}${query}`);
     if (!response.ok) {
         throw new Error(`HTTP error fetching multi-word terms! status: ${response.status}`);
     }
@@ -1132,8 +1312,62 @@ function updatePaginationUI() {
     if (pageInfo) pageInfo.textContent = `Page ${currentPage} of ${totalPages}`;
 }
 
+// --- Mark every remaining unknown (blue) word on the current page as known ---
+async function markPageKnown() {
+    const elements = pagedElements[currentPage - 1] || [];
+    const unknownTerms = [...new Set(elements
+        .filter(el => el.type === 'word')
+        .map(el => el.term.toLowerCase())
+        .filter(term => !vocabCache[term] || parseInt(vocabCache[term].status, 10) === STATUS_UNKNOWN))];
+    if (unknownTerms.length === 0) {
+        alert("There are no unknown words on this page.");
+        return;
+    }
+    if (!confirm(`Mark ${unknownTerms.length} unknown words on this page as known?`)) {
+        return;
+    }
+
+    try {
+        // One request and one transaction for the whole page (see /api/vocab/bulk_update)
+        const response = await fetch('/api/vocab/bulk_update', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                lang_id: currentLanguageId,
+                lesson_id: currentLessonId,
+                operations: unknownTerms.map(term => ({
+                    term: term,
+                    status: STATUS_KNOWN
+                }))
+            })
+        });
+        const data = await response.json();
+        if (!response.ok || data.error) {
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        }
+        for (const result of data.terms) {
+            vocabCache[result.term.toLowerCase()] = {
+                status: result.status,
+                translation: result.translation
+            };
+        }
+        console.log(`Marked ${data.updated} words as known.`);
+        renderPage(currentPage);
+    } catch (error) {
+        console.error("Error marking page as known:", error);
+        alert(`Failed to mark words as known: ${error.message}`);
+    }
+}
+
 // Add event listeners for pagination
 document.addEventListener('DOMContentLoaded', () => {
+    const markPageKnownBtn = document.getElementById('mark-page-known-btn');
+    if (markPageKnownBtn) {
+        markPageKnownBtn.addEventListener('click', markPageKnown);
+    }
+
     const prevBtn = document.getElementById('prev-page-btn');
     const nextBtn = document.getElementById('next-page-btn');
 
@@ -2365,67 +2599,152 @@ function showCurrentCard() {
     feedbackDiv.textContent = '';
 }
 
-function rateCard(rating) {
-    cardHistory.push(currentCardIndex);
-    const card = reviewCards[currentCardIndex];
-    const oldStatus = card.status; // Capture old status before update
+// Level after an answer; mirrors the custom leveling in _apply_review (app.py)
+function predictReviewStatus(card, rating) {
+    const status = card.status;
+    if (rating === 'easy') return 6;
+    if (rating === 'good') {
+        if (status >= 1 && status < 5) return status + 1;
+        return status === 0 ? 1 : status;
+    }
+    if (rating === 'again' && card.last_rating === 'again') {
+        if (status > 1 && status <= 6) return status - 1;
+        if (status === 0 || status === 7 || status === 6) return 1;
+    }
+    return status;
+}
+
+function reviewAnswersKey() {
+    return REVIEW_ANSWERS_PREFIX + currentLanguageId;
+}
+
+function loadPendingAnswers() {
+    try {
+        return JSON.parse(localStorage.getItem(reviewAnswersKey())) || [];
+    } catch (error) {
+        return [];
+    }
+}
+
+function savePendingAnswers(answers) {
+    try {
+        if (answers.length) {
+            localStorage.setItem(reviewAnswersKey(), JSON.stringify(answers));
+        } else {
+            localStorage.removeItem(reviewAnswersKey());
+        }
+    } catch (error) {
+        console.warn('Could not store pending review answers:', error);
+    }
+}
+
+function queueReviewAnswer(answer) {
+    const answers = loadPendingAnswers();
+    answers.push(answer);
+    savePendingAnswers(answers);
+    if (answers.length >= REVIEW_FLUSH_SIZE) {
+        flushReviewAnswers();
+    } else if (!reviewFlushTimer) {
+        reviewFlushTimer = setTimeout(flushReviewAnswers, REVIEW_FLUSH_INTERVAL);
+    }
+}
 
-    fetch('/api/review/update', {
+// Send queued answers to /api/review/batch_update. They stay stored until the
+// server confirms them; a batch sent twice is harmless (answers already
+// applied are skipped).
+function flushReviewAnswers() {
+    clearTimeout(reviewFlushTimer);
+    reviewFlushTimer = null;
+    if (reviewFlushInFlight) return reviewFlushInFlight;
+    const answers = loadPendingAnswers();
+    if (!answers.length) return Promise.resolve();
+
+    reviewFlushInFlight = fetch('/api/review/batch_update', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({
-                term_id: card.id,
-                rating: rating,
-                direction: card.direction // Send current direction to backend
-            })
+            body: JSON.stringify({ answers: answers })
         })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                const feedbackDiv = document.getElementById('review-feedback');
-                let message = '';
-                const newStatus = data.new_status;
-                card.status = newStatus; // Update frontend card object with new status
-
-                if (rating === 'easy') {
-                    message = 'Now known';
-                } else if (rating === 'good') {
-                    message = `Advanced to Level ${newStatus}`;
-                } else if (rating === 'hard') {
-                    message = 'No level change';
-                } else if (rating === 'again') {
-                    if (newStatus < oldStatus) { // Level decreased
-                        message = `Level decreased to Level ${newStatus}`;
-                    } else {
-                        message = 'No level change';
-                    }
-                }
-
-                feedbackDiv.textContent = message;
-                feedbackDiv.style.opacity = 1; // Show message
-                setTimeout(() => {
-                    feedbackDiv.style.opacity = 0; // Fade out after 1 second
-                }, 1000); // 1000 milliseconds = 1 second
-
-                // Update global vocab cache for reader consistency
-                // Assuming term and translation are available from the card object
-                updateTermDetails(card.term, { 
-                    status: newStatus, 
-                    translation: card.translation 
-                });
-
-                currentCardIndex++;
-                updateProgress();
-                showCurrentCard();
-            } else {
-                console.error('Error updating card:', data.error);
+        .then(response => response.json().then(data => ({ ok: response.ok, data })))
+        .then(({ ok, data }) => {
+            if (!ok || !data.success) {
+                throw new Error(data.error || 'Review batch rejected');
             }
+            const sent = new Set(answers.map(answer => `${answer.term_id}:${answer.answered_at}`));
+            savePendingAnswers(loadPendingAnswers().filter(answer => !sent.has(`${answer.term_id}:${answer.answered_at}`)));
+            // The server's levels are authoritative
+            data.results.forEach(result => {
+                if (result.new_status === null) return;
+                reviewCards.forEach(card => {
+                    if (card.id === result.term_id) card.status = result.new_status;
+                });
+            });
         })
         .catch(error => {
-            console.error('Error rating card:', error);
+            console.error('Error sending review answers (kept for retry):', error);
+        })
+        .finally(() => {
+            reviewFlushInFlight = null;
+            if (loadPendingAnswers().length >= REVIEW_FLUSH_SIZE) {
+                flushReviewAnswers();
+            } else if (loadPendingAnswers().length && !reviewFlushTimer) {
+                reviewFlushTimer = setTimeout(flushReviewAnswers, REVIEW_FLUSH_INTERVAL);
+            }
         });
+    return reviewFlushInFlight;
+}
+
+// Last chance when the page is hidden or closed; the answers stay stored and
+// are confirmed (or skipped as already applied) by the next flush
+function beaconReviewAnswers() {
+    const answers = loadPendingAnswers();
+    if (!answers.length || !navigator.sendBeacon) return;
+    const body = new Blob([JSON.stringify({ answers: answers })], { type: 'application/json' });
+    navigator.sendBeacon('/api/review/batch_update', body);
+}
+
+function rateCard(rating) {
+    cardHistory.push(currentCardIndex);
+    const card = reviewCards[currentCardIndex];
+    const oldStatus = card.status; // Capture old status before update
+    const newStatus = predictReviewStatus(card, rating);
+
+    // Queued and sent in batches; the next card shows without waiting for the server
+    queueReviewAnswer({
+        term_id: card.id,
+        rating: rating,
+        direction: card.direction, // Send current direction to backend
+        answered_at: Date.now()
+    });
+    card.status = newStatus; // Update frontend card object with new status
+    card.last_rating = rating;
+
+    const feedbackDiv = document.getElementById('review-feedback');
+    let message = '';
+    if (rating === 'easy') {
+        message = 'Now known';
+    } else if (rating === 'good') {
+        message = `Advanced to Level ${newStatus}`;
+    } else if (rating === 'hard') {
+        message = 'No level change';
+    } else if (rating === 'again') {
+        if (newStatus < oldStatus) { // Level decreased
+            message = `Level decreased to Level ${newStatus}`;
+        } else {
+            message = 'No level change';
+        }
+    }
+
+    feedbackDiv.textContent = message;
+    feedbackDiv.style.opacity = 1; // Show message
+    setTimeout(() => {
+        feedbackDiv.style.opacity = 0; // Fade out after 1 second
+    }, 1000); // 1000 milliseconds = 1 second
+
+    currentCardIndex++;
+    updateProgress();
+    showCurrentCard();
 }
 
 function updateProgress() {
@@ -2440,6 +2759,7 @@ function showNoCards() {
 }
 
 function showSessionComplete() {
+    flushReviewAnswers();
     document.getElementById('review-area').classList.add('d-none');
     document.getElementById('session-complete').classList.remove('d-none');
 }
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app as fluentmind  # noqa: E402  (defines the models on extensions.db)
+from extensions import db  # noqa: E402
+import readability_matrix  # noqa: E402
+import recommender  # noqa: E402
+import text_analysis  # noqa: E402
+from vocab_snapshot import vocab_snapshots  # noqa: E402
+
+
+@pytest.fixture
+def app_context(tmp_path):
+    """An app context on a fresh SQLite database with every table created."""
+    test_app = Flask(__name__)
+    test_app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    test_app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(test_app)
+    with test_app.app_context():
+        db.create_all()
+        yield test_app
+        db.session.remove()
+    # Per-process caches outlive the database they were filled from
+    text_analysis._memory_cache.clear()
+    readability_matrix._matrices.clear()
+    recommender._indexes.clear()
+    vocab_snapshots._snapshots.clear()
+
+
+@pytest.fixture
+def models():
+    return fluentmind
+
+
+@pytest.fixture
+def language(app_context, models):
+    language = models.Language(name="Testish")
+    db.session.add(language)
+    db.session.commit()
+    return language
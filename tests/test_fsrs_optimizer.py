@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from fsrs_optimizer import DEFAULT_PARAMETERS, ReviewHistory, fit_parameters, loss_and_gradient
+
+
+def _history(seed=0, n_cards=40):
+    """Random review histories: same-day steps, lapses and recalls after 1-30 days."""
+    rng = np.random.default_rng(seed)
+    term_ids, timestamps, ratings = [], [], []
+    for card in range(n_cards):
+        ts = 1_700_000_000.0 + rng.uniform(0, 86400)
+        for _ in range(rng.integers(1, 9)):
+            term_ids.append(card)
+            timestamps.append(ts)
+            ratings.append(rng.choice([1, 2, 3, 4], p=[0.15, 0.15, 0.55, 0.15]))
+            if rng.random() < 0.2:
+                ts += rng.uniform(60, 3600)  # same-day step
+            else:
+                ts += rng.integers(1, 30) * 86400 + rng.uniform(0, 3600)
+    return ReviewHistory(np.array(term_ids), np.array(timestamps), np.array(ratings))
+
+
+def _finite_difference(parameters, history, eps=1e-6):
+    gradient = np.zeros(len(parameters))
+    for i in range(len(parameters)):
+        up = np.array(parameters, dtype=np.float64)
+        down = up.copy()
+        up[i] += eps
+        down[i] -= eps
+        gradient[i] = (loss_and_gradient(up, history)[0] - loss_and_gradient(down, history)[0]) / (2 * eps)
+    return gradient
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_gradient_matches_finite_differences_at_the_defaults(seed):
+    history = _history(seed)
+    assert history.n_predicted > 20
+
+    _, gradient = loss_and_gradient(DEFAULT_PARAMETERS, history)
+    np.testing.assert_allclose(gradient, _finite_difference(DEFAULT_PARAMETERS, history), rtol=1e-4, atol=1e-6)
+
+
+def test_gradient_matches_finite_differences_away_from_the_defaults():
+    history = _history(2)
+    rng = np.random.default_rng(2)
+    parameters = np.array(DEFAULT_PARAMETERS) * rng.uniform(0.9, 1.1, len(DEFAULT_PARAMETERS))
+
+    _, gradient = loss_and_gradient(parameters, history)
+    np.testing.assert_allclose(gradient, _finite_difference(parameters, history), rtol=1e-4, atol=1e-6)
+
+
+def test_history_groups_reviews_by_position():
+    history = ReviewHistory(
+        np.array([7, 3, 7, 7, 3]),
+        np.array([0.0, 10.0, 86400.0 * 2.5, 86400.0 * 2.6, 86400.0 * 4]),
+        np.array([3, 1, 3, 4, 2]),
+    )
+
+    assert (history.n_cards, history.n_reviews) == (2, 5)
+    # The card with the longest history comes first at every step
+    assert [count for count, _, _ in history.steps] == [2, 2, 1]
+    assert history.steps[1][2].tolist() == [2.0, 3.0]
+    assert history.steps[2][2].tolist() == [0.0]
+    assert history.n_predicted == 2
+
+
+def test_fitting_does_not_increase_the_loss():
+    history = _history(3, n_cards=60)
+    parameters, loss, default_loss = fit_parameters(history, iterations=5)
+
+    assert len(parameters) == len(DEFAULT_PARAMETERS)
+    assert loss <= default_loss
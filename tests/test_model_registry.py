@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+import model_registry
+from model_registry import SpacyModelRegistry
+
+
+class FakeLoader:
+    """Stands in for spacy.load: returns a fresh object per call and counts calls."""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name, *args):
+        with self._lock:
+            self.calls.append(model_name)
+        time.sleep(self.delay)
+        if model_name in self.fail:
+            raise OSError(f"Can't find model '{model_name}'")
+        return object()
+
+
+def test_cached_model_is_reused():
+    loader = FakeLoader()
+    registry = SpacyModelRegistry(loader=loader)
+
+    first = registry.get("en_core_web_sm")
+    assert registry.get("en_core_web_sm") is first
+    assert loader.calls == ["en_core_web_sm"]
+    assert (registry.hits, registry.misses, registry.loads) == (1, 1, 1)
+
+
+def test_least_recently_used_model_is_evicted_over_max_models():
+    loader = FakeLoader()
+    registry = SpacyModelRegistry(max_models=2, loader=loader)
+
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")  # b is now the least recently used
+    registry.get("c")
+
+    assert registry.is_loaded("a") and registry.is_loaded("c")
+    assert not registry.is_loaded("b")
+    assert registry.evictions == 1
+
+    registry.get("b")
+    assert loader.calls == ["a", "b", "c", "b"]
+    assert not registry.is_loaded("a")
+
+
+def test_memory_budget_evicts_idle_models(monkeypatch):
+    rss = iter(range(0, 10 ** 10, 100 * 1024 * 1024))  # every reading 100 MB higher
+    monkeypatch.setattr(model_registry, "get_process_rss", lambda: next(rss))
+    registry = SpacyModelRegistry(memory_budget_mb=250, loader=FakeLoader())
+
+    registry.get("a")
+    registry.get("b")
+    assert registry.is_loaded("a") and registry.is_loaded("b")
+
+    registry.get("c")  # 300 MB cached: the least recently used model goes
+    assert not registry.is_loaded("a")
+    assert registry.is_loaded("b") and registry.is_loaded("c")
+
+
+def test_lowering_the_limit_evicts_right_away():
+    registry = SpacyModelRegistry(loader=FakeLoader())
+    for name in ("a", "b", "c"):
+        registry.get(name)
+
+    registry.configure(max_models=1)
+
+    assert not registry.is_loaded("a") and not registry.is_loaded("b")
+    assert registry.is_loaded("c")
+
+
+def test_concurrent_first_requests_share_one_load():
+    loader = FakeLoader(delay=0.2)
+    registry = SpacyModelRegistry(loader=loader)
+    results = []
+    start = threading.Barrier(8)
+
+    def request():
+        start.wait()
+        results.append(registry.get("en_core_web_sm"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == ["en_core_web_sm"]
+    assert len(results) == 8 and all(nlp is results[0] for nlp in results)
+    assert registry.loads == 1
+
+
+def test_concurrent_waiters_all_see_a_failed_load():
+    loader = FakeLoader(delay=0.2, fail={"missing"})
+    registry = SpacyModelRegistry(loader=loader)
+    errors = []
+    start = threading.Barrier(4)
+
+    def request():
+        start.wait()
+        try:
+            registry.get("missing")
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4
+    assert loader.calls == ["missing"]
+    assert registry.load_failures == 1
+
+
+def test_failed_load_is_not_retried_until_forgotten():
+    loader = FakeLoader(fail={"missing"})
+    registry = SpacyModelRegistry(loader=loader)
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            registry.get("missing")
+    assert loader.calls == ["missing"]
+
+    loader.fail.clear()
+    registry.forget_failure("missing")
+    assert registry.get("missing") is not None
+    assert loader.calls == ["missing", "missing"]
@@ -0,0 +1,51 @@
+import pytest
+
+from benchmark_multiword_matcher import scan_match, synthetic
+from multiword_matcher import PhraseMatcher
+import word_tokenizer
+
+
+def _spans(text, phrases):
+    tokens = word_tokenizer.parse_text(text)
+    return PhraseMatcher(phrases).match(tokens), scan_match(tokens, phrases)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_reader_scan_on_synthetic_text(seed):
+    text, tokens, phrases = synthetic(800, 60, seed)
+
+    assert PhraseMatcher(phrases).match(tokens) == scan_match(tokens, phrases)
+
+
+@pytest.mark.parametrize(
+    "text, phrases",
+    [
+        ("I saw New York and NEW   YORK today.", ["new york"]),
+        ("the New York Times in New York", ["new york", "new york times"]),
+        ("ice cream cone and ice cream", ["ice cream", "cream cone"]),
+        ("a b c d", ["a b", "b c", "c d", "a b c"]),
+        ("end of the line\nstarts here", ["line starts", "the line", "of the"]),
+        ("well, well, well", ["well, well"]),
+        ("über straße and Über Straße", ["über straße"]),
+        ("nothing matches", ["missing phrase"]),
+    ],
+)
+def test_matches_reader_scan_on_edge_cases(text, phrases):
+    matched, expected = _spans(text, phrases)
+
+    assert matched == expected
+
+
+def test_longest_term_wins_and_matching_never_crosses_paragraphs():
+    tokens = word_tokenizer.parse_text("the New York Times\nYork Times")
+    spans = PhraseMatcher(["new york", "new york times", "times york"]).match(tokens)
+
+    assert [term for _, _, term in spans] == ["new york times"]
+    assert "".join(text for _, text in tokens[spans[0][0]:spans[0][1]]) == "New York Times"
+
+
+def test_single_words_and_separator_edges_are_not_phrases():
+    matcher = PhraseMatcher(["word", " spaced ", "trailing,", "two words"])
+
+    assert len(matcher) == 1
+    assert matcher.match_text("two   words") == [(0, 3, "two words")]
@@ -0,0 +1,68 @@
+import pytest
+
+from extensions import db
+import readability_backfill
+
+
+@pytest.fixture
+def lessons(language, models):
+    lessons = [
+        models.Lesson(language_id=language.id, title=f"Lesson {i}", text_content=f"word{i} and more words")
+        for i in range(6)
+    ]
+    db.session.add_all(lessons)
+    db.session.commit()
+    return lessons
+
+
+def _fail_once_for(monkeypatch, doc_id):
+    """Make apply_analysis raise for one document on its first attempt only."""
+    apply_analysis = readability_backfill.apply_analysis
+    failed = []
+
+    def flaky(item_type, item, analysis):
+        if item.id == doc_id and not failed:
+            failed.append(item.id)
+            raise RuntimeError("analysis failed")
+        return apply_analysis(item_type, item, analysis)
+
+    monkeypatch.setattr(readability_backfill, "apply_analysis", flaky)
+    return failed
+
+
+def test_backfill_indexes_every_document(language, lessons):
+    progress = readability_backfill.backfill_language(language.id, batch_size=2)
+
+    assert (progress.done, progress.failed) == (6, 0)
+    assert readability_backfill.get_checkpoint(language.id) is None
+    assert readability_backfill.pending_documents(language.id) == []
+    assert all(lesson.readability_token_count == 4 for lesson in lessons)
+
+
+def test_failed_batch_is_retried_by_the_next_run(monkeypatch, language, lessons):
+    failed = _fail_once_for(monkeypatch, lessons[2].id)
+
+    progress = readability_backfill.backfill_language(language.id, batch_size=2)
+    assert failed == [lessons[2].id]
+    assert (progress.done, progress.failed) == (4, 2)
+    # Later batches are committed, but the checkpoint stays before the failed one
+    assert readability_backfill.get_checkpoint(language.id) == ("lesson", lessons[1].id)
+    assert readability_backfill.pending_documents(language.id) == [
+        ("lesson", lessons[2].id),
+        ("lesson", lessons[3].id),
+    ]
+
+    progress = readability_backfill.backfill_language(language.id, batch_size=2)
+    assert (progress.done, progress.failed) == (2, 0)
+    assert readability_backfill.get_checkpoint(language.id) is None
+    assert readability_backfill.pending_documents(language.id) == []
+
+
+def test_restart_drops_a_stale_checkpoint(monkeypatch, language, lessons):
+    _fail_once_for(monkeypatch, lessons[4].id)
+    readability_backfill.backfill_language(language.id, batch_size=2)
+    assert readability_backfill.get_checkpoint(language.id) == ("lesson", lessons[3].id)
+
+    progress = readability_backfill.backfill_language(language.id, batch_size=2, force=True, restart=True)
+    assert (progress.done, progress.failed) == (6, 0)
+    assert readability_backfill.get_checkpoint(language.id) is None
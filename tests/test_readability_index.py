@@ -0,0 +1,95 @@
+import pytest
+
+from extensions import db
+import readability_index
+import readability_matrix
+from vocab_utils import get_readability_tallies, lemma_statuses, readability_from_tallies
+
+TEXTS = [
+    "The cat sat on the mat. The cat was happy.",
+    "A dog and a cat met on the road; the dog barked.",
+    "Nothing here matches anything else at all.",
+    "Cat cat cat dog dog mat",
+]
+
+
+@pytest.fixture
+def lessons(language, models):
+    lessons = [
+        models.Lesson(language_id=language.id, title=f"Lesson {i}", text_content=text)
+        for i, text in enumerate(TEXTS)
+    ]
+    db.session.add_all(lessons)
+    db.session.flush()
+    for lesson in lessons:
+        readability_index.index_document("lesson", lesson)
+    db.session.commit()
+    return lessons
+
+
+def _set_status(models, language, term, status):
+    before = readability_index.snapshot_lemmas(language.id, [term])
+    vocab_term = models.VocabTerm.query.filter_by(language_id=language.id, term=term).first()
+    if vocab_term is None:
+        vocab_term = models.VocabTerm(language_id=language.id, term=term, lemma=term, status=status)
+        db.session.add(vocab_term)
+    else:
+        vocab_term.status = status
+    readability_index.apply_lemma_changes(language.id, before)
+    db.session.commit()
+
+
+def _assert_matches_full_recompute(language, lessons):
+    for lesson in lessons:
+        db.session.refresh(lesson)
+        expected = readability_from_tallies(get_readability_tallies(lesson.text_content, language.id))
+        assert lesson.readability_score == pytest.approx(expected)
+
+    matrix = readability_matrix.get_matrix(language.id)
+    keys, _, _, scores = matrix.score(lemma_statuses(language.id, None))
+    by_id = {doc_id: score for (doc_type, doc_id), score in zip(keys, scores)}
+    for lesson in lessons:
+        assert by_id[lesson.id] == pytest.approx(lesson.readability_score)
+
+
+
+def test_index_document_scores_unknown_text_as_zero(language, lessons):
+    assert all(lesson.readability_score == 0.0 for lesson in lessons)
+    assert lessons[0].readability_token_count == 10
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        [("cat", 6)],
+        [("cat", 3), ("dog", 5), ("cat", 1)],
+        [("the", 7), ("mat", 4)],
+        [("dog", 7), ("dog", 2), ("the", 7), ("the", 0)],
+    ],
+)
+def test_incremental_updates_match_full_recompute(models, language, lessons, changes):
+    for term, status in changes:
+        _set_status(models, language, term, status)
+        _assert_matches_full_recompute(language, lessons)
+
+
+def test_everything_ignored_is_fully_readable(models, language, lessons):
+    for term in ("cat", "dog", "mat"):
+        _set_status(models, language, term, 7)
+
+    db.session.refresh(lessons[3])
+    assert lessons[3].readability_token_count == 0
+    assert lessons[3].readability_score == 100.0
+    _assert_matches_full_recompute(language, lessons)
+
+
+def test_reindexing_after_an_edit_replaces_the_counts(models, language, lessons):
+    _set_status(models, language, "cat", 6)
+    lesson = lessons[2]
+    lesson.text_content = "cat cat unknown"
+    readability_index.index_document("lesson", lesson)
+    db.session.commit()
+
+    assert lesson.readability_score == pytest.approx(200 / 3)
+    _set_status(models, language, "unknown", 6)
+    _assert_matches_full_recompute(language, lessons)
@@ -0,0 +1,82 @@
+import pytest
+
+from extensions import db
+import readability_index
+import readability_matrix
+
+
+@pytest.fixture
+def lessons(language, models):
+    lessons = [
+        models.Lesson(language_id=language.id, title=f"Lesson {i}", text_content=text)
+        for i, text in enumerate(["cat dog mat", "dog dog bird"])
+    ]
+    db.session.add_all(lessons)
+    db.session.flush()
+    for lesson in lessons:
+        readability_index.index_document("lesson", lesson)
+    db.session.commit()
+    return lessons
+
+
+def _write_rows_elsewhere(models, language, doc_id, counts):
+    """Insert document_lemma rows the way another process would, bypassing this one's matrix."""
+    db.session.add_all(
+        models.DocumentLemma(doc_type="lesson", doc_id=doc_id, language_id=language.id, lemma=lemma, count=count)
+        for lemma, count in counts.items()
+    )
+    db.session.commit()
+
+
+def test_local_changes_keep_the_matrix_current(models, language, lessons):
+    matrix = readability_matrix.get_matrix(language.id)
+    lesson = models.Lesson(language_id=language.id, title="Third", text_content="fish fish cat")
+    db.session.add(lesson)
+    db.session.flush()
+    readability_index.index_document("lesson", lesson)
+    db.session.commit()
+
+    assert readability_matrix.get_matrix(language.id) is matrix
+    assert matrix.signature == readability_matrix.current_signature(language.id)
+    assert ("lesson", lesson.id) in matrix.doc_rows
+
+
+def test_stale_signature_rebuilds_the_matrix(models, language, lessons):
+    matrix = readability_matrix.get_matrix(language.id)
+    _write_rows_elsewhere(models, language, 999, {"cat": 2, "owl": 1})
+
+    rebuilt = readability_matrix.get_matrix(language.id)
+    assert rebuilt is not matrix
+    assert ("lesson", 999) in rebuilt.doc_rows
+    assert rebuilt.shape == (3, 5)
+
+
+def test_local_change_after_a_foreign_one_does_not_adopt_its_signature(models, language, lessons):
+    matrix = readability_matrix.get_matrix(language.id)
+    _write_rows_elsewhere(models, language, 999, {"owl": 1})
+
+    # This process reindexes a document after the other process wrote: the
+    # matrix must not take the new signature as if it had seen both changes
+    lessons[0].text_content = "cat cat"
+    readability_index.index_document("lesson", lessons[0])
+    db.session.commit()
+    assert matrix.signature is None
+
+    rebuilt = readability_matrix.get_matrix(language.id)
+    assert rebuilt is not matrix
+    assert ("lesson", 999) in rebuilt.doc_rows
+    assert rebuilt.signature == readability_matrix.current_signature(language.id)
+
+
+def test_rescore_language_matches_the_incremental_scores(models, language, lessons):
+    db.session.add(models.VocabTerm(language_id=language.id, term="dog", lemma="dog", status=5))
+    db.session.commit()
+    assert readability_matrix.rescore_language(language.id) == 2
+    db.session.commit()
+
+    for lesson in lessons:
+        db.session.refresh(lesson)
+        expected = readability_index.score_from_sums(lesson.readability_weight_sum, lesson.readability_token_count)
+        assert lesson.readability_score == pytest.approx(expected)
+    assert lessons[1].readability_token_count == 3
+    assert lessons[1].readability_weight_sum == pytest.approx(2 * readability_matrix.STATUS_WEIGHTS[5])
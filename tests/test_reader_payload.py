@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from extensions import db
+from multiword_matcher import PhraseMatcher
+import reader_payload
+from reader_payload import build_payload, payload_etag, payload_key
+import vocab_snapshot
+from vocab_snapshot import vocab_snapshots
+import word_tokenizer
+
+TEXT = "Guten Morgen, Hund! Der Hund\nschläft. Guten  morgen"
+
+
+@pytest.fixture
+def lesson(app_context, language, models):
+    vocab_snapshots.init_app(app_context)
+    db.session.add_all([
+        models.VocabTerm(language_id=language.id, term="hund", status=3, translation="dog"),
+        models.VocabTerm(language_id=language.id, term="der", status=7, translation="the"),
+        models.VocabTerm(language_id=language.id, term="guten morgen", status=2, translation="good morning"),
+        models.VocabTerm(language_id=language.id, term="hund schläft", status=4, translation="dog sleeps"),
+    ])
+    lesson = models.Lesson(
+        language_id=language.id, title="Morgen", text_content=TEXT,
+        timestamps=json.dumps([0.0, 4.5]), timestamp_offset=1.5,
+    )
+    db.session.add(lesson)
+    db.session.commit()
+    reader_payload.payload_cache = reader_payload.PayloadCache()
+    return lesson
+
+
+def _set_status(models, language_id, term, status):
+    db.session.query(models.VocabTerm).filter_by(language_id=language_id, term=term).one().status = status
+    db.session.commit()
+
+
+def test_payload_tokens_statuses_and_phrases(lesson):
+    payload = build_payload(lesson)
+
+    tokens = word_tokenizer.parse_text(TEXT)
+    assert len(payload["tokens"]) == len(tokens)
+    terms = payload["terms"]
+    for row, (kind, text) in zip(payload["tokens"], tokens):
+        assert row[1] == text
+        if kind == "word":
+            assert row[0] == "w" and terms[row[2]][0] == text.lower()
+        else:
+            assert row[0] == "s"
+
+    statuses = {term: status for term, status, _ in terms}
+    assert statuses == {"guten": 0, "morgen": 0, "hund": 3, "der": 7, "schläft": 0}
+    by_term = {term: payload["translations"][tid] if tid is not None else None for term, _, tid in terms}
+    assert by_term["hund"] == "dog" and by_term["guten"] is None
+
+    # Phrases never cross a paragraph break; whitespace runs still match
+    assert [(term, status) for _, _, term, status, _ in payload["multiword"]] == [
+        ("guten morgen", 2),
+        ("guten morgen", 2),
+    ]
+    assert payload["timestamps"] == [0.0, 4.5]
+    assert payload["offset"] == 1.5
+
+
+def test_etag_follows_the_vocabulary_and_the_cache(models, lesson):
+    key, etag = payload_key(lesson)
+    built_key, body = reader_payload.reader_payload(lesson, key)
+    assert built_key == key and payload_etag(*built_key) == etag
+    assert reader_payload.reader_payload(lesson, key) == (key, body)
+
+    _set_status(models, lesson.language_id, "guten morgen", 5)
+    new_key, new_etag = payload_key(lesson)
+    assert new_etag != etag
+    _, new_body = reader_payload.reader_payload(lesson, new_key)
+    assert json.loads(new_body)["multiword"][0][3] == 5
+    assert json.loads(new_body)["vocab_version"] == new_key[2]
+
+
+def test_phrase_patched_while_building_is_not_mixed_in(monkeypatch, models, lesson):
+    version = payload_key(lesson)[0][2]
+    vocab_snapshots.build(lesson.language_id, version)
+
+    def racing_matcher(phrases):
+        # A commit of another thread lands while the automaton is built
+        vocab_snapshots.patch({lesson.language_id: (1, {"guten morgen": (6, "good morning")})})
+        return PhraseMatcher(phrases)
+
+    monkeypatch.setattr(vocab_snapshot, "PhraseMatcher", racing_matcher)
+    payload = build_payload(lesson, version)
+    assert payload["vocab_version"] == version
+    assert {row[3] for row in payload["multiword"]} == {2}
+
+    # The index built from the old phrases is not kept for the next read
+    monkeypatch.setattr(vocab_snapshot, "PhraseMatcher", PhraseMatcher)
+    payload = build_payload(lesson, version + 1)
+    assert payload["vocab_version"] == version + 1
+    assert {row[3] for row in payload["multiword"]} == {6}
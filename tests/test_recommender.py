@@ -0,0 +1,119 @@
+import pytest
+
+from extensions import db
+import readability_index
+import recommender
+from text_processor import summarize_words
+from vocab_utils import get_readability_tallies, lemma_statuses, readability_from_tallies
+
+TEXTS = [
+    "The cat sat on the mat. The cat was happy.",
+    "A dog and a cat met on the road; the dog barked.",
+    "Nothing here matches anything else at all.",
+    "Cat cat cat dog dog mat",
+    "bird bird fish",
+]
+
+
+@pytest.fixture
+def lessons(language, models):
+    lessons = [
+        models.Lesson(language_id=language.id, title=f"Lesson {i}", text_content=text)
+        for i, text in enumerate(TEXTS)
+    ]
+    db.session.add_all(lessons)
+    db.session.flush()
+    for lesson in lessons:
+        readability_index.index_document("lesson", lesson)
+    db.session.commit()
+    return lessons
+
+
+def _set_status(models, language, term, status):
+    before = readability_index.snapshot_lemmas(language.id, [term])
+    vocab_term = models.VocabTerm.query.filter_by(language_id=language.id, term=term).first()
+    if vocab_term is None:
+        db.session.add(models.VocabTerm(language_id=language.id, term=term, lemma=term, status=status))
+    else:
+        vocab_term.status = status
+    readability_index.apply_lemma_changes(language.id, before)
+    db.session.commit()
+
+
+def _full_recompute(language, lessons):
+    """(comprehension, learning lemmas) of every lesson, computed from its text."""
+    expected = {}
+    for lesson in lessons:
+        lemmas = summarize_words(lesson.text_content).lemma_counts
+        statuses = lemma_statuses(language.id, lemmas)
+        learning = sum(1 for lemma in lemmas if statuses.get(lemma, 0) in recommender.LEARNING_STATUSES)
+        score = readability_from_tallies(get_readability_tallies(lesson.text_content, language.id))
+        expected[("lesson", lesson.id)] = (score / 100, learning)
+    return expected
+
+
+def _assert_index_matches(language, lessons):
+    index = recommender.get_index(language.id)
+    expected = _full_recompute(language, lessons)
+    assert sorted(index.docs) == sorted(expected)
+    assert list(index.scores) == sorted(index.scores)
+    for doc, score, learning in zip(index.docs, index.scores, index.learning):
+        assert score == pytest.approx(expected[doc][0])
+        assert learning == expected[doc][1]
+
+
+def test_updates_between_queries_match_a_full_recompute(models, language, lessons):
+    _assert_index_matches(language, lessons)
+    for term, status in [("cat", 3), ("dog", 5), ("cat", 6), ("the", 7), ("bird", 1), ("dog", 0)]:
+        _set_status(models, language, term, status)
+        _assert_index_matches(language, lessons)
+
+
+def test_several_updates_between_queries_match_a_full_recompute(models, language, lessons):
+    _assert_index_matches(language, lessons)
+    _set_status(models, language, "cat", 2)
+    _set_status(models, language, "mat", 4)
+    _set_status(models, language, "cat", 7)
+    _assert_index_matches(language, lessons)
+
+
+def test_new_documents_are_picked_up(models, language, lessons):
+    _assert_index_matches(language, lessons)
+    lesson = models.Lesson(language_id=language.id, title="New", text_content="fish dog")
+    db.session.add(lesson)
+    db.session.flush()
+    readability_index.index_document("lesson", lesson)
+    db.session.commit()
+    _assert_index_matches(language, lessons + [lesson])
+
+
+def test_recommend_returns_the_nearest_documents(models, language, lessons):
+    _set_status(models, language, "cat", 6)
+    _set_status(models, language, "bird", 2)
+
+    results = recommender.recommend(language.id, target=0.5, k=2)
+    expected = _full_recompute(language, lessons)
+    nearest = sorted(expected, key=lambda doc: abs(expected[doc][0] - 0.5))[:2]
+    assert [(r["type"], r["id"]) for r in results] == nearest
+
+    reinforced = recommender.recommend(language.id, target=0.0, k=1, reinforce=1.0)
+    assert reinforced[0]["learning_lemmas"] == 1
+
+
+def test_status_changes_update_the_index_in_place(models, language, lessons):
+    index = recommender.get_index(language.id)
+    _set_status(models, language, "cat", 4)
+    _set_status(models, language, "dog", 6)
+
+    assert recommender.get_index(language.id) is index
+    _assert_index_matches(language, lessons)
+
+
+def test_too_many_changes_rebuild_the_index(monkeypatch, models, language, lessons):
+    monkeypatch.setattr(recommender, "MAX_INCREMENTAL_TERMS", 1)
+    index = recommender.get_index(language.id)
+    _set_status(models, language, "cat", 4)
+    _set_status(models, language, "dog", 6)
+
+    assert recommender.get_index(language.id) is not index
+    _assert_index_matches(language, lessons)
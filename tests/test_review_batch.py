@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from extensions import db
+from review_log import ReviewLogBuffer
+
+START = datetime(2026, 3, 10, 8, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def buffer(models, monkeypatch):
+    # No app: rows wait in the buffer instead of being flushed by a timer
+    buffer = ReviewLogBuffer()
+    buffer.batch_size = 1000
+    monkeypatch.setattr(models, "review_logs", buffer)
+    return buffer
+
+
+@pytest.fixture
+def terms(language, models):
+    terms = [
+        models.VocabTerm(language_id=language.id, term="hund", status=1),
+        models.VocabTerm(
+            language_id=language.id, term="katze", status=3, state="review", stability=4.0, difficulty=5.0,
+            last_review_date=(START - timedelta(days=4)).replace(tzinfo=None),
+            next_review_date=START.replace(tzinfo=None),
+        ),
+    ]
+    db.session.add_all(terms)
+    db.session.commit()
+    return terms
+
+
+def _millis(value):
+    return int(value.timestamp() * 1000)
+
+
+def _post(app_context, models, answers):
+    with app_context.test_request_context(json={"answers": answers}):
+        response = models.batch_update_review_cards()
+    return response.get_json()
+
+
+def _state(term):
+    db.session.refresh(term)
+    return (term.status, term.state, term.stability, term.difficulty, term.reviews, term.lapses,
+            term.next_review_date, term.last_review_date, term.last_rating_type)
+
+
+def test_replayed_batch_changes_nothing(app_context, models, terms, buffer):
+    hund, katze = terms
+    answers = [
+        {"term_id": hund.id, "rating": "good", "direction": "ru_to_en", "answered_at": _millis(START)},
+        {"term_id": katze.id, "rating": "again", "direction": "ru_to_en", "answered_at": _millis(START + timedelta(seconds=5))},
+        {"term_id": hund.id, "rating": "good", "direction": "ru_to_en", "answered_at": _millis(START + timedelta(minutes=10))},
+    ]
+
+    first = _post(app_context, models, answers)
+    assert first["applied"] == 3
+    after_first = [_state(term) for term in terms]
+    assert buffer.pending() == 3
+
+    # The response was lost and the client sends the same batch again
+    second = _post(app_context, models, answers)
+    assert second["applied"] == 0
+    assert all(result["skipped"] for result in second["results"])
+    # Skipped answers report the term's current level
+    assert [result["new_status"] for result in second["results"]] == [hund.status, katze.status, hund.status]
+    assert [_state(term) for term in terms] == after_first
+    assert buffer.pending() == 3
+
+
+def test_replay_applies_only_the_answers_not_seen(app_context, models, terms, buffer):
+    hund, _ = terms
+    early = {"term_id": hund.id, "rating": "good", "direction": "ru_to_en", "answered_at": _millis(START)}
+    late = {"term_id": hund.id, "rating": "good", "direction": "ru_to_en", "answered_at": _millis(START + timedelta(hours=1))}
+
+    _post(app_context, models, [early])
+    result = _post(app_context, models, [early, late])
+
+    assert result["applied"] == 1
+    assert [r["skipped"] for r in result["results"]] == [True, False]
+    assert hund.reviews == 2
+    assert buffer.pending() == 2
+
+
+def test_apply_review_matches_the_single_update(app_context, models, language, buffer):
+    # Applying answers one by one and as one batch ends in the same state
+    def make(term):
+        item = models.VocabTerm(language_id=language.id, term=term, status=2, state="learning", stability=1.0,
+                                difficulty=6.0, last_review_date=(START - timedelta(days=1)).replace(tzinfo=None))
+        db.session.add(item)
+        db.session.commit()
+        return item
+
+    one, batched = make("eins"), make("zwei")
+    times = [START, START + timedelta(minutes=3), START + timedelta(days=2)]
+    for when, rating in zip(times, ("again", "good", "easy")):
+        models._apply_review(one, rating, "ru_to_en", when)
+    db.session.commit()
+    _post(app_context, models, [
+        {"term_id": batched.id, "rating": rating, "direction": "ru_to_en", "answered_at": _millis(when)}
+        for when, rating in zip(times, ("again", "good", "easy"))
+    ])
+
+    assert _state(one) == _state(batched)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from extensions import db
+import review_log
+from review_log import ReviewLogBuffer, reviews_by_day
+
+START = datetime(2026, 3, 10, 8, 0)
+
+
+@pytest.fixture
+def term(language, models):
+    term = models.VocabTerm(language_id=language.id, term="hund", status=2)
+    db.session.add(term)
+    db.session.commit()
+    return term
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = ReviewLogBuffer()
+    buffer.batch_size = 3
+    monkeypatch.setattr(review_log, "review_logs", buffer)
+    return buffer
+
+
+def _record(buffer, term, minutes, rating="good"):
+    buffer.record(term, rating, START + timedelta(minutes=minutes), 1.0, 3.0, "learning", "review")
+
+
+def _rows(models):
+    return models.ReviewLogEntry.query.order_by(models.ReviewLogEntry.ts).all()
+
+
+def test_rows_are_written_a_batch_at_a_time(models, term, buffer):
+    _record(buffer, term, 0)
+    _record(buffer, term, 1)
+    assert buffer.pending() == 2
+    assert _rows(models) == []
+
+    _record(buffer, term, 2, rating="again")
+    assert buffer.pending() == 0
+    rows = _rows(models)
+    assert [(row.rating, row.state_before, row.state_after) for row in rows] == [(3, 1, 2), (3, 1, 2), (1, 1, 2)]
+
+
+def test_reads_flush_waiting_rows_first(term, buffer):
+    _record(buffer, term, 0)
+    _record(buffer, term, 60 * 24, rating="easy")
+
+    days = reviews_by_day(term.language_id, START - timedelta(days=1), START + timedelta(days=2))
+    assert days == {"2026-03-10": {3: 1}, "2026-03-11": {4: 1}}
+    assert buffer.pending() == 0
+
+
+def test_aware_times_are_stored_as_naive_utc(models, term, buffer):
+    reviewed_at = datetime(2026, 3, 10, 10, 0, tzinfo=timezone(timedelta(hours=2)))
+    buffer.record(term, "hard", reviewed_at, 0.0, 1.0, "new", "learning")
+    buffer.flush()
+
+    assert _rows(models)[0].ts == datetime(2026, 3, 10, 8, 0)
+
+
+def test_failed_batches_are_kept_and_retried(monkeypatch, models, term, buffer):
+    _record(buffer, term, 0)
+
+    def locked(table):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(review_log, "insert", locked)
+    assert buffer.flush() == 0
+    assert buffer.pending() == 1
+
+    monkeypatch.undo()
+    assert buffer.flush() == 1
+    assert len(_rows(models)) == 1
+
+
+def test_discarded_language_rows_are_never_written(models, term, buffer):
+    _record(buffer, term, 0)
+    buffer.discard_language(term.language_id)
+
+    assert buffer.flush() == 0
+    assert _rows(models) == []
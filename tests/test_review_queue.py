@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from extensions import db
+import review_queue
+
+DAY = date(2026, 3, 10)
+NOON = datetime(2026, 3, 10, 12, 0)
+
+
+@pytest.fixture
+def deck(language, models):
+    """Language with 2 new cards a day, 10 reviewed cards (reviews counter 0) and 5 new ones."""
+    db.session.add(models.SRSSettings(language_id=language.id, new_cards_per_day=2, max_reviews_per_day=50))
+    terms = []
+    for i in range(10):
+        terms.append(models.VocabTerm(
+            language_id=language.id, term=f"seen{i}", status=2, reviews=0,
+            last_review_date=NOON - timedelta(days=3), next_review_date=NOON - timedelta(hours=i),
+        ))
+    for i in range(5):
+        terms.append(models.VocabTerm(
+            language_id=language.id, term=f"new{i}", status=1, reviews=0,
+            last_review_date=None, next_review_date=NOON - timedelta(days=1, hours=i),
+        ))
+    # Not due today, known, or ignored: never queued
+    terms.append(models.VocabTerm(
+        language_id=language.id, term="later", status=3,
+        last_review_date=NOON, next_review_date=NOON + timedelta(days=2),
+    ))
+    terms.append(models.VocabTerm(language_id=language.id, term="known", status=6, next_review_date=NOON))
+    terms.append(models.VocabTerm(language_id=language.id, term="ignored", status=7, next_review_date=NOON))
+    db.session.add_all(terms)
+    db.session.commit()
+    return terms
+
+
+def _entries(models, language):
+    return models.ReviewQueueEntry.query.filter_by(language_id=language.id, day=DAY).order_by(
+        models.ReviewQueueEntry.position
+    ).all()
+
+
+def test_split_uses_last_review_date_not_the_reviews_counter(models, language, deck):
+    review_queue.build_queue(language.id, DAY)
+
+    assert review_queue.queue_counts(language.id, DAY) == {"new": 2, "review": 10, "answered": 0}
+    entries = _entries(models, language)
+    terms = {term.id: term for term in deck}
+    assert {terms[e.term_id].term for e in entries if e.is_new} == {"new3", "new4"}  # earliest due first
+    assert all(terms[e.term_id].term.startswith("seen") for e in entries if not e.is_new)
+
+
+def test_queue_is_ordered_by_due_date(models, language, deck):
+    review_queue.build_queue(language.id, DAY)
+
+    terms = {term.id: term for term in deck}
+    due = [terms[e.term_id].next_review_date for e in _entries(models, language)]
+    assert due == sorted(due)
+
+
+def test_limits_cap_each_side(models, language, deck):
+    settings = models.SRSSettings.query.filter_by(language_id=language.id).one()
+    settings.new_cards_per_day = 0
+    settings.max_reviews_per_day = 4
+    db.session.commit()
+
+    review_queue.build_queue(language.id, DAY)
+
+    assert review_queue.queue_counts(language.id, DAY) == {"new": 0, "review": 4, "answered": 0}
+
+
+def test_rebuild_counts_what_was_already_queued(models, language, deck):
+    review_queue.build_queue(language.id, DAY)
+    settings = models.SRSSettings.query.filter_by(language_id=language.id).one()
+    settings.new_cards_per_day = 3
+    db.session.commit()
+
+    review_queue.build_queue(language.id, DAY)
+    assert review_queue.queue_counts(language.id, DAY)["new"] == 2  # already built today
+
+    review_queue.build_queue(language.id, DAY, rebuild=True)
+    assert review_queue.queue_counts(language.id, DAY) == {"new": 3, "review": 10, "answered": 0}
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fsrs import Card, Rating, Scheduler, State
+
+from benchmark_srs_forecast import synthetic_deck
+from extensions import db
+from review_log import ReviewLogBuffer
+import srs_forecast
+from srs_forecast import ForecastCache, ForgettingModel, simulate
+
+TODAY = datetime(2026, 3, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def scheduler():
+    return Scheduler(enable_fuzzing=False)
+
+
+def _scalar_simulate(scheduler, stability, difficulty, last_day, due_day, days, new_per_day, seed=0):
+    """simulate() one card at a time through fsrs.Scheduler, drawing the same random numbers."""
+    rng = np.random.default_rng(seed)
+    reviews, new, lapses = [0] * days, [0] * days, [0] * days
+    cards = [
+        {"stability": s, "difficulty": d, "last": None if np.isnan(l) else l, "due": u}
+        for s, d, l, u in zip(stability, difficulty, last_day, due_day)
+    ]
+    unseen = sorted((i for i, card in enumerate(cards) if card["last"] is None), key=lambda i: cards[i]["due"])
+    for card in cards:
+        card["due"] = max(card["due"], 0) if card["last"] is not None else days
+
+    for day in range(days):
+        due = [i for i, card in enumerate(cards) if card["due"] == day]
+        for i in unseen[day * new_per_day:(day + 1) * new_per_day]:
+            card = cards[i]
+            card["stability"] = scheduler._initial_stability(rating=Rating.Good)
+            card["difficulty"] = scheduler._initial_difficulty(rating=Rating.Good, clamp=True)
+            card["last"] = day
+            card["due"] = day + scheduler._next_interval(stability=card["stability"])
+            new[day] += 1
+        for i in due:
+            card = cards[i]
+            r = scheduler.get_card_retrievability(
+                Card(state=State.Review, stability=card["stability"], last_review=TODAY + timedelta(days=card["last"])),
+                TODAY + timedelta(days=day),
+            )
+            recalled = rng.random() < r
+            if recalled:
+                stability = scheduler._next_recall_stability(
+                    difficulty=card["difficulty"], stability=card["stability"], retrievability=r, rating=Rating.Good
+                )
+            else:
+                stability = scheduler._next_forget_stability(
+                    difficulty=card["difficulty"], stability=card["stability"], retrievability=r
+                )
+            card["stability"] = scheduler._clamp_stability(stability=stability)
+            card["difficulty"] = scheduler._next_difficulty(
+                difficulty=card["difficulty"], rating=Rating.Good if recalled else Rating.Again
+            )
+            card["last"] = day
+            card["due"] = day + scheduler._next_interval(stability=card["stability"])
+            reviews[day] += 1 if recalled else 2
+            lapses[day] += 0 if recalled else 1
+    return reviews, new, lapses, [card["stability"] for card in cards], [card["difficulty"] for card in cards]
+
+
+def test_simulation_matches_scalar_fsrs(scheduler):
+    stability, difficulty, last_day, due_day = synthetic_deck(300, np.random.default_rng(7))
+    # Whole day offsets, as build_forecast passes them
+    last_day, due_day = np.floor(last_day), np.floor(due_day)
+    model = ForgettingModel(scheduler.parameters, scheduler.desired_retention, scheduler.maximum_interval)
+
+    expected = _scalar_simulate(scheduler, stability, difficulty, last_day, due_day, 60, 5)
+    reviews, new, lapses = simulate(model, stability, difficulty, last_day, due_day, 60, 5)
+
+    assert reviews.tolist() == expected[0]
+    assert new.tolist() == expected[1]
+    assert lapses.tolist() == expected[2]
+    assert np.allclose(stability, expected[3], rtol=1e-9)
+    assert np.allclose(difficulty, expected[4], rtol=1e-9)
+
+
+def test_retrievability_matches_fsrs(scheduler):
+    model = ForgettingModel(scheduler.parameters, scheduler.desired_retention, scheduler.maximum_interval)
+    stability = np.array([0.1, 1.0, 3.5, 40.0, 400.0])
+    elapsed = np.array([0.0, 0.5, 2.9, 30.0, 1000.0])
+
+    expected = [
+        scheduler.get_card_retrievability(
+            Card(state=State.Review, stability=s, last_review=TODAY), TODAY + timedelta(days=float(e))
+        )
+        for s, e in zip(stability, elapsed)
+    ]
+    assert np.allclose(model.retrievability(stability, elapsed), expected, rtol=1e-12)
+
+
+@pytest.fixture
+def deck(language, models):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    terms = [
+        models.VocabTerm(
+            language_id=language.id, term=f"karte{i}", status=2, state="review", stability=2.0 + i, difficulty=5.0,
+            last_review_date=now - timedelta(days=3), next_review_date=now - timedelta(hours=1),
+        )
+        for i in range(4)
+    ]
+    db.session.add_all(terms)
+    db.session.commit()
+    return terms
+
+
+def test_cache_is_invalidated_by_a_review(app_context, models, deck, scheduler, monkeypatch):
+    cache = ForecastCache()
+    monkeypatch.setattr(models, "forecasts", cache)
+    monkeypatch.setattr(models, "review_logs", ReviewLogBuffer())
+    language_id = deck[0].language_id
+
+    first = cache.get(language_id, 30, scheduler, 20)
+    assert first["due_now"] == 4
+    assert cache.get(language_id, 30, scheduler, 20) is first
+
+    with app_context.test_request_context(json={"term_id": deck[0].id, "rating": "good", "direction": "ru_to_en"}):
+        models.update_review_card()
+
+    second = cache.get(language_id, 30, scheduler, 20)
+    assert second is not first
+    assert second["due_now"] == 3
+
+
+def test_expired_entries_are_rebuilt(app_context, deck, scheduler, monkeypatch):
+    cache = ForecastCache()
+    cache.ttl = 0
+    builds = []
+    build = srs_forecast.build_forecast
+    monkeypatch.setattr(srs_forecast, "build_forecast", lambda *args: builds.append(args) or build(*args))
+
+    cache.get(deck[0].language_id, 7, scheduler, 20)
+    cache.get(deck[0].language_id, 7, scheduler, 20)
+    assert len(builds) == 2
@@ -0,0 +1,67 @@
+from extensions import db
+from text_analysis import FLAG_ALPHA, FLAG_SPACE, TextAnalysis, content_hash, store_text_analysis
+import text_analysis
+
+TEXT = "Shared text"
+MODEL_KEY = "xx_test@0/v1"
+
+
+def _store(text):
+    analysis = TextAnalysis(
+        text,
+        [(0, 6, "", "ADJ", FLAG_ALPHA), (6, 1, "", "SPACE", FLAG_SPACE), (7, 4, "", "NOUN", FLAG_ALPHA)],
+        [(0, len(text))],
+    )
+    store_text_analysis(analysis, MODEL_KEY)
+
+
+def _cached(models, text):
+    return models.AnalyzedText.query.filter_by(content_hash=content_hash(text)).count()
+
+
+def _lesson(models, language, text):
+    lesson = models.Lesson(language_id=language.id, title="Lesson", text_content=text)
+    db.session.add(lesson)
+    db.session.commit()
+    return lesson
+
+
+def test_analysis_shared_by_another_lesson_is_kept(models, language):
+    first = _lesson(models, language, TEXT)
+    second = _lesson(models, language, TEXT)
+    _store(TEXT)
+
+    text_analysis.discard_text_analysis(first.text_content, "lesson", first.id)
+    db.session.delete(first)
+    db.session.commit()
+    assert _cached(models, TEXT) == 1
+
+    text_analysis.discard_text_analysis(second.text_content, "lesson", second.id)
+    db.session.delete(second)
+    db.session.commit()
+    assert _cached(models, TEXT) == 0
+    assert not any(key[0] == content_hash(TEXT) for key in text_analysis._memory_cache)
+
+
+def test_analysis_shared_by_a_story_is_kept(models, language):
+    lesson = _lesson(models, language, TEXT)
+    db.session.add(models.Story(language_id=language.id, title="Story", theme="Test", content=TEXT))
+    db.session.commit()
+    _store(TEXT)
+
+    text_analysis.discard_text_analysis(lesson.text_content, "lesson", lesson.id)
+    db.session.commit()
+
+    assert _cached(models, TEXT) == 1
+
+
+def test_analysis_of_an_unshared_text_is_discarded(models, language):
+    lesson = _lesson(models, language, TEXT)
+    _store(TEXT)
+    _store("Other text")
+
+    text_analysis.discard_text_analysis(lesson.text_content, "lesson", lesson.id)
+    db.session.commit()
+
+    assert _cached(models, TEXT) == 0
+    assert _cached(models, "Other text") == 1
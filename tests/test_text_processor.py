@@ -0,0 +1,84 @@
+import pytest
+import spacy
+
+from extensions import db
+from text_analysis import TextAnalysis
+from text_processor import iter_text_chunks, pipe_text_chunks, summarize_chunks, summarize_words
+from vocab_utils import compute_readability, get_readability_tallies, readability_from_tallies
+
+PARAGRAPH = (
+    "The dogs were running home. A cat sat on the mat, and it was happy! "
+    "Did they see the old house near the river? Nobody knows.\n\n"
+)
+TEXT = PARAGRAPH * 12 + "One last line without a full stop"
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def _fields(summary):
+    return summary.lemma_counts, summary.ignored, summary.words, list(summary.iter_sentences())
+
+
+@pytest.mark.parametrize("max_chars", [40, 150, 1000])
+def test_chunks_are_exact_bounded_slices(max_chars):
+    chunks = list(iter_text_chunks(TEXT, max_chars))
+
+    assert "".join(chunk for _, chunk in chunks) == TEXT
+    assert all(len(chunk) <= max_chars for _, chunk in chunks)
+    assert all(TEXT[offset:offset + len(chunk)] == chunk for offset, chunk in chunks)
+
+
+@pytest.mark.parametrize("max_chars", [150, 400, 1000])
+def test_chunked_summary_matches_a_single_doc(nlp, max_chars):
+    single = summarize_chunks([(0, nlp(TEXT))])
+    chunked = summarize_chunks(pipe_text_chunks(nlp, TEXT, max_chars))
+
+    assert chunked.lemma_counts == single.lemma_counts
+    assert (chunked.ignored, chunked.words) == (single.ignored, single.words)
+    # A chunk border can end a sentence early, nothing more
+    borders = len(list(iter_text_chunks(TEXT, max_chars))) - 1
+    assert single.sentence_count() <= chunked.sentence_count() <= single.sentence_count() + borders
+    assert chunked.lemma_counts["dogs"] == 12
+    assert chunked.ignored > 0  # stop words
+
+
+def test_summary_of_a_cached_analysis_matches_the_streamed_one(nlp):
+    analysis = TextAnalysis.from_chunks(TEXT, pipe_text_chunks(nlp, TEXT, 300))
+    restored = TextAnalysis.from_json(TEXT, analysis.to_json())
+
+    streamed = summarize_chunks(pipe_text_chunks(nlp, TEXT, 300))
+    assert _fields(restored.summary()) == _fields(streamed)
+    assert list(streamed.iter_sentences()) == analysis.sentences
+
+
+def test_summary_without_model_counts_reader_words():
+    summary = summarize_words("Straße, straße und 42!")
+
+    assert summary.lemma_counts == {"straße": 2, "und": 1, "42": 1}
+    assert (summary.words, summary.ignored) == (4, 0)
+
+
+def test_readability_from_tallies_matches_compute_readability():
+    tallies = {0: 3, 1: 1, 2: 0, 3: 2, 4: 0, 5: 1, 6: 4, 7: 5}
+    words = [{"status": s, "ignored": s == 7} for s, n in tallies.items() for _ in range(n)]
+
+    assert readability_from_tallies(tallies) == pytest.approx(compute_readability(words))
+    assert readability_from_tallies(dict.fromkeys(range(8), 0)) == 100.0
+
+
+def test_readability_tallies_without_model_match_terms(language, models):
+    db.session.add_all([
+        models.VocabTerm(language_id=language.id, term="katze", lemma="katze", status=6),
+        models.VocabTerm(language_id=language.id, term="der", lemma="der", status=7),
+    ])
+    db.session.commit()
+
+    tallies = get_readability_tallies("Der Hund und die Katze, der Katze.", language.id)
+
+    assert tallies[6] == 2 and tallies[7] == 2 and tallies[0] == 3
+    assert readability_from_tallies(tallies) == pytest.approx(40.0)
@@ -0,0 +1,107 @@
+import pytest
+
+from extensions import db
+import readability_index
+from vocab_bulk import MAX_OPERATIONS, BulkUpdateError, bulk_update_terms, parse_operations
+from vocab_snapshot import get_vocab_version
+from vocab_utils import STATUS_WEIGHTS
+
+
+@pytest.fixture
+def vocab(language, models):
+    db.session.add_all([
+        models.VocabTerm(language_id=language.id, term="hund", lemma="hund", status=2, translation="dog"),
+        models.VocabTerm(language_id=language.id, term="katze", lemma="katze", status=0),
+    ])
+    db.session.commit()
+    return language
+
+
+def _terms(models, language):
+    return {
+        term.term: (term.status, term.translation)
+        for term in models.VocabTerm.query.filter_by(language_id=language.id)
+    }
+
+
+@pytest.mark.parametrize(
+    "operations, index",
+    [
+        ("hund", None),
+        ([{"status": 3}], 0),
+        ([{"term": "ok"}, {"term": "   "}], 1),
+        ([{"term": "ok", "status": "high"}], 0),
+        ([{"term": "ok", "status": 8}], 0),
+    ],
+)
+def test_invalid_operations_are_rejected_with_their_index(operations, index):
+    with pytest.raises(BulkUpdateError) as excinfo:
+        parse_operations(operations)
+    assert excinfo.value.index == index
+
+
+def test_too_many_operations_are_rejected():
+    with pytest.raises(BulkUpdateError):
+        parse_operations([{"term": f"w{i}"} for i in range(MAX_OPERATIONS + 1)])
+
+
+def test_later_operations_on_the_same_term_win():
+    parsed = parse_operations([{"term": "Hund", "status": 3}, {"term": "hund ", "status": "5"}])
+
+    assert list(parsed) == ["hund"]
+    assert parsed["hund"]["status"] == 5
+
+
+def test_bulk_update_creates_and_updates_like_single_updates(models, vocab):
+    operations = parse_operations([
+        {"term": "Hund", "status": 6},
+        {"term": "katze", "translation": "cat"},  # unknown + translation -> level 1
+        {"term": "Maus", "translation": " mouse "},
+        {"term": "vogel", "status": 0},
+        {"term": "fisch", "status": 4, "sentence": "Der Fisch schwimmt."},
+    ])
+    results = bulk_update_terms(vocab, operations)
+    db.session.commit()
+
+    assert [(r["term"], r["status"], r["created"], r["updated"]) for r in results] == [
+        ("Hund", 6, False, True),
+        ("katze", 1, False, True),
+        ("Maus", 1, True, True),
+        ("vogel", 0, True, True),
+        ("fisch", 4, True, True),
+    ]
+    assert _terms(models, vocab) == {
+        "hund": (6, "dog"),
+        "katze": (1, "cat"),
+        "maus": (1, "mouse"),
+        "vogel": (0, None),
+        "fisch": (4, None),
+    }
+    fisch = models.VocabTerm.query.filter_by(language_id=vocab.id, term="fisch").one()
+    # Without a SpaCy model the lemma of a new term is its lowercase form
+    assert (fisch.lemma, fisch.context_sentence, fisch.state) == ("fisch", "Der Fisch schwimmt.", "new")
+
+
+def test_unchanged_terms_are_reported_as_such(vocab):
+    results = bulk_update_terms(vocab, parse_operations([{"term": "hund", "status": 2, "translation": "dog"}]))
+
+    assert results[0]["updated"] is False
+
+
+def test_bulk_update_is_one_version_and_rescores_lessons(models, vocab):
+    lesson = models.Lesson(language_id=vocab.id, title="L", text_content="Hund Maus Maus vogel")
+    db.session.add(lesson)
+    db.session.flush()
+    readability_index.index_document("lesson", lesson)
+    db.session.commit()
+    assert lesson.readability_score == pytest.approx(100 * STATUS_WEIGHTS[2] / 4)
+    version = get_vocab_version(vocab.id)
+
+    bulk_update_terms(vocab, parse_operations([
+        {"term": word, "status": 6} for word in ("hund", "maus", "vogel")
+    ]))
+    db.session.commit()
+
+    assert get_vocab_version(vocab.id) == version + 1
+    db.session.refresh(lesson)
+    assert lesson.readability_score == pytest.approx(100 * STATUS_WEIGHTS[6])
@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from extensions import db
+from vocab_snapshot import changes_since, get_vocab_version, vocab_snapshots
+
+SCRIPT_JS = os.path.join(os.path.dirname(__file__), "..", "static", "script.js")
+
+
+@pytest.fixture
+def terms(app_context, language, models):
+    vocab_snapshots.init_app(app_context)
+    db.session.add_all([
+        models.VocabTerm(language_id=language.id, term="hund", status=3, translation="dog"),
+        models.VocabTerm(language_id=language.id, term="katze", status=1),
+        models.VocabTerm(language_id=language.id, term="guten morgen", status=2),
+    ])
+    db.session.commit()
+    return language
+
+
+def _term(models, language, term):
+    return models.VocabTerm.query.filter_by(language_id=language.id, term=term).one()
+
+
+def test_since_zero_returns_every_term(terms):
+    version, full, changes = changes_since(terms.id, 0)
+
+    assert full and version == get_vocab_version(terms.id)
+    assert sorted(changes) == [["guten morgen", 2, None], ["hund", 3, "dog"], ["katze", 1, None]]
+
+
+def test_delta_has_the_latest_state_of_changed_terms_only(models, terms):
+    since = get_vocab_version(terms.id)
+    _term(models, terms, "hund").status = 4
+    db.session.commit()
+    _term(models, terms, "hund").status = 5
+    db.session.add(models.VocabTerm(language_id=terms.id, term="maus", status=2, translation="mouse"))
+    db.session.commit()
+    db.session.delete(_term(models, terms, "katze"))
+    db.session.commit()
+
+    version, full, changes = changes_since(terms.id, since)
+    assert not full and version == since + 3
+    assert sorted(changes, key=lambda change: change[0]) == [
+        ["hund", 5, "dog"],
+        ["katze", None, None],
+        ["maus", 2, "mouse"],
+    ]
+    assert changes_since(terms.id, version) == (version, False, [])
+
+    # Replaying from an intermediate version only returns what changed after it
+    _, _, changes = changes_since(terms.id, since + 2)
+    assert changes == [["katze", None, None]]
+
+
+def test_unknown_version_falls_back_to_everything(terms):
+    version, full, changes = changes_since(terms.id, get_vocab_version(terms.id) + 10)
+
+    assert full
+    assert len(changes) == 3
+
+
+def _apply_changes_source():
+    with open(SCRIPT_JS, encoding="utf-8") as f:
+        source = f.read()
+    match = re.search(r"^function applyChangesToReader\(changes, lessonPhrases\) \{.*?^\}", source, re.S | re.M)
+    assert match, "applyChangesToReader not found in static/script.js"
+    return match.group(0)
+
+
+def test_reader_only_adds_phrases_of_the_open_lesson():
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    program = (
+        "let vocabCache = {};\n"
+        "let multiwordTermsCache = [{term: 'guten morgen', status: 1, translation: null}];\n"
+        + _apply_changes_source()
+        + "\napplyChangesToReader(["
+        "['guten morgen', 4, 'good morning'], ['gute nacht', 2, null], ['bis bald', 3, null], "
+        "['hund', 5, 'dog'], ['katze', null, null]"
+        "], new Set(['bis bald']));"
+        "\nprocess.stdout.write(JSON.stringify({vocabCache, multiwordTermsCache}));"
+    )
+    result = subprocess.run([node, "-e", program], capture_output=True, text=True, check=True)
+    caches = json.loads(result.stdout)
+
+    assert caches["multiwordTermsCache"] == [
+        {"term": "guten morgen", "status": 4, "translation": "good morning"},
+        {"term": "bis bald", "status": 3, "translation": None},
+    ]
+    assert caches["vocabCache"] == {"hund": {"status": 5, "translation": "dog"}}
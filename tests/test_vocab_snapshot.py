@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from extensions import db
+import vocab_snapshot
+from vocab_snapshot import lookup_vocab_status, vocab_snapshots
+
+
+@pytest.fixture
+def terms(app_context, language, models):
+    vocab_snapshots.init_app(app_context)
+    db.session.add_all([
+        models.VocabTerm(language_id=language.id, term="hund", status=3, translation="dog"),
+        models.VocabTerm(language_id=language.id, term="katze", status=1),
+    ])
+    db.session.commit()
+    return language
+
+
+def _version(language_id):
+    return vocab_snapshot.get_vocab_version(language_id)
+
+
+def test_lookup_reports_statuses_case_insensitively(terms):
+    result = lookup_vocab_status(terms.id, ["Hund", "katze", "maus"])
+
+    assert result == {
+        "Hund": {"status": 3, "translation": "dog"},
+        "katze": {"status": 1, "translation": None},
+        "maus": {"status": 0, "translation": None},
+    }
+
+
+def test_own_commits_are_patched_into_the_snapshot(models, terms):
+    snapshot = vocab_snapshots.build(terms.id)
+    term = models.VocabTerm.query.filter_by(language_id=terms.id, term="katze").one()
+    term.status = 5
+    db.session.add(models.VocabTerm(language_id=terms.id, term="maus", status=2))
+    db.session.commit()
+
+    assert vocab_snapshots.get(terms.id, build=False) is snapshot
+    assert snapshot.version == _version(terms.id)
+    assert vocab_snapshots.lookup(terms.id, ["katze", "maus"]) == (
+        snapshot.version,
+        {"katze": (5, None), "maus": (2, None)},
+    )
+
+
+def test_writes_of_other_processes_rebuild_the_snapshot(models, terms):
+    snapshot = vocab_snapshots.build(terms.id)
+    # Another process: the row and the version change, this process is not told
+    db.session.execute(
+        models.VocabTerm.__table__.update().where(models.VocabTerm.term == "hund").values(status=6)
+    )
+    db.session.execute(
+        models.Language.__table__.update()
+        .where(models.Language.id == terms.id)
+        .values(vocab_version=models.Language.vocab_version + 1)
+    )
+    db.session.commit()
+
+    assert vocab_snapshots.get(terms.id, build=False) is None
+    assert lookup_vocab_status(terms.id, ["hund"])["hund"]["status"] == 6
+    rebuilt = vocab_snapshots.lookup(terms.id, ["hund"], build=True)
+    assert rebuilt == (_version(terms.id), {"hund": (6, "dog")})
+    assert vocab_snapshots.get(terms.id, build=False) is not snapshot
+
+
+def test_build_keeps_a_snapshot_patched_past_it(terms):
+    version = _version(terms.id)
+    vocab_snapshots.build(terms.id, version)
+    vocab_snapshots.patch({terms.id: (1, {"hund": (6, "dog")})})
+
+    stale = vocab_snapshots.build(terms.id, version)
+    current = vocab_snapshots.get(terms.id, version + 1, build=False)
+    assert current is not None and current is not stale
+    assert current.terms["hund"] == (6, "dog")
+
+
+def test_read_racing_an_update_sees_one_version(terms):
+    """Every write sets both terms to a status derived from the version it creates."""
+    snapshot = vocab_snapshots.build(terms.id)
+    base = snapshot.version
+    vocab_snapshots.patch({terms.id: (0, {"hund": (0, None), "katze": (0, None)})})
+
+    def status_at(version):
+        return (version - base) % 7
+
+    stop = threading.Event()
+
+    def writer():
+        version = base
+        while not stop.is_set():
+            version += 1
+            vocab_snapshots.patch({terms.id: (1, {"hund": (status_at(version), None), "katze": (status_at(version), None)})})
+            stop.wait(0.0001)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reads = 0
+    try:
+        for _ in range(5000):
+            version = vocab_snapshots.stats()[terms.id]["version"]
+            found = vocab_snapshots.lookup(terms.id, ["hund", "katze"], version, build=False)
+            if found is None:
+                continue  # a write landed in between
+            version, entries = found
+            reads += 1
+            assert entries == {"hund": (status_at(version), None), "katze": (status_at(version), None)}
+    finally:
+        stop.set()
+        thread.join()
+    assert reads > 0
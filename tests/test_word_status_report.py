@@ -0,0 +1,74 @@
+import pytest
+
+from text_analysis import FLAG_ALPHA, FLAG_PUNCT, FLAG_SPACE, FLAG_STOP, TextAnalysis
+from vocab_utils import compute_readability
+import word_status_report as report
+
+
+def _analysis(words):
+    """A TextAnalysis over space-separated (surface, lemma, flags) tokens."""
+    text = ""
+    tokens = []
+    for surface, lemma, flags in words:
+        if text:
+            tokens.append((len(text), 1, " ", "SPACE", FLAG_SPACE))
+            text += " "
+        tokens.append((len(text), len(surface), lemma, "X", flags))
+        text += surface
+    return TextAnalysis(text, tokens, [(0, len(text))])
+
+
+def test_surface_histogram_matches_lowercase_terms():
+    histogram = report.surface_histogram("Der Hund, der HUND und die Katze.", {"hund": 3, "der": 7, "katze": 6})
+
+    assert histogram["words"] == 7
+    assert histogram["ignored"] == 2
+    assert histogram["statuses"][3] == 2
+    assert histogram["statuses"][6] == 1
+    assert histogram["statuses"][0] == 2  # und, die
+
+
+def test_surface_histogram_counts_unexpected_statuses_as_unknown():
+    histogram = report.surface_histogram("alpha beta", {"alpha": 42})
+
+    assert histogram["statuses"][0] == 2
+    assert histogram["words"] == 2
+
+
+def test_lemma_histogram_groups_by_lemma_and_ignores_stop_words():
+    analysis = _analysis([
+        ("The", "the", FLAG_ALPHA | FLAG_STOP),
+        ("dogs", "dog", FLAG_ALPHA),
+        ("ran", "run", FLAG_ALPHA),
+        (",", ",", FLAG_PUNCT),
+        ("dog", "dog", FLAG_ALPHA),
+        ("he", "-pron-", FLAG_ALPHA),
+        ("42", "42", 0),
+        ("runs", "run", FLAG_ALPHA),
+    ])
+    histogram = report.lemma_histogram(analysis, {"dog": 5, "run": 7, "the": 6})
+
+    assert histogram["words"] == 6
+    assert histogram["ignored"] == 4  # the, he (stop/pronoun) and both forms of an ignored lemma
+    assert histogram["statuses"][5] == 2
+    assert sum(histogram["statuses"].values()) == 2
+
+
+def test_lemma_histogram_without_analysis_uses_reader_words():
+    histogram = report.lemma_histogram(None, {"katze": 4}, text="Katze katze Maus")
+
+    assert histogram == report.surface_histogram("Katze katze Maus", {"katze": 4})
+
+
+@pytest.mark.parametrize(
+    "statuses",
+    [
+        {"statuses": {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0}, "ignored": 3, "words": 3},
+        {"statuses": {0: 2, 1: 1, 2: 0, 3: 4, 4: 0, 5: 1, 6: 3}, "ignored": 2, "words": 13},
+    ],
+)
+def test_histogram_readability_matches_compute_readability(statuses):
+    words = [{"status": s, "ignored": False} for s, n in statuses["statuses"].items() for _ in range(n)]
+    words += [{"status": 7, "ignored": True}] * statuses["ignored"]
+
+    assert report.histogram_readability(statuses) == pytest.approx(compute_readability(words))
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+import word_tokenizer
+
+SCRIPT_JS = os.path.join(os.path.dirname(__file__), "..", "static", "script.js")
+
+SAMPLES = [
+    "",
+    "Hello, world!",
+    "  leading and trailing  ",
+    "Straße, Œuvre, naïve café — déjà vu?",
+    "Привет, как дела? Всё хорошо.",
+    "日本語の文章です。漢字とかなが混ざる。",
+    "مرحبا بالعالم، كيف حالك؟",
+    "snake_case_word and 42 apples, 3.14 and ١٢٣",
+    "emoji 😀 between 👍🏽 words",
+    "combining é marks and ä",
+    "line one\nline two\r\n\n\tindented",
+    "it's a don't-stop co-operation",
+    "ⅫⅣ ½ ² roman and fractions",
+]
+
+
+def _parse_text_source():
+    with open(SCRIPT_JS, encoding="utf-8") as f:
+        source = f.read()
+    match = re.search(r"^function parseText\(text\) \{.*?^\}", source, re.S | re.M)
+    assert match, "parseText not found in static/script.js"
+    return match.group(0)
+
+
+@pytest.fixture(scope="module")
+def reader_parse():
+    """parseText from static/script.js, run under node on every sample."""
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    program = (
+        _parse_text_source()
+        + "\nconst samples = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+        + "\nprocess.stdout.write(JSON.stringify(samples.map(parseText)));"
+    )
+    result = subprocess.run(
+        [node, "-e", program],
+        input=json.dumps(SAMPLES),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=True,
+    )
+    elements = json.loads(result.stdout)
+    return {
+        sample: [(e["type"], e["term"] if e["type"] == "word" else e["text"]) for e in parsed]
+        for sample, parsed in zip(SAMPLES, elements)
+    }
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_parse_text_matches_reader(reader_parse, text):
+    assert word_tokenizer.parse_text(text) == reader_parse[text]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_words_and_counts_agree_with_parse_text(text):
+    expected = [term for kind, term in word_tokenizer.parse_text(text) if kind == "word"]
+
+    assert word_tokenizer.words(text) == expected
+    assert word_tokenizer.count_words(text) == len(expected)
+    for word, start in word_tokenizer.iter_words(text):
+        assert text[start:start + len(word)] == word
+
+
+def test_parse_text_covers_the_whole_input():
+    text = " ".join(SAMPLES)
+
+    assert "".join(part for _, part in word_tokenizer.parse_text(text)) == text
@@ -0,0 +1,367 @@
+"""
+Persistent cache of analyzed lesson and story texts.
+
+A text is run through spaCy once per (content hash, model version). The result is
+stored as a compact token table in the ``analyzed_text`` table and reused by
+readability scoring, context-sentence lookup, /api/analyze-text and
+/api/grammar_summary, so saving a term on a long lesson no longer re-parses the
+whole lesson.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from extensions import db, get_spacy_model
+from sentence_index import ITEM_TEXT_FIELDS
+
+# Bump when the stored token table layout changes; old rows are then ignored.
+ANALYSIS_FORMAT_VERSION = 1
+
+# Pipeline profile used for cached analyses (lemmas, POS, stop words, sentences)
+ANALYSIS_PROFILE = "analysis"
+
+# Number of decoded analyses kept in memory per process
+MEMORY_CACHE_SIZE = 64
+
+# Token flag bits
+FLAG_ALPHA = 1
+FLAG_STOP = 2
+FLAG_PUNCT = 4
+FLAG_SPACE = 8
+
+AnalyzedToken = namedtuple(
+    "AnalyzedToken",
+    ["text", "idx", "lemma", "pos", "is_alpha", "is_stop", "is_punct", "is_space"],
+)
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_version_key(nlp) -> str:
+    """Identify a loaded pipeline by model name and version, e.g. 'en_core_web_sm@3.8.0'."""
+    meta = nlp.meta or {}
+    name = meta.get("name") or "pipeline"
+    lang = meta.get("lang") or nlp.lang
+    if not name.startswith(f"{lang}_"):
+        name = f"{lang}_{name}"
+    return f"{name}@{meta.get('version', '0')}/v{ANALYSIS_FORMAT_VERSION}"
+
+
+class TextAnalysis:
+    """
+    Compact, serializable result of running a text through spaCy.
+
+    Tokens are stored as (start offset, length, lemma, POS, flags) tuples and
+    sentences as (start, end) character offsets into the original text.
+    An empty lemma means "same as the lowercased token text".
+    """
+
+    def __init__(self, text, tokens, sentences):
+        self.text = text
+        self.tokens = tokens
+        self.sentences = sentences
+        self._summary = None
+
+    @classmethod
+    def from_doc(cls, doc):
+        return cls.from_chunks(doc.text, [(0, doc)])
+
+    @classmethod
+    def from_chunks(cls, text, chunk_docs):
+        """
+        Build the analysis of ``text`` from (start offset, Doc) pairs covering it,
+        e.g. from text_processor.pipe_text_chunks. Docs are consumed one at a
+        time, so spaCy's own memory stays bounded. The token table itself is
+        what the cache stores and is linear in the text (about 130 bytes per
+        token in memory, 20 in the stored JSON); readability and vocabulary
+        statistics work from summary() instead of per-token lists.
+        """
+        from text_processor import doc_sentences
+
+        tokens = []
+        sentences = []
+        for offset, doc in chunk_docs:
+            for token in doc:
+                flags = (
+                    (FLAG_ALPHA if token.is_alpha else 0)
+                    | (FLAG_STOP if token.is_stop else 0)
+                    | (FLAG_PUNCT if token.is_punct else 0)
+                    | (FLAG_SPACE if token.is_space else 0)
+                )
+                lemma = (token.lemma_ or "").lower()
+                if lemma == token.lower_:
+                    lemma = ""
+                tokens.append((offset + token.idx, len(token.text), lemma, token.pos_, flags))
+            sentences.extend(doc_sentences(offset, doc))
+        return cls(text, tokens, sentences)
+
+    @classmethod
+    def analyze(cls, nlp, text):
+        """Analyze a text of any length, chunk by chunk (see pipe_text_chunks)."""
+        from text_processor import pipe_text_chunks
+
+        return cls.from_chunks(text, pipe_text_chunks(nlp, text))
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"t": self.tokens, "s": self.sentences},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, text, data):
+        payload = json.loads(data)
+        tokens = [tuple(t) for t in payload["t"]]
+        sentences = [tuple(s) for s in payload["s"]]
+        return cls(text, tokens, sentences)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def iter_tokens(self):
+        """Yield AnalyzedToken tuples in document order."""
+        text = self.text
+        for start, length, lemma, pos, flags in self.tokens:
+            token_text = text[start:start + length]
+            yield AnalyzedToken(
+                token_text,
+                start,
+                lemma or token_text.lower(),
+                pos,
+                bool(flags & FLAG_ALPHA),
+                bool(flags & FLAG_STOP),
+                bool(flags & FLAG_PUNCT),
+                bool(flags & FLAG_SPACE),
+            )
+
+    def summary(self):
+        """The text_processor.TextSummary of this analysis, computed once from the token table."""
+        if self._summary is None:
+            from text_processor import TextSummary
+
+            summary = TextSummary()
+            for start, length, lemma, pos, flags in self.tokens:
+                if flags & (FLAG_SPACE | FLAG_PUNCT):
+                    continue
+                summary.add_word(
+                    lemma or self.text[start:start + length].lower(),
+                    bool(flags & FLAG_ALPHA),
+                    bool(flags & FLAG_STOP),
+                )
+            for start, end in self.sentences:
+                summary.add_sentence(start, end)
+            self._summary = summary
+        return self._summary
+
+    def iter_sentences(self):
+        """Yield the text of each sentence, stripped."""
+        for start, end in self.sentences:
+            yield self.text[start:end].strip()
+
+    def find_sentence(self, term: str):
+        """Return the first sentence containing ``term`` (case-insensitive), or None."""
+        needle = term.lower().strip()
+        if not needle:
+            return None
+        for sentence in self.iter_sentences():
+            if needle in sentence.lower():
+                return sentence
+        return None
+
+
+_memory_cache = OrderedDict()  # (content hash, model key) -> TextAnalysis
+_memory_lock = threading.Lock()
+
+
+def _remember(key, analysis):
+    with _memory_lock:
+        _memory_cache[key] = analysis
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _recall(key):
+    with _memory_lock:
+        analysis = _memory_cache.get(key)
+        if analysis is not None:
+            _memory_cache.move_to_end(key)
+        return analysis
+
+
+def store_text_analysis(analysis, model_key, commit=True):
+    """Persist an analysis; a row that already exists for the same hash and model is kept."""
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    AnalyzedText = _get_model("AnalyzedText")
+    text_hash = content_hash(analysis.text)
+    db.session.execute(
+        sqlite_insert(AnalyzedText.__table__)
+        .values(
+            content_hash=text_hash,
+            model_key=model_key,
+            token_count=len(analysis.tokens),
+            data=analysis.to_json(),
+            created_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["content_hash", "model_key"])
+    )
+    if commit:
+        db.session.commit()
+    _remember((text_hash, model_key), analysis)
+
+
+def get_text_analysis(text: str, language_name: str, commit: bool = True):
+    """
+    Return the TextAnalysis for ``text``, running spaCy only on a cache miss.
+
+    The analysis is looked up in memory, then in the ``analyzed_text`` table, and
+    only computed when neither has it for this text and model version.
+
+    Args:
+        text: The lesson or story text.
+        language_name: Name of the text's language.
+        commit: Commit the newly stored analysis. Pass False when the caller has
+            other pending changes in the session and commits them itself.
+
+    Returns:
+        TextAnalysis, or None if no spaCy model is available for the language.
+    """
+    if not text or not text.strip():
+        return None
+
+    nlp = get_spacy_model(language_name, profile=ANALYSIS_PROFILE)
+    if nlp is None:
+        return None
+
+    model_key = model_version_key(nlp)
+    text_hash = content_hash(text)
+    key = (text_hash, model_key)
+
+    analysis = _recall(key)
+    if analysis is not None:
+        return analysis
+
+    AnalyzedText = _get_model("AnalyzedText")
+    row = (
+        db.session.query(AnalyzedText.data)
+        .filter_by(content_hash=text_hash, model_key=model_key)
+        .first()
+    )
+    if row is not None:
+        analysis = TextAnalysis.from_json(text, row.data)
+        _remember(key, analysis)
+        return analysis
+
+    analysis = TextAnalysis.analyze(nlp, text)
+    store_text_analysis(analysis, model_key, commit=commit)
+    return analysis
+
+
+def get_text_analyses(texts, language_name: str, commit: bool = True, batch_size: int = None):
+    """
+    Batch version of get_text_analysis for many texts of one language.
+
+    Cached analyses are looked up with a single query; the chunks of all
+    remaining texts go through one ``nlp.pipe`` stream (``batch_size`` chunks
+    per batch, CHUNK_BATCH_SIZE by default). Returns a list aligned
+    with ``texts`` (None for empty texts), or None if no spaCy model is
+    available for the language.
+    """
+    from text_processor import CHUNK_BATCH_SIZE, TEXT_CHUNK_CHARS, iter_text_chunks
+
+    nlp = get_spacy_model(language_name, profile=ANALYSIS_PROFILE)
+    if nlp is None:
+        return None
+    model_key = model_version_key(nlp)
+
+    results = [None] * len(texts)
+    hashes = {}  # content hash -> positions still missing
+    for position, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        text_hash = content_hash(text)
+        analysis = _recall((text_hash, model_key))
+        if analysis is not None:
+            results[position] = analysis
+        else:
+            hashes.setdefault(text_hash, []).append(position)
+
+    if hashes:
+        AnalyzedText = _get_model("AnalyzedText")
+        rows = (
+            db.session.query(AnalyzedText.content_hash, AnalyzedText.data)
+            .filter(
+                AnalyzedText.model_key == model_key,
+                AnalyzedText.content_hash.in_(list(hashes)),
+            )
+            .all()
+        )
+        for text_hash, data in rows:
+            positions = hashes.pop(text_hash)
+            analysis = TextAnalysis.from_json(texts[positions[0]], data)
+            _remember((text_hash, model_key), analysis)
+            for position in positions:
+                results[position] = analysis
+
+    if hashes:
+        max_chars = min(TEXT_CHUNK_CHARS, nlp.max_length)
+        first_positions = [positions[0] for positions in hashes.values()]
+        chunk_docs = {position: [] for position in first_positions}
+        chunks = (
+            (chunk, (position, offset))
+            for position in first_positions
+            for offset, chunk in iter_text_chunks(texts[position], max_chars)
+        )
+        for doc, (position, offset) in nlp.pipe(
+            chunks, as_tuples=True, batch_size=batch_size or CHUNK_BATCH_SIZE
+        ):
+            chunk_docs[position].append((offset, doc))
+            # Chunks of one text arrive in order; build its analysis once the
+            # last one is in so the Docs can be freed
+            if offset + len(doc.text) >= len(texts[position]):
+                analysis = TextAnalysis.from_chunks(texts[position], chunk_docs.pop(position))
+                store_text_analysis(analysis, model_key, commit=False)
+                for same in hashes[content_hash(texts[position])]:
+                    results[same] = analysis
+        if commit:
+            db.session.commit()
+    return results
+
+
+def discard_text_analysis(text: str, item_type: str, item_id: int):
+    """
+    Delete stored analyses of ``text`` (all model versions) when the given
+    lesson/story, about to be deleted or edited, is its only user. Analyses
+    are keyed by content, so another lesson or story with the same text
+    keeps them; an edited text misses the cache on its own.
+    """
+    if not text:
+        return
+    for other_type, (model_name, text_field) in ITEM_TEXT_FIELDS.items():
+        Model = _get_model(model_name)
+        query = db.session.query(Model.id).filter(getattr(Model, text_field) == text)
+        if other_type == item_type:
+            query = query.filter(Model.id != item_id)
+        if query.first() is not None:
+            return
+    AnalyzedText = _get_model("AnalyzedText")
+    text_hash = content_hash(text)
+    db.session.query(AnalyzedText).filter_by(content_hash=text_hash).delete(
+        synchronize_session=False
+    )
+    with _memory_lock:
+        for key in [k for k in _memory_cache if k[0] == text_hash]:
+            del _memory_cache[key]
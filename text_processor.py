@@ -1,52 +1,162 @@
-import spacy
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Iterable, Iterator, Optional, Tuple, List
 import logging
+import threading
+from array import array
+from collections import Counter, OrderedDict, deque
+from extensions import model_registry, resolve_spacy_model_name
+import word_tokenizer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Map of language names to spaCy models
-SPACY_MODELS = {
-    'english': 'en_core_web_sm',
-    'spanish': 'es_core_news_sm',
-    'french': 'fr_core_news_sm',
-    'german': 'de_core_news_sm',
-    'portuguese': 'pt_core_news_sm',
-    'italian': 'it_core_news_sm',
-    'dutch': 'nl_core_news_sm',
-    'greek': 'el_core_news_sm',
-    'norwegian': 'nb_core_news_sm',
-    'lithuanian': 'lt_core_news_sm',
-    'danish': 'da_core_news_sm',
-    'polish': 'pl_core_news_sm',
-    'romanian': 'ro_core_news_sm',
-    'japanese': 'ja_core_news_sm',
-    'chinese': 'zh_core_web_sm',
-    'russian': 'ru_core_news_sm'
-}
-
-# Cache for loaded spaCy models
-_nlp_models = {}
-
-def get_nlp(language: str):
-    """Get or load the spaCy model for the specified language."""
-    language = language.lower()
-    
-    if language not in _nlp_models:
-        model_name = SPACY_MODELS.get(language)
-        if not model_name:
-            logger.warning(f"No spaCy model found for language: {language}")
-            return None
-        
-        try:
-            _nlp_models[language] = spacy.load(model_name)
-            logger.info(f"Loaded spaCy model: {model_name}")
-        except Exception as e:
-            logger.error(f"Error loading spaCy model {model_name}: {e}")
-            return None
+# Surface forms remembered per model by get_lemmas (LRU beyond this size)
+LEMMA_MEMO_SIZE = 50000
+# Number of words sent through nlp.pipe at once
+LEMMA_BATCH_SIZE = 1000
+# Longer texts are split into paragraph-aligned chunks of at most this many
+# characters, so only a few chunk-sized Docs are ever in memory
+TEXT_CHUNK_CHARS = 50000
+# Chunks per nlp.pipe batch
+CHUNK_BATCH_SIZE = 4
+
+_lemma_memo: Dict[str, OrderedDict] = {}  # model name -> {surface form: (lemma, pos)}
+_lemma_memo_lock = threading.Lock()
+
+def get_nlp(language: str, profile: str = 'full'):
+    """
+    Get or load the spaCy model for the specified language.
+
+    Uses the shared model registry and language map from extensions.py, so
+    this never loads a second copy of a pipeline that is already in use.
+    ``profile`` selects the components to load ('full', 'lemma', 'sentences').
+    """
+    model_name = resolve_spacy_model_name(language)
+    if not model_name:
+        logger.warning(f"No spaCy model found for language: {language}")
+        return None
+    
+    try:
+        return model_registry.get(model_name, profile)
+    except Exception as e:
+        logger.error(f"Error loading spaCy model {model_name}: {e}")
+        return None
+
+def iter_text_chunks(text: str, max_chars: int = TEXT_CHUNK_CHARS) -> Iterator[Tuple[int, str]]:
+    """
+    Split ``text`` into consecutive chunks of at most ``max_chars`` characters.
+    
+    Chunks end at a paragraph break where possible, then at a line break, a
+    sentence end or a space, so chunk borders rarely fall inside a sentence.
+    The chunks are exact slices of ``text``; yields (start offset, chunk).
+    """
+    if not text:
+        return
+    length = len(text)
+    start = 0
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            for separator in ("\n\n", "\n", ". ", " "):
+                cut = text.rfind(separator, start, end)
+                if cut > start:
+                    end = cut + len(separator)
+                    break
+        yield start, text[start:end]
+        start = end
+
+def pipe_text_chunks(nlp, text: str, max_chars: int = TEXT_CHUNK_CHARS) -> Iterator[Tuple[int, 'spacy.tokens.Doc']]:
+    """
+    Run a text of any length through ``nlp`` chunk by chunk.
     
-    return _nlp_models[language]
+    Yields (start offset, Doc) per chunk; token.idx within a Doc is relative to
+    its chunk. Chunks never exceed nlp.max_length, and each Doc can be dropped
+    once consumed, so spaCy's own memory does not grow with the text length.
+    """
+    max_chars = min(max_chars, nlp.max_length)
+    chunks = iter_text_chunks(text, max_chars)
+    for doc, start in nlp.pipe(
+        ((chunk, offset) for offset, chunk in chunks),
+        as_tuples=True,
+        batch_size=CHUNK_BATCH_SIZE
+    ):
+        yield start, doc
+
+def doc_sentences(offset: int, doc) -> Iterator[Tuple[int, int]]:
+    """(start, end) offsets of a chunk Doc's sentences in the whole text; the chunk itself without a parser/senter."""
+    if doc.has_annotation("SENT_START"):
+        for sent in doc.sents:
+            yield offset + sent.start_char, offset + sent.end_char
+    elif doc.text:
+        yield offset, offset + len(doc.text)
+
+class TextSummary:
+    """
+    What readability and vocabulary statistics need from a text, aggregated
+    one chunk Doc at a time instead of kept per token.
+
+    ``lemma_counts`` counts the words readability is computed from
+    (alphabetic, no stop words or generic pronouns), ``ignored`` the other
+    alphabetic words, ``words`` every token that is neither space nor
+    punctuation. The counts grow with the vocabulary of the text, not its
+    length; sentence offsets take 16 bytes per sentence.
+    """
+
+    def __init__(self):
+        self.lemma_counts = Counter()
+        self.ignored = 0
+        self.words = 0
+        self._sentences = array('q')  # start, end, start, end, ...
+
+    def add_word(self, lemma: str, is_alpha: bool = True, is_stop: bool = False):
+        self.words += 1
+        if not is_alpha:
+            return
+        if is_stop or lemma == '-pron-':  # Generic pronoun lemmas are ignored like stop words
+            self.ignored += 1
+        else:
+            self.lemma_counts[lemma] += 1
+
+    def add_sentence(self, start: int, end: int):
+        self._sentences.extend((start, end))
+
+    def add_doc(self, offset: int, doc):
+        """Fold one chunk Doc, starting at ``offset`` in the text, into the summary."""
+        for token in doc:
+            if token.is_space or token.is_punct:
+                continue
+            self.add_word((token.lemma_ or token.lower_).lower(), token.is_alpha, token.is_stop)
+        for start, end in doc_sentences(offset, doc):
+            self.add_sentence(start, end)
+
+    def iter_sentences(self) -> Iterator[Tuple[int, int]]:
+        """(start, end) offsets of the sentences, in order."""
+        sentences = self._sentences
+        for i in range(0, len(sentences), 2):
+            yield sentences[i], sentences[i + 1]
+
+    def sentence_count(self) -> int:
+        return len(self._sentences) // 2
+
+def summarize_chunks(chunk_docs: Iterable[Tuple[int, 'spacy.tokens.Doc']]) -> TextSummary:
+    """
+    Summarize (start offset, Doc) pairs, e.g. from pipe_text_chunks. Each Doc is
+    released as soon as it is folded in, so peak memory is a few chunk Docs plus
+    the summary, whatever the length of the text.
+    """
+    summary = TextSummary()
+    for offset, doc in chunk_docs:
+        summary.add_doc(offset, doc)
+    return summary
+
+def summarize_words(text: str) -> TextSummary:
+    """Summary without a SpaCy model: the reader's words (word_tokenizer) as lowercase lemmas."""
+    summary = TextSummary()
+    for word, _ in word_tokenizer.iter_words(text or ''):
+        summary.add_word(word.lower())
+    if text:
+        summary.add_sentence(0, len(text))
+    return summary
 
 def get_lemma(word: str, language: str = 'english') -> Tuple[str, str]:
     """
@@ -61,26 +171,113 @@ def get_lemma(word: str, language: str = 'english') -> Tuple[str, str]:
     """
     if not word or not word.strip():
         return word, ''
+    return get_lemmas([word], language)[word.strip()]
+
+def get_lemmas(words: Iterable[str], language: str = 'english') -> Dict[str, Tuple[str, str]]:
+    """
+    Lemmatize many words at once.
     
-    nlp = get_nlp(language)
+    Duplicates are processed once, words seen before are answered from a bounded
+    per-language memo, and the rest go through nlp.pipe in batches.
+    
+    Args:
+        words: The words (or short terms) to lemmatize
+        language: The language of the words
+        
+    Returns:
+        A dict mapping each stripped, non-empty input word to (lemma, pos_tag).
+        For multi-word terms the lemma of the first token is used, like get_lemma.
+    """
+    unique = list(dict.fromkeys(w.strip() for w in words if w and w.strip()))
+    if not unique:
+        return {}
+    
+    model_name = resolve_spacy_model_name(language)
+    nlp = get_nlp(language, profile='lemma')
     if not nlp:
-        # Fallback: return lowercase word if no model is available
-        return word.lower(), 'UNKNOWN'
+        # Fallback: return lowercase words if no model is available
+        return {word: (word.lower(), 'UNKNOWN') for word in unique}
     
+    results = {}
+    with _lemma_memo_lock:
+        memo = _lemma_memo.setdefault(model_name, OrderedDict())
+        for word in unique:
+            cached = memo.get(word)
+            if cached is not None:
+                memo.move_to_end(word)
+                results[word] = cached
+    missing = [word for word in unique if word not in results]
+    if not missing:
+        return results
+    
+    computed = {}
     try:
-        doc = nlp(word)
-        if not doc:
-            return word.lower(), 'UNKNOWN'
-            
-        token = doc[0]  # Get the first (and only) token
-        return token.lemma_.lower(), token.pos_
+        for word, doc in zip(missing, nlp.pipe(missing, batch_size=LEMMA_BATCH_SIZE)):
+            if not len(doc):
+                computed[word] = (word.lower(), 'UNKNOWN')
+                continue
+            token = doc[0]
+            lemma = token.lemma_.lower()
+            if not lemma or lemma == '-pron-':  # Avoid empty/generic pronoun lemmas
+                lemma = token.lower_
+            computed[word] = (lemma, token.pos_)
     except Exception as e:
-        logger.error(f"Error lemmatizing word '{word}': {e}")
-        return word.lower(), 'UNKNOWN'
+        logger.error(f"Error lemmatizing {len(missing)} words: {e}")
+        for word in missing:
+            results.setdefault(word, computed.get(word, (word.lower(), 'UNKNOWN')))
+        return results
+    
+    with _lemma_memo_lock:
+        memo.update(computed)
+        while len(memo) > LEMMA_MEMO_SIZE:
+            memo.popitem(last=False)
+    results.update(computed)
+    return results
+
+def iter_processed_words(text: str, language: str = 'english') -> Iterator[Dict]:
+    """
+    Yield one {'text', 'lemma', 'pos', 'is_alpha', 'is_stop'} dict per word of
+    a text (tokens that are neither space nor punctuation), one chunk Doc at
+    a time (see pipe_text_chunks). Consumers that aggregate as they go keep
+    memory bounded for any text length.
+    """
+    if not text or not text.strip():
+        return
+    
+    nlp = get_nlp(language, profile='lemma')
+    if not nlp:
+        # Fallback: split words like the reader does (no lemmas or stop words)
+        for word, _ in word_tokenizer.iter_words(text):
+            yield {
+                'text': word,
+                'lemma': word.lower(),
+                'pos': 'UNKNOWN',
+                'is_alpha': word.isalpha(),
+                'is_stop': False
+            }
+        return
+    
+    try:
+        for _, doc in pipe_text_chunks(nlp, text):
+            for token in doc:
+                if token.is_space or token.is_punct:
+                    continue
+                yield {
+                    'text': token.text,
+                    'lemma': token.lemma_.lower(),
+                    'pos': token.pos_,
+                    'is_alpha': token.is_alpha,
+                    'is_stop': token.is_stop
+                }
+    except Exception as e:
+        logger.error(f"Error processing text: {e}")
 
 def process_text(text: str, language: str = 'english') -> List[Dict]:
     """
     Process a text and return a list of words with their lemmas and POS tags.
+
+    The list holds one dict per word; use iter_processed_words (or
+    summarize_chunks) to aggregate long texts without keeping it.
     
     Args:
         text: The text to process
@@ -89,31 +286,186 @@ def process_text(text: str, language: str = 'english') -> List[Dict]:
     Returns:
         A list of dictionaries, each containing 'text', 'lemma', and 'pos'
     """
-    if not text or not text.strip():
-        return []
+    return list(iter_processed_words(text, language))
+
+class LemmaFrequencyTable:
+    """
+    Incremental lemma frequency table that can be merged across documents.
     
-    nlp = get_nlp(language)
-    if not nlp:
-        # Fallback: return words as-is with basic processing
-        return [{'text': word, 'lemma': word.lower(), 'pos': 'UNKNOWN'} 
-               for word in text.split()]
+    Per lemma it keeps the frequency, the first POS tag seen, up to
+    ``max_forms`` distinct surface forms and up to ``max_examples`` example
+    contexts, so its size grows with the vocabulary, not with the corpus.
+    """
     
-    try:
-        doc = nlp(text)
-        return [
-            {
-                'text': token.text,
-                'lemma': token.lemma_.lower(),
-                'pos': token.pos_,
-                'is_alpha': token.is_alpha,
-                'is_stop': token.is_stop
+    def __init__(self, max_examples: int = 3, max_forms: int = 20):
+        self.max_examples = max_examples
+        self.max_forms = max_forms
+        self.entries: Dict[str, Dict] = {}
+        self.token_count = 0
+        self.document_count = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __contains__(self, lemma):
+        return lemma in self.entries
+    
+    def _entry(self, lemma: str, pos: str) -> Dict:
+        entry = self.entries.get(lemma)
+        if entry is None:
+            entry = self.entries[lemma] = {
+                'frequency': 0,
+                'pos': pos,
+                'examples': [],
+                'original_forms': set()
             }
-            for token in doc
-            if not token.is_space and not token.is_punct
-        ]
-    except Exception as e:
-        logger.error(f"Error processing text: {e}")
-        return []
+        return entry
+    
+    def add(self, lemma: str, pos: str, form: str, example: Optional[str] = None, count: int = 1):
+        """Count ``count`` occurrences of ``lemma`` seen as ``form``."""
+        entry = self._entry(lemma, pos)
+        entry['frequency'] += count
+        self.token_count += count
+        forms = entry['original_forms']
+        if len(forms) < self.max_forms:
+            forms.add(form.lower())
+        examples = entry['examples']
+        if example and len(examples) < self.max_examples and example not in examples:
+            examples.append(example)
+    
+    def merge(self, other: 'LemmaFrequencyTable') -> 'LemmaFrequencyTable':
+        """Add the counts, forms and examples of ``other`` into this table."""
+        for lemma, theirs in other.entries.items():
+            entry = self._entry(lemma, theirs['pos'])
+            entry['frequency'] += theirs['frequency']
+            for form in theirs['original_forms']:
+                if len(entry['original_forms']) >= self.max_forms:
+                    break
+                entry['original_forms'].add(form)
+            for example in theirs['examples']:
+                if len(entry['examples']) >= self.max_examples:
+                    break
+                if example not in entry['examples']:
+                    entry['examples'].append(example)
+        self.token_count += other.token_count
+        self.document_count += other.document_count
+        return self
+    
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Return (lemma, frequency) pairs, most frequent first."""
+        ranked = sorted(
+            ((lemma, entry['frequency']) for lemma, entry in self.entries.items()),
+            key=lambda item: (-item[1], item[0])
+        )
+        return ranked[:n] if n is not None else ranked
+    
+    def to_dict(self) -> Dict[str, Dict]:
+        """JSON-serializable {lemma: {frequency, pos, examples, original_forms}}."""
+        return {
+            lemma: {
+                'frequency': entry['frequency'],
+                'pos': entry['pos'],
+                'examples': list(entry['examples']),
+                'original_forms': sorted(entry['original_forms'])
+            }
+            for lemma, entry in self.entries.items()
+        }
+
+def stream_vocabulary(
+    docs: Iterable[str],
+    language: str = 'english',
+    table: Optional[LemmaFrequencyTable] = None,
+    batch_size: int = 32,
+    n_process: int = 1,
+    context_window: int = 2
+) -> Optional[LemmaFrequencyTable]:
+    """
+    Build a lemma frequency table from a stream of documents.
+    
+    Documents are consumed lazily through nlp.pipe (long ones in chunks, see
+    iter_text_chunks), so only one batch is in memory at a time; examples are
+    taken from a sliding window of ``context_window`` words on each side of a
+    token.
+    
+    Args:
+        docs: Iterable of texts (e.g. iter_lesson_texts(), iter_text_file())
+        language: The language of the texts
+        table: Existing table to add to (a new one is created if omitted)
+        batch_size: Texts per nlp.pipe batch
+        n_process: Worker processes for nlp.pipe
+        context_window: Words of context on each side of an example
+        
+    Returns:
+        The LemmaFrequencyTable, or None if no model is available
+    """
+    nlp = get_nlp(language, profile='lemma')
+    if not nlp:
+        return None
+    table = table if table is not None else LemmaFrequencyTable()
+    width = 2 * context_window + 1
+    
+    def record(window: deque, index: int):
+        text, lemma, pos = window[index]
+        if lemma is None:
+            return
+        example = None
+        # Examples are only built while the lemma still needs one
+        entry = table.entries.get(lemma)
+        if entry is None or len(entry['examples']) < table.max_examples:
+            start = max(0, index - context_window)
+            example = ' '.join(window[i][0] for i in range(start, min(len(window), index + context_window + 1)))
+        table.add(lemma, pos, text, example)
+    
+    # Long texts are fed as paragraph-aligned chunks (context windows restart per chunk)
+    max_chars = min(TEXT_CHUNK_CHARS, nlp.max_length)
+    chunks = (
+        (chunk, doc_number)
+        for doc_number, text in enumerate(docs)
+        if text and text.strip()
+        for _, chunk in iter_text_chunks(text, max_chars)
+    )
+    last_doc_number = None
+    for doc, doc_number in nlp.pipe(chunks, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        if doc_number != last_doc_number:
+            table.document_count += 1
+            last_doc_number = doc_number
+        window = deque(maxlen=width)
+        seen = 0
+        for token in doc:
+            if token.is_space or token.is_punct:
+                continue
+            counted = token.is_alpha and not token.is_stop
+            window.append((token.text, token.lemma_.lower() if counted else None, token.pos_))
+            seen += 1
+            # The token context_window words back now has its full right context
+            if seen > context_window:
+                record(window, len(window) - context_window - 1)
+        # Flush the last words of the document (truncated right context)
+        for index in range(max(0, len(window) - min(seen, context_window)), len(window)):
+            record(window, index)
+    return table
+
+def iter_text_file(path: str, paragraphs_per_doc: int = 20, encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Yield a large text file as documents of ``paragraphs_per_doc`` paragraphs,
+    reading it line by line so a book never has to fit in memory (or nlp.max_length).
+    """
+    paragraphs, current = [], []
+    with open(path, encoding=encoding) as f:
+        for line in f:
+            if line.strip():
+                current.append(line.strip())
+                continue
+            if current:
+                paragraphs.append(' '.join(current))
+                current = []
+                if len(paragraphs) >= paragraphs_per_doc:
+                    yield '\n\n'.join(paragraphs)
+                    paragraphs = []
+    if current:
+        paragraphs.append(' '.join(current))
+    if paragraphs:
+        yield '\n\n'.join(paragraphs)
 
 def extract_vocabulary(text: str, language: str = 'english') -> Dict[str, Dict]:
     """
@@ -126,32 +478,5 @@ def extract_vocabulary(text: str, language: str = 'english') -> Dict[str, Dict]:
     Returns:
         A dictionary mapping lemmas to their information
     """
-    processed = process_text(text, language)
-    vocab = {}
-    
-    for token in processed:
-        if not token['is_alpha'] or token['is_stop']:
-            continue
-            
-        lemma = token['lemma']
-        if lemma not in vocab:
-            vocab[lemma] = {
-                'frequency': 0,
-                'pos': token['pos'],
-                'examples': set(),
-                'original_forms': set()
-            }
-        
-        vocab[lemma]['frequency'] += 1
-        vocab[lemma]['original_forms'].add(token['text'].lower())
-        
-        # Add context (surrounding words) as example
-        context = ' '.join(t['text'] for t in processed[max(0, processed.index(token)-2):processed.index(token)+3])
-        vocab[lemma]['examples'].add(context)
-    
-    # Convert sets to lists for JSON serialization
-    for lemma in vocab:
-        vocab[lemma]['examples'] = list(vocab[lemma]['examples'])[:3]  # Keep up to 3 examples
-        vocab[lemma]['original_forms'] = list(vocab[lemma]['original_forms'])
-    
-    return vocab
+    table = stream_vocabulary([text], language)
+    return table.to_dict() if table is not None else {}
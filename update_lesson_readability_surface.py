@@ -1,6 +1,19 @@
+"""
+Score every lesson by the surface forms of its words.
+
+Each ``\\b\\w+\\b`` word of a lesson counts with the weight of the status of
+the saved term spelled exactly like it (lowercase; unknown words weigh 0),
+without lemmatization, and the result is written to readability_score.
+This is a diagnostic score: the lemma index (readability_index.py) replaces
+it the next time a document's terms change. For the regular, lemma-based
+scores run ``flask backfill-readability --all`` instead.
+
+Term statuses are read with one query per language rather than one per word.
+"""
+import re
+
 from extensions import db
 from app import app
-import re
 
 # Use the same weights as in vocab_utils.py
 STATUS_WEIGHTS = {
@@ -13,40 +26,31 @@ STATUS_WEIGHTS = {
     6: 1.00,  # Fully known
 }
 
+
+def compute_readability_surface(statuses):
+    if not statuses:
+        return 100.0
+    return sum(STATUS_WEIGHTS.get(status, 0.0) for status in statuses) / len(statuses) * 100
+
+
 with app.app_context():
     Language = db.Model.registry._class_registry.get("Language")
     Lesson = db.Model.registry._class_registry.get("Lesson")
     VocabTerm = db.Model.registry._class_registry.get("VocabTerm")
 
-    def get_word_status(word, language_id):
-        vocab = VocabTerm.query.filter_by(language_id=language_id, term=word.lower()).first()
-        if vocab:
-            return vocab.status
-        return 0
-
-    def compute_readability_surface(words):
-        total_weighted = 0
-        count = 0
-        for status in words:
-            weight = STATUS_WEIGHTS.get(status, 0.0)
-            total_weighted += weight
-            count += 1
-        if count == 0:
-            return 100.0
-        return (total_weighted / count) * 100
-
     updated = 0
     for lang in Language.query.order_by(Language.name):
-        lessons = Lesson.query.filter_by(language_id=lang.id).all()
-        for lesson in lessons:
-            text = getattr(lesson, 'text_content', None)
+        term_statuses = dict(
+            db.session.query(VocabTerm.term, VocabTerm.status).filter(VocabTerm.language_id == lang.id)
+        )
+        for lesson in Lesson.query.filter_by(language_id=lang.id):
+            text = lesson.text_content
             if not text:
                 continue
             words = re.findall(r"\b\w+\b", text)
-            statuses = [get_word_status(word, lang.id) for word in words]
-            readability = compute_readability_surface(statuses)
-            lesson.readability_score = readability
-            db.session.add(lesson)
+            lesson.readability_score = compute_readability_surface(
+                [term_statuses.get(word.lower(), 0) for word in words]
+            )
             updated += 1
-    db.session.commit()
+        db.session.commit()
     print(f"Updated readability for {updated} lessons.")
@@ -0,0 +1,201 @@
+"""
+Many vocabulary changes in one request (/api/vocab/bulk_update).
+
+Applies the same rules as /api/vocab/update to a list of operations, but
+with one lookup of the existing terms (chunked IN queries), one lemmatization
+batch for the new ones (text_processor.get_lemmas), one sentence index of the
+lesson for context sentences, one readability update for every affected
+lemma and a single transaction for all of it.
+"""
+import logging
+from datetime import datetime
+
+from extensions import db
+from readability_index import apply_lemma_changes, snapshot_lemmas
+from sentence_index import find_context_sentence, load_sentence_index
+from text_processor import get_lemmas
+from vocab_utils import LOOKUP_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+STATUS_UNKNOWN = 0
+STATUS_LEVEL_1 = 1
+STATUS_IGNORED = 7
+
+# Operations accepted per request
+MAX_OPERATIONS = 5000
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+class BulkUpdateError(ValueError):
+    """An operation of a bulk update is invalid; nothing was changed."""
+
+    def __init__(self, index, message):
+        super().__init__(message if index is None else f"Operation {index}: {message}")
+        self.index = index
+
+
+def parse_operations(operations):
+    """
+    Validate raw operations ({term, status?, translation?, sentence?}) and
+    return them normalized, one per lowercase term (a later operation on the
+    same term wins). Raises BulkUpdateError.
+    """
+    if not isinstance(operations, list):
+        raise BulkUpdateError(None, "operations must be a list")
+    if len(operations) > MAX_OPERATIONS:
+        raise BulkUpdateError(None, f"at most {MAX_OPERATIONS} operations per request")
+
+    parsed = {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or not isinstance(operation.get("term"), str):
+            raise BulkUpdateError(index, "each operation needs a term")
+        term = operation["term"].strip()
+        if not term:
+            raise BulkUpdateError(index, "term cannot be empty")
+        status = operation.get("status")
+        if status is not None:
+            try:
+                status = int(status)
+            except (TypeError, ValueError):
+                raise BulkUpdateError(index, "invalid status format")
+            if not STATUS_UNKNOWN <= status <= STATUS_IGNORED:
+                raise BulkUpdateError(index, "invalid status value")
+        translation = operation.get("translation")
+        sentence = operation.get("sentence")
+        parsed[term.lower()] = {
+            "term": term,
+            "status": status,
+            "translation": translation if isinstance(translation, str) else None,
+            "sentence": sentence if isinstance(sentence, str) and sentence.strip() else None,
+        }
+    return parsed
+
+
+def _existing_terms(language_id, terms):
+    VocabTerm = _get_model("VocabTerm")
+    terms = list(terms)
+    existing = {}
+    for i in range(0, len(terms), LOOKUP_CHUNK_SIZE):
+        for entry in VocabTerm.query.filter(
+            VocabTerm.language_id == language_id, VocabTerm.term.in_(terms[i:i + LOOKUP_CHUNK_SIZE])
+        ):
+            existing[entry.term] = entry
+    return existing
+
+
+def _update_existing(entry, operation, context):
+    """Apply one operation to a saved term like /api/vocab/update. Returns True if changed."""
+    current_status = entry.status
+    status, translation = operation["status"], operation["translation"]
+    updated = False
+    if status is not None and status != current_status:
+        entry.status = status
+        updated = True
+    if translation is not None and translation != entry.translation:
+        entry.translation = translation.strip()
+        updated = True
+    if context is not None and not entry.context_sentence:
+        sentence = context(operation["term"])
+        if sentence:
+            entry.context_sentence = sentence
+            updated = True
+    # An unknown word that gets a translation starts learning at level 1
+    if current_status == STATUS_UNKNOWN and (status is None or status == STATUS_UNKNOWN) and translation:
+        entry.status = STATUS_LEVEL_1
+        updated = True
+    return updated
+
+
+def _new_entry(language_id, lower_term, lemma, operation, context):
+    VocabTerm = _get_model("VocabTerm")
+    status, translation = operation["status"], operation["translation"]
+    final_status = STATUS_UNKNOWN
+    if translation is not None and translation.strip() != "":
+        final_status = STATUS_LEVEL_1
+    if status is not None and status != STATUS_UNKNOWN:
+        final_status = status
+    sentence = operation["sentence"]
+    if context is not None and not sentence:
+        sentence = context(operation["term"])
+    return VocabTerm(
+        language_id=language_id,
+        term=lower_term,
+        lemma=lemma,
+        status=final_status,
+        translation=translation.strip() if translation else None,
+        context_sentence=sentence,
+        next_review_date=datetime.utcnow(),
+        interval=0,
+        ease_factor=2.5,
+        difficulty=0.0,
+        stability=0.0,
+        reviews=0,
+        lapses=0,
+        state="new",
+    )
+
+
+def bulk_update_terms(language, operations, lesson=None):
+    """
+    Apply parsed operations (see parse_operations) to ``language``'s
+    vocabulary inside the current transaction; the caller commits.
+
+    ``lesson`` (optional) is where the words were seen: its sentence index is
+    loaded once and used for the context sentences of the terms.
+
+    Returns a list of {term, status, translation, created, updated} in the
+    order of ``operations``.
+    """
+    model_available = language.spacy_model_status == "available"
+    existing = _existing_terms(language.id, operations)
+
+    context = None
+    if lesson is not None and lesson.text_content and model_available:
+        sentence_idx = load_sentence_index(lesson, "lesson")
+        if sentence_idx:
+            def context(term):
+                return find_context_sentence(sentence_idx, lesson.text_content, term)
+
+    new_terms = [lower for lower in operations if lower not in existing]
+    lemmas = {}
+    if new_terms and model_available:
+        # One nlp.pipe batch for every new term (memoized per language)
+        found = get_lemmas([operations[lower]["term"] for lower in new_terms], language.name)
+        lemmas = {lower: found.get(operations[lower]["term"], (lower, ""))[0] for lower in new_terms}
+
+    readability_before = snapshot_lemmas(
+        language.id,
+        [entry.lemma or entry.term for entry in existing.values()]
+        + [lemmas.get(lower, lower) for lower in new_terms],
+    )
+
+    results = []
+    for lower, operation in operations.items():
+        entry = existing.get(lower)
+        if entry is not None:
+            updated = _update_existing(entry, operation, context)
+            created = False
+        else:
+            entry = _new_entry(language.id, lower, lemmas.get(lower, lower), operation, context)
+            db.session.add(entry)
+            updated = created = True
+        results.append({
+            "term": operation["term"],
+            "status": entry.status,
+            "translation": entry.translation,
+            "created": created,
+            "updated": updated,
+        })
+
+    # Flushes the new and changed terms and rescores affected lessons/stories once
+    apply_lemma_changes(language.id, readability_before)
+    logger.info(
+        f"Bulk vocab update for {language.name}: {len(results)} terms, "
+        f"{sum(r['created'] for r in results)} new, {sum(r['updated'] for r in results)} changed"
+    )
+    return results
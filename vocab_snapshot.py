@@ -0,0 +1,390 @@
+"""
+Fast term -> (status, translation) lookups for the reader.
+
+Every language carries a ``vocab_version`` counter that is bumped in the same
+flush as any insert, delete or change of one of its terms (a session
+after_flush hook on ORM unit-of-work writes). Bulk ``Query.update()`` /
+``Query.delete()`` and Core statements on vocab_term do not go through a
+flush and are not seen: code using them on tracked attributes must bump
+``Language.vocab_version`` itself (delete_language only removes terms of a
+language it deletes and discards its snapshot). Each process keeps a
+snapshot of a language's whole vocabulary stamped with the version it was
+read at; a lookup first reads the current version (one primary-key query)
+and answers from the snapshot when it is current. Writes committed by the
+process itself are patched into its snapshots, so only writes from other
+processes (gunicorn workers, CLI commands) force a rebuild. Lookups copy
+the entries they need under the cache lock, so a commit patched in by
+another thread never leaves them with a mix of two versions.
+
+The same hook keeps the VocabChange log: the latest state of every changed
+term with the version it was committed at, so a client holding version N
+can ask for just the terms changed since (changes_since).
+
+When the snapshot is stale, small lookups are answered with chunked IN
+queries (at most LOOKUP_CHUNK_SIZE bound parameters each, well under
+SQLite's limit) and large ones rebuild the snapshot with a single query, so
+the cost stays flat from a hundred to tens of thousands of terms.
+
+Configuration (app.config):
+    VOCAB_SNAPSHOT_ENABLED: keep per-language snapshots (default True).
+    VOCAB_SNAPSHOT_MIN_TERMS: stale lookups with at least this many unique
+        terms rebuild the snapshot instead of querying in chunks (default
+        SNAPSHOT_MIN_TERMS).
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from multiword_matcher import PhraseMatcher
+from vocab_utils import LOOKUP_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Stale lookups of fewer unique terms are answered with chunked queries
+SNAPSHOT_MIN_TERMS = 2000
+
+# Term attributes the reader shows; changing any of them bumps the version
+TRACKED_ATTRIBUTES = ("term", "status", "translation", "lemma", "language_id")
+
+UNKNOWN_TERM = {"status": 0, "translation": None}
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def _changed_terms(session):
+    """{language id: {lowercase term: (status, translation) or None if removed}} of a flush."""
+    VocabTerm = _get_model("VocabTerm")
+    changes = {}
+
+    def record(language_id, term, value):
+        if language_id is not None and term is not None:
+            changes.setdefault(language_id, {})[term] = value
+
+    for obj in session.new:
+        if isinstance(obj, VocabTerm):
+            record(obj.language_id, obj.term, (obj.status, obj.translation))
+    for obj in session.deleted:
+        if isinstance(obj, VocabTerm):
+            record(obj.language_id, obj.term, None)
+    for obj in session.dirty:
+        if not isinstance(obj, VocabTerm):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES):
+            continue
+        # A renamed or moved term disappears under its old key
+        old_language_ids = state.attrs["language_id"].history.deleted or [obj.language_id]
+        for old_term in state.attrs["term"].history.deleted or [obj.term]:
+            for old_language_id in old_language_ids:
+                record(old_language_id, old_term, None)
+        record(obj.language_id, obj.term, (obj.status, obj.translation))
+    return changes
+
+
+def _bump_versions(session, flush_context):
+    changes = _changed_terms(session)
+    if not changes:
+        return
+    Language = _get_model("Language")
+    connection = session.connection()
+    languages = Language.__table__
+    connection.execute(
+        update(languages)
+        .where(languages.c.id.in_(changes))
+        .values(vocab_version=languages.c.vocab_version + 1)
+    )
+    versions = dict(
+        connection.execute(
+            select(languages.c.id, languages.c.vocab_version).where(languages.c.id.in_(changes))
+        ).all()
+    )
+    _log_changes(connection, changes, versions)
+    # Applied to this process's snapshots once the transaction commits
+    pending = session.info.setdefault("vocab_changes", {})
+    for language_id, terms in changes.items():
+        bumps, pending_terms = pending.get(language_id, (0, {}))
+        pending_terms.update(terms)
+        pending[language_id] = (bumps + 1, pending_terms)
+
+
+def _log_changes(connection, changes, versions):
+    """Replace the VocabChange row of every changed term with its new state."""
+    change_log = _get_model("VocabChange").__table__
+    rows = []
+    for language_id, terms in changes.items():
+        names = list(terms)
+        for i in range(0, len(names), LOOKUP_CHUNK_SIZE):
+            connection.execute(
+                delete(change_log).where(
+                    change_log.c.language_id == language_id,
+                    change_log.c.term.in_(names[i:i + LOOKUP_CHUNK_SIZE]),
+                )
+            )
+        for term, value in terms.items():
+            status, translation = value if value is not None else (None, None)
+            rows.append({
+                "language_id": language_id,
+                "version": versions[language_id],
+                "term": term,
+                "status": status,
+                "translation": translation,
+                "deleted": value is None,
+            })
+    connection.execute(insert(change_log), rows)
+
+
+def _apply_committed(session):
+    pending = session.info.pop("vocab_changes", None)
+    if pending:
+        vocab_snapshots.patch(pending)
+
+
+def _discard_pending(session, *args):
+    session.info.pop("vocab_changes", None)
+
+
+def get_vocab_version(language_id):
+    Language = _get_model("Language")
+    return db.session.query(Language.vocab_version).filter(Language.id == language_id).scalar()
+
+
+class VocabSnapshot:
+    """All terms of one language at one vocab_version."""
+
+    def __init__(self, language_id, version, terms):
+        self.language_id = language_id
+        self.version = version
+        self.terms = terms  # lowercase term -> (status, translation)
+        self.built_at = time.time()
+        self._phrases = None  # (PhraseMatcher, {phrase: (status, translation)}), see lookup()
+        self._phrase_generation = 0  # bumped by patch() when a phrase changes
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def _entries(known, terms):
+    return {term: known[term] for term in terms if term in known}
+
+
+class VocabSnapshotCache:
+    """Per-process, per-language vocabulary snapshots."""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.min_terms = SNAPSHOT_MIN_TERMS
+        self._snapshots = {}  # language id -> VocabSnapshot
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("VOCAB_SNAPSHOT_ENABLED", True))
+        self.min_terms = int(app.config.get("VOCAB_SNAPSHOT_MIN_TERMS", SNAPSHOT_MIN_TERMS))
+        if not self._listening:
+            event.listen(Session, "after_flush", _bump_versions)
+            event.listen(Session, "after_commit", _apply_committed)
+            event.listen(Session, "after_rollback", _discard_pending)
+            self._listening = True
+
+    def build(self, language_id, version=None):
+        VocabTerm = _get_model("VocabTerm")
+        if version is None:
+            version = get_vocab_version(language_id)
+        started = time.perf_counter()
+        table = VocabTerm.__table__
+        rows = db.session.execute(
+            select(table.c.term, table.c.status, table.c.translation).where(table.c.language_id == language_id)
+        )
+        snapshot = VocabSnapshot(
+            language_id, version, {term: (status, translation) for term, status, translation in rows}
+        )
+        with self._lock:
+            current = self._snapshots.get(language_id)
+            # Keep a snapshot that a commit of this process already patched past it
+            if current is None or current.version <= version:
+                self._snapshots[language_id] = snapshot
+        logger.debug(
+            f"Built vocab snapshot of language {language_id} (version {version}): "
+            f"{len(snapshot)} terms in {time.perf_counter() - started:.3f}s"
+        )
+        return snapshot
+
+    def patch(self, pending):
+        """
+        Apply committed term changes ({language id: (version bumps, {term: value})})
+        to the snapshots. A snapshot that missed writes of another process still
+        ends up behind the stored version and is rebuilt on its next use.
+        """
+        with self._lock:
+            for language_id, (bumps, terms) in pending.items():
+                snapshot = self._snapshots.get(language_id)
+                if snapshot is None:
+                    continue
+                for term, value in terms.items():
+                    if value is None:
+                        snapshot.terms.pop(term, None)
+                    else:
+                        snapshot.terms[term] = value
+                    if " " in term:
+                        snapshot._phrases = None
+                        snapshot._phrase_generation += 1
+                snapshot.version += bumps
+
+    def get(self, language_id, version=None, build=True):
+        """
+        Return the current snapshot of a language (built if needed and
+        ``build``), or None. Its terms keep changing as commits are patched
+        in; use lookup() for a read consistent with one version.
+        """
+        if version is None:
+            version = get_vocab_version(language_id)
+        with self._lock:
+            snapshot = self._snapshots.get(language_id)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return self.build(language_id, version) if build else None
+
+    def lookup(self, language_id, terms, version=None, build=True, phrases=False):
+        """
+        (version, {term: (status, translation)}) of the given lowercase terms
+        that have an entry, copied under the lock so the entries are exactly
+        those of the returned version even while patch() applies a commit.
+        With ``phrases`` a third item, (automaton, {phrase: (status,
+        translation)}), holds the multiword terms of that same version; the
+        automaton is built on first use and dropped when a committed write
+        touches a multiword term.
+
+        Returns None if the snapshot is not at ``version`` (the stored one by
+        default) and ``build`` is False.
+        """
+        if version is None:
+            version = get_vocab_version(language_id)
+        with self._lock:
+            snapshot = self._snapshots.get(language_id)
+        found = self._read(snapshot, terms, version, phrases) if snapshot is not None else None
+        if found is not None or not build:
+            return found
+        return self._read(self.build(language_id, version), terms, None, phrases)
+
+    def _read(self, snapshot, terms, version, phrases):
+        """lookup() from one snapshot; None if it is not at ``version``."""
+        with self._lock:
+            if version is not None and snapshot.version != version:
+                return None
+            found = (snapshot.version, _entries(snapshot.terms, terms))
+            if not phrases:
+                return found
+            built = snapshot._phrases
+            if built is None:
+                generation = snapshot._phrase_generation
+                entries = {term: value for term, value in snapshot.terms.items() if " " in term}
+        if built is None:
+            started = time.perf_counter()
+            built = (PhraseMatcher(entries), entries)
+            logger.debug(
+                f"Built multiword matcher of language {snapshot.language_id}: {len(entries)} phrases "
+                f"in {time.perf_counter() - started:.3f}s"
+            )
+            with self._lock:
+                # Not kept if a phrase was patched while building
+                if snapshot._phrase_generation == generation:
+                    snapshot._phrases = built
+        return found + (built,)
+
+    def discard(self, language_id):
+        """Forget a language's snapshot (e.g. when the language is deleted)."""
+        with self._lock:
+            self._snapshots.pop(language_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                language_id: {"version": s.version, "terms": len(s), "age_seconds": round(time.time() - s.built_at, 1)}
+                for language_id, s in self._snapshots.items()
+            }
+
+
+vocab_snapshots = VocabSnapshotCache()
+
+
+def lookup_terms_chunked(language_id, terms):
+    """{lowercase term: (status, translation)} for the given terms, LOOKUP_CHUNK_SIZE per query."""
+    VocabTerm = _get_model("VocabTerm")
+    terms = list(terms)
+    found = {}
+    for i in range(0, len(terms), LOOKUP_CHUNK_SIZE):
+        rows = db.session.query(VocabTerm.term, VocabTerm.status, VocabTerm.translation).filter(
+            VocabTerm.language_id == language_id,
+            VocabTerm.term.in_(terms[i:i + LOOKUP_CHUNK_SIZE]),
+        )
+        for term, status, translation in rows:
+            found[term] = (status, translation)
+    return found
+
+
+def lookup_vocab_status(language_id, terms):
+    """
+    Status and translation of each term as the reader shows it.
+
+    Returns {term as given: {"status", "translation"}}; unknown terms get
+    status 0.
+    """
+    unique = {term.lower() for term in terms}
+    found = None
+    if vocab_snapshots.enabled:
+        found = vocab_snapshots.lookup(language_id, unique, build=len(unique) >= vocab_snapshots.min_terms)
+    known = found[1] if found is not None else lookup_terms_chunked(language_id, unique)
+
+    result = {}
+    for term in terms:
+        entry = known.get(term.lower())
+        result[term] = {"status": entry[0], "translation": entry[1]} if entry else dict(UNKNOWN_TERM)
+    return result
+
+
+def changes_since(language_id, since):
+    """
+    Terms of a language changed after vocab_version ``since``.
+
+    Returns (current version, full, changes) where changes is a list of
+    [term, status, translation] with status None for a removed term. When
+    ``since`` is 0 or not a version this language has had (e.g. the database
+    was restored), ``full`` is True and changes lists every current term.
+    """
+    version = get_vocab_version(language_id)
+    if since <= 0 or since > version:
+        snapshot = vocab_snapshots.get(language_id, version)
+        with vocab_snapshots._lock:  # patch() may be updating the snapshot
+            version = snapshot.version
+            terms = [[term, status, translation] for term, (status, translation) in snapshot.terms.items()]
+        return version, True, terms
+    if since == version:
+        return version, False, []
+    return version, False, logged_changes(language_id, since)
+
+
+def logged_changes(language_id, since):
+    """
+    [term, status, translation] of every term changed after vocab_version
+    ``since`` according to the VocabChange log (status None if removed).
+    Unlike changes_since, ``since`` = 0 means every change the log has.
+    """
+    VocabChange = _get_model("VocabChange")
+    rows = (
+        db.session.query(VocabChange.term, VocabChange.status, VocabChange.translation, VocabChange.deleted)
+        .filter(VocabChange.language_id == language_id, VocabChange.version > since)
+        .order_by(VocabChange.version)
+    )
+    return [
+        [term, None if deleted else status, None if deleted else translation]
+        for term, status, translation, deleted in rows
+    ]
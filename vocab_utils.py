@@ -2,7 +2,8 @@ from __future__ import annotations
 from datetime import datetime
 from extensions import db
 # Avoid circular import: import models inside functions when needed
-from text_processor import get_lemma, process_text
+from text_processor import get_lemma, iter_processed_words, process_text, summarize_words
+from text_analysis import get_text_analysis
 
 # Helper to retrieve model classes lazily without importing app.py
 def _get_model(name):
@@ -212,9 +213,31 @@ def process_text_for_vocab(text: str, language_id: int) -> dict:
             'known_percentage': 0
         }
     
-    # Process the text
-    processed = process_text(text, language.name.lower())
-    if not processed:
+    # Process the text (cached analysis when a SpaCy model is available),
+    # keeping the first occurrence of each lemma rather than every word
+    analysis = get_text_analysis(text, language.name)
+    if analysis is not None:
+        words = (
+            {
+                'text': token.text,
+                'lemma': token.lemma,
+                'pos': token.pos,
+                'is_alpha': token.is_alpha,
+                'is_stop': token.is_stop
+            }
+            for token in analysis.iter_tokens()
+            if not token.is_space and not token.is_punct
+        )
+    else:
+        words = iter_processed_words(text, language.name.lower())
+    total_words = 0
+    first_tokens = {}
+    for token in words:
+        total_words += 1
+        if not token.get('is_alpha', True) or token.get('is_stop', False):
+            continue
+        first_tokens.setdefault(token['lemma'], token)
+    if not total_words:
         return {
             'total_words': 0,
             'unique_lemmas': 0,
@@ -222,41 +245,36 @@ def process_text_for_vocab(text: str, language_id: int) -> dict:
             'unknown_lemmas': [],
             'known_percentage': 0
         }
-    
-    # Get unique lemmas
-    lemmas = set()
-    unknown_lemmas = []
-    
-    for token in processed:
-        if not token['is_alpha'] or token['is_stop']:
-            continue
-            
-        lemma = token['lemma']
-        if lemma not in lemmas:
-            lemmas.add(lemma)
-            
-            # Check if this lemma is known
-            known = db.session.query(VocabTerm).filter(
+
+    # Check which lemmas are known with a single query
+    known = set()
+    if first_tokens:
+        known = {
+            row.lemma for row in db.session.query(VocabTerm.lemma).filter(
                 VocabTerm.language_id == language_id,
-                VocabTerm.lemma == lemma,
+                VocabTerm.lemma.in_(list(first_tokens)),
                 VocabTerm.status == 6  # STATUS_KNOWN
-            ).first()
-            
-            if not known:
-                unknown_lemmas.append({
-                    'lemma': lemma,
-                    'original': token['text'],
-                    'pos': token['pos']
-                })
+            ).distinct()
+        }
+
+    unknown_lemmas = [
+        {
+            'lemma': lemma,
+            'original': token['text'],
+            'pos': token['pos']
+        }
+        for lemma, token in first_tokens.items()
+        if lemma not in known
+    ]
     
-    known_count = len(lemmas) - len(unknown_lemmas)
+    known_count = len(first_tokens) - len(unknown_lemmas)
     
     return {
-        'total_words': len(processed),
-        'unique_lemmas': len(lemmas),
+        'total_words': total_words,
+        'unique_lemmas': len(first_tokens),
         'known_lemmas': known_count,
         'unknown_lemmas': unknown_lemmas,
-        'known_percentage': (known_count / len(lemmas)) * 100 if lemmas else 0
+        'known_percentage': (known_count / len(first_tokens)) * 100 if first_tokens else 0
     }
 
 def compute_readability(words):
@@ -301,81 +319,125 @@ def compute_readability(words):
     # Then convert to percentage
     return (total_weighted_familiarity / count) * 100
 
-def get_words_for_readability(text: str, language_id: int) -> list:
+def readability_from_tallies(tallies: dict) -> float:
+    """
+    compute_readability of the words behind ``tallies`` ({status: words}, see
+    readability_tallies): ignored words (7) are skipped, the others are
+    weighted by STATUS_WEIGHTS.
+    """
+    counted = sum(n for status, n in tallies.items() if status != 7)
+    if counted == 0:
+        return 100.0  # nothing to read = "fully readable"
+    weighted = sum(STATUS_WEIGHTS.get(status, 0.0) * n for status, n in tallies.items() if status != 7)
+    return (weighted / counted) * 100
+
+# Bound on the number of values in one SQL IN (...) list
+LOOKUP_CHUNK_SIZE = 500
+
+def lemma_statuses(language_id: int, lemmas) -> dict:
+    """
+    Resolve the readability status of each lemma with chunked IN queries.
+
+    A term is matched by its lemma (or its text when it has no lemma; without
+    a SpaCy model the lemma is the lowercase term anyway). When several terms
+    share a lemma the highest learning status wins, and a lemma whose only
+    terms are ignored resolves to 7 (Ignored). Lemmas without any saved term
+    are left out of the result, i.e. they are unknown (0).
+
+    Pass ``lemmas=None`` to resolve every lemma of the language in one query.
+    """
     VocabTerm = _get_model('VocabTerm')
-    Language = _get_model('Language')
-    from extensions import get_spacy_model # Import get_spacy_model from extensions
+    key = db.func.coalesce(VocabTerm.lemma, VocabTerm.term)
 
-    words_data = []
+    query = db.session.query(key, VocabTerm.status).filter(VocabTerm.language_id == language_id)
+    if lemmas is None:
+        batches = [query.all()]
+    else:
+        lemmas = list({lemma for lemma in lemmas if lemma})
+        batches = (
+            query.filter(key.in_(lemmas[i:i + LOOKUP_CHUNK_SIZE])).all()
+            for i in range(0, len(lemmas), LOOKUP_CHUNK_SIZE)
+        )
+    statuses = {}
+    for rows in batches:
+        for lemma, status in rows:
+            current = statuses.get(lemma)
+            if current is None or current == 7 or (status != 7 and status > current):
+                statuses[lemma] = status
+    return statuses
 
-    if not text or not text.strip():
-        print("Warning: Empty text provided for readability calculation.")
-        return words_data
+def readability_tallies(summary, language_id: int) -> dict:
+    """
+    Number of words of a text_processor.TextSummary per status, {0..7: n},
+    looking up only its distinct lemmas (see lemma_statuses). Stop words,
+    generic pronouns and words of ignored terms (status 7) count as 7.
+    """
+    statuses = lemma_statuses(language_id, summary.lemma_counts)
+    tallies = dict.fromkeys(range(8), 0)
+    for lemma, count in summary.lemma_counts.items():
+        status = statuses.get(lemma, 0)
+        tallies[status if status in tallies else 0] += count
+    tallies[7] += summary.ignored
+    return tallies
+
+def get_readability_tallies(text: str, language_id: int) -> dict:
+    """
+    Status tallies of a text for readability_from_tallies.
+
+    Uses the cached analysis when the language has a SpaCy model (running it
+    only if this text was never analyzed), and the reader's tokenization
+    (word_tokenizer) otherwise, so the score agrees with the statuses the
+    reader highlights. Only per-lemma counts are built, never a per-word list.
+    """
+    Language = _get_model('Language')
 
     language = Language.query.get(language_id)
-    if not language:
-        print(f"Error: Language with ID {language_id} not found.")
-        return words_data
-        
-    print(f"Processing text for language: {language.name} (ID: {language_id})")
-    print(f"SpaCy model status: {getattr(language, 'spacy_model_status', 'unknown')}")
-    
-    # Try to get the SpaCy model
-    try:
-        nlp = get_spacy_model(language.name)
-        if nlp is None:
-            print(f"Error: Failed to load SpaCy model for language '{language.name}'.")
-            # Instead of returning empty, we'll continue with basic word counting
-            # This ensures we at least get a word count, even if readability is 0%
-            words = [word for word in text.split() if word.strip()]
-            return [{'status': 0, 'ignored': False} for _ in words]
-    except Exception as e:
-        print(f"Error loading SpaCy model for {language.name}: {str(e)}")
-        # Fall back to basic word counting
-        words = [word for word in text.split() if word.strip()]
-        return [{'status': 0, 'ignored': False} for _ in words]
+    if not text or not text.strip() or not language:
+        return dict.fromkeys(range(8), 0)
 
     try:
-        # Process text with SpaCy
-        doc = nlp(text)
-        
-        # Collect all unique lemmas from the text for a single database query
-        lemmas_in_text = set()
-        for token in doc:
-            if token.is_alpha and not token.is_stop:
-                lemma = token.lemma_.lower()
-                if lemma != "-pron-": # Skip generic pronoun lemmas
-                    lemmas_in_text.add(lemma)
-
-        # Query existing vocab terms for the lemmas in this text
-        existing_vocab = {}
-        if lemmas_in_text:
-            vocab_entries = VocabTerm.query.filter(
-                VocabTerm.language_id == language_id,
-                VocabTerm.lemma.in_(list(lemmas_in_text))
-            ).all()
-            existing_vocab = {entry.lemma: entry for entry in vocab_entries}
-
-        # Process each token in the document
-        for token in doc:
-            if token.is_alpha:
-                lemma = token.lemma_.lower()
-                # Use token.is_stop to determine if it should be 'ignored'
-                is_ignored = token.is_stop or (lemma == "-pron-") # Also ignore generic pronouns
-                
-                status = 0 # Default to unknown
-                if lemma in existing_vocab:
-                    status = existing_vocab[lemma].status
-                
-                words_data.append({'status': status, 'ignored': is_ignored})
-        
-        print(f"Processed {len(words_data)} words with SpaCy")
-        
+        analysis = get_text_analysis(text, language.name, commit=False)
     except Exception as e:
-        print(f"Error processing text with SpaCy: {str(e)}")
-        # Fall back to basic word counting if SpaCy processing fails
-        words = [word for word in text.split() if word.strip()]
-        words_data = [{'status': 0, 'ignored': False} for _ in words]
-        print(f"Fell back to basic word counting: {len(words_data)} words")
+        print(f"Error analyzing text for {language.name}: {str(e)}")
+        analysis = None
+    if analysis is None:
+        # No SpaCy model (or it failed): the reader's words, matched by term
+        return readability_tallies(summarize_words(text), language_id)
+    return readability_tallies(analysis.summary(), language_id)
+
+def iter_lesson_texts(language_id: int, batch_size: int = 50):
+    """Yield the text of every lesson in a language, fetching ``batch_size`` rows at a time."""
+    Lesson = _get_model('Lesson')
+    query = db.session.query(Lesson.text_content).filter(
+        Lesson.language_id == language_id
+    ).order_by(Lesson.id).execution_options(yield_per=batch_size)
+    for row in query:
+        yield row.text_content
+
+def iter_story_texts(language_id: int, batch_size: int = 50):
+    """Yield the text of every story in a language, fetching ``batch_size`` rows at a time."""
+    Story = _get_model('Story')
+    query = db.session.query(Story.content).filter(
+        Story.language_id == language_id
+    ).order_by(Story.id).execution_options(yield_per=batch_size)
+    for row in query:
+        yield row.content
+
+def extract_library_vocabulary(language_id: int, include_stories: bool = True, n_process: int = 1):
+    """
+    Stream every lesson (and story) of a language through the vocabulary extractor.
 
-    return words_data
+    Returns:
+        A LemmaFrequencyTable, or None if the language or its SpaCy model is unavailable
+    """
+    from itertools import chain
+    from text_processor import stream_vocabulary
+    Language = _get_model('Language')
+
+    language = db.session.get(Language, language_id)
+    if not language:
+        return None
+    texts = iter_lesson_texts(language_id)
+    if include_stories:
+        texts = chain(texts, iter_story_texts(language_id))
+    return stream_vocabulary(texts, language.name, n_process=n_process)
@@ -0,0 +1,189 @@
+"""
+Per-lesson word-status histograms for a whole library.
+
+Each language's vocabulary is loaded with one query into an in-memory map and
+every text is tokenized once, so a report over thousands of lessons runs in
+seconds instead of issuing one query per word.
+
+Two modes:
+    surface  words as the reader splits them (word_tokenizer), matched against
+             saved terms by their lowercase form
+    lemma    the tokens readability is computed from (alphabetic, no stop
+             words or generic pronouns, from the cached spaCy analysis),
+             matched by lemma exactly like vocab_utils.lemma_statuses; without
+             a SpaCy model the reader's words are used as lemmas
+
+The histogram functions only take a text/analysis and a status map, so they
+can serve as the reference implementation when checking other readability
+code. Used by ``flask word-status-report`` and /api/reports/word_status.
+"""
+import csv
+import io
+
+from extensions import db
+from text_analysis import get_text_analyses
+from vocab_utils import STATUS_WEIGHTS, lemma_statuses
+import word_tokenizer
+
+MODES = ("surface", "lemma")
+STATUS_IGNORED = 7
+
+# Documents analyzed per batch in lemma mode
+REPORT_BATCH_SIZE = 50
+
+CSV_COLUMNS = (
+    ["language", "type", "id", "title", "mode", "words"]
+    + [f"status_{status}" for status in range(STATUS_IGNORED)]
+    + ["ignored", "readability"]
+)
+
+
+# Helper to retrieve model classes lazily without importing app.py
+def _get_model(name):
+    return db.Model.registry._class_registry.get(name)
+
+
+def empty_histogram():
+    return {"statuses": {status: 0 for status in range(STATUS_IGNORED)}, "ignored": 0, "words": 0}
+
+
+def _count(histogram, status):
+    histogram["words"] += 1
+    if status == STATUS_IGNORED:
+        histogram["ignored"] += 1
+    else:
+        histogram["statuses"][status if status in histogram["statuses"] else 0] += 1
+
+
+def surface_histogram(text, term_statuses):
+    """Histogram of the reader's words of ``text`` by {lowercase term: status}."""
+    histogram = empty_histogram()
+    for word in word_tokenizer.words(text):
+        _count(histogram, term_statuses.get(word.lower(), 0))
+    return histogram
+
+
+def lemma_histogram(analysis, statuses, text=None):
+    """
+    Histogram of an analysis's alphabetic tokens by {lemma: status}; stop
+    words and generic pronouns count as ignored. Without an analysis the
+    reader's words of ``text`` are looked up as lemmas.
+    """
+    if analysis is None:
+        return surface_histogram(text or "", statuses)
+    histogram = empty_histogram()
+    for token in analysis.iter_tokens():
+        if not token.is_alpha:
+            continue
+        if token.is_stop or token.lemma == "-pron-":
+            _count(histogram, STATUS_IGNORED)
+        else:
+            _count(histogram, statuses.get(token.lemma, 0))
+    return histogram
+
+
+def histogram_readability(histogram):
+    """Readability percentage of a histogram, as compute_readability would give it."""
+    counted = sum(histogram["statuses"].values())
+    if not counted:
+        return 100.0
+    weighted = sum(STATUS_WEIGHTS.get(status, 0.0) * n for status, n in histogram["statuses"].items())
+    return (weighted / counted) * 100
+
+
+def load_status_map(language_id, mode):
+    """The vocabulary of a language as one in-memory map, with a single query."""
+    if mode == "lemma":
+        return lemma_statuses(language_id, None)
+    VocabTerm = _get_model("VocabTerm")
+    return dict(
+        db.session.query(VocabTerm.term, VocabTerm.status).filter(VocabTerm.language_id == language_id)
+    )
+
+
+def _documents(language_id, include_stories):
+    Lesson = _get_model("Lesson")
+    Story = _get_model("Story")
+    sources = [("lesson", Lesson, Lesson.text_content)]
+    if include_stories:
+        sources.append(("story", Story, Story.content))
+    for doc_type, Model, text_column in sources:
+        query = (
+            db.session.query(Model.id, Model.title, text_column)
+            .filter(Model.language_id == language_id)
+            .order_by(Model.id)
+            .yield_per(REPORT_BATCH_SIZE)
+        )
+        for doc_id, title, text in query:
+            yield doc_type, doc_id, title, text or ""
+
+
+def language_report(language, mode="lemma", include_stories=True):
+    """Yield one report row (dict) per lesson/story of ``language``."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+    statuses = load_status_map(language.id, mode)
+
+    batch = []
+
+    def flush():
+        analyses = None
+        if mode == "lemma":
+            # Newly computed analyses are committed once the documents query is done
+            analyses = get_text_analyses([text for *_, text in batch], language.name, commit=False)
+        for position, (doc_type, doc_id, title, text) in enumerate(batch):
+            if mode == "surface":
+                histogram = surface_histogram(text, statuses)
+            else:
+                histogram = lemma_histogram(analyses[position] if analyses else None, statuses, text)
+            yield _row(language, doc_type, doc_id, title, mode, histogram)
+        batch.clear()
+
+    for document in _documents(language.id, include_stories):
+        batch.append(document)
+        if len(batch) >= REPORT_BATCH_SIZE:
+            yield from flush()
+    yield from flush()
+    if mode == "lemma":
+        db.session.commit()
+
+
+def _row(language, doc_type, doc_id, title, mode, histogram):
+    return {
+        "language": language.name,
+        "type": doc_type,
+        "id": doc_id,
+        "title": title,
+        "mode": mode,
+        "words": histogram["words"],
+        "statuses": histogram["statuses"],
+        "ignored": histogram["ignored"],
+        "readability": round(histogram_readability(histogram), 5),
+    }
+
+
+def write_csv(rows, stream):
+    writer = csv.writer(stream)
+    writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        writer.writerow(
+            [row["language"], row["type"], row["id"], row["title"], row["mode"], row["words"]]
+            + [row["statuses"][status] for status in range(STATUS_IGNORED)]
+            + [row["ignored"], row["readability"]]
+        )
+
+
+def rows_to_csv(rows):
+    stream = io.StringIO()
+    write_csv(rows, stream)
+    return stream.getvalue()
+
+
+def format_row(row):
+    """Human-readable lines for one row, in the style of the old print_* scripts."""
+    lines = [f"  {row['type'].capitalize()}: {row['title']}", f"    Word count: {row['words']}"]
+    lines.append(f"    Blue (0): {row['statuses'][0]}")
+    lines.extend(f"    Level {level}: {row['statuses'][level]}" for level in range(1, STATUS_IGNORED))
+    lines.append(f"    Ignored: {row['ignored']}")
+    lines.append(f"    Readability: {row['readability']:.5f}%")
+    return "\n".join(lines)
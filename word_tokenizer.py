@@ -0,0 +1,96 @@
+"""
+Model-free tokenizer that matches the reader's ``parseText`` (static/script.js).
+
+The browser splits text with ``/([\\p{L}\\p{N}_]+)|([^\\p{L}\\p{N}_]+)/gu``: runs of
+Unicode letters, numbers and underscore are words, everything in between is a
+separator. Python's ``re`` has no ``\\p{...}`` classes, so the same character
+class is built once from ``unicodedata`` (categories L* and N*, plus "_") and
+compiled lazily on first use.
+
+This is used whenever no language-specific spaCy model is loaded, so word
+counts and statuses computed on the server agree with what the reader shows.
+"""
+import re
+import sys
+import threading
+import unicodedata
+
+_WORD_CATEGORIES = ("L", "N")  # \p{L} and \p{N}
+
+_lock = threading.Lock()
+_word_re = None
+_token_re = None
+
+
+def _build_word_class():
+    """Return the body of a regex character class equivalent to [\\p{L}\\p{N}_]."""
+    ranges = []
+    start = previous = None
+    for code_point in range(sys.maxunicode + 1):
+        char = chr(code_point)
+        if char == "_" or unicodedata.category(char)[0] in _WORD_CATEGORIES:
+            if start is None:
+                start = code_point
+            previous = code_point
+            continue
+        if start is not None:
+            ranges.append((start, previous))
+            start = None
+    if start is not None:
+        ranges.append((start, previous))
+
+    parts = []
+    for low, high in ranges:
+        if low == high:
+            parts.append(re.escape(chr(low)))
+        else:
+            parts.append(f"{re.escape(chr(low))}-{re.escape(chr(high))}")
+    return "".join(parts)
+
+
+def _compile():
+    global _word_re, _token_re
+    with _lock:
+        if _word_re is None:
+            word_class = _build_word_class()
+            _token_re = re.compile(f"([{word_class}]+)|([^{word_class}]+)")
+            _word_re = re.compile(f"[{word_class}]+")
+    return _word_re, _token_re
+
+
+def parse_text(text):
+    """
+    Split ``text`` exactly like parseText in the reader.
+
+    Returns a list of ("word", term) and ("separator", text) tuples covering
+    the whole input in order.
+    """
+    if not text:
+        return []
+    _, token_re = _compile()
+    return [
+        ("word", match.group(1)) if match.group(1) else ("separator", match.group(2))
+        for match in token_re.finditer(text)
+    ]
+
+
+def iter_words(text):
+    """Yield (word, start offset) for every word in ``text``."""
+    if not text:
+        return
+    word_re, _ = _compile()
+    for match in word_re.finditer(text):
+        yield match.group(0), match.start()
+
+
+def words(text):
+    """Return the words of ``text`` in order."""
+    return [word for word, _ in iter_words(text)]
+
+
+def count_words(text):
+    """Number of words the reader will show for ``text``."""
+    if not text:
+        return 0
+    word_re, _ = _compile()
+    return sum(1 for _ in word_re.finditer(text))